@@ -0,0 +1,254 @@
+import sys
+import json
+import time
+import asyncio
+import inspect
+import logging
+from typing import Callable, Dict, List, Any, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger('alert_dispatcher')
+
+ALERT_DELIVERY = Histogram(
+    'alert_delivery_seconds',
+    'Tempo entre a geração do alerta e a entrega pelo handler',
+    ['level'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+)
+ALERT_QUEUE_DEPTH = Gauge(
+    'alert_queue_depth',
+    'Alertas aguardando entrega',
+    ['level']
+)
+ALERTS_DROPPED = Counter(
+    'alerts_dropped_total',
+    'Alertas descartados por fila cheia',
+    ['level', 'policy']
+)
+ALERTS_AGGREGATED = Counter(
+    'alerts_aggregated_total',
+    'Alertas agregados em resumos por fila cheia',
+    ['level']
+)
+ALERTS_FAILED = Counter(
+    'alerts_failed_total',
+    'Lotes de alertas cujo handler falhou',
+    ['level']
+)
+
+# Por nível: tamanho da fila, workers, política com a fila cheia e lote por entrega
+DEFAULT_DISPATCH_CONFIG = {
+    'critical': {'max_queue': 10000, 'workers': 4, 'policy': 'aggregate', 'batch_size': 1, 'batch_interval': 0.0},
+    'warning': {'max_queue': 5000, 'workers': 2, 'policy': 'aggregate', 'batch_size': 1, 'batch_interval': 0.0},
+    'info': {'max_queue': 1000, 'workers': 1, 'policy': 'drop_oldest', 'batch_size': 100, 'batch_interval': 1.0}
+}
+POLICIES = ('drop_newest', 'drop_oldest', 'aggregate')
+
+Handler = Callable[[List[Dict[str, Any]]], Any]
+
+
+class StdoutSink:
+    """
+    Escreve os alertas como JSON, um por linha, na saída padrão
+    """
+
+    def __call__(self, alerts: List[Dict[str, Any]]):
+        sys.stdout.write(''.join(json.dumps(alert, default=str) + '\n' for alert in alerts))
+        sys.stdout.flush()
+
+
+class FileSink:
+    """
+    Acrescenta os alertas como JSON, um por linha, num arquivo local
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, alerts: List[Dict[str, Any]]):
+        with open(self.path, 'a') as f:
+            f.write(''.join(json.dumps(alert, default=str) + '\n' for alert in alerts))
+
+
+class _LevelQueue:
+    def __init__(self, level: str, config: Dict[str, Any]):
+        if config['policy'] not in POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {config['policy']}")
+        self.level = level
+        self.config = config
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=config['max_queue'])
+        # Alertas que não couberam na fila, agregados por série
+        self.aggregated: Dict[str, Dict[str, Any]] = {}
+
+
+class AlertDispatcher:
+    """
+    Entrega assíncrona de alertas com filas limitadas por nível.
+
+    submit() nunca bloqueia quem monitora: o alerta entra na fila do seu nível
+    e um pool de workers chama o handler do nível (handlers síncronos rodam
+    num executor). Com a fila cheia vale a política do nível:
+
+    - drop_newest: descarta o alerta novo
+    - drop_oldest: descarta o alerta mais antigo da fila
+    - aggregate: conta o alerta num resumo por série, entregue quando houver espaço
+
+    Níveis com batch_size > 1 (por padrão info) entregam lotes de até
+    batch_size alertas, esperando no máximo batch_interval segundos.
+    """
+
+    def __init__(self, handlers: Dict[str, Handler], config: Optional[Dict[str, Dict[str, Any]]] = None,
+                 aggregate_interval: float = 1.0):
+        self.handlers = handlers
+        self.config = {level: dict(DEFAULT_DISPATCH_CONFIG.get(level, DEFAULT_DISPATCH_CONFIG['info']),
+                                   **(config or {}).get(level, {}))
+                       for level in handlers}
+        self.aggregate_interval = aggregate_interval
+        self._levels: Dict[str, _LevelQueue] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self):
+        """
+        Cria as filas e os workers no event loop atual
+        """
+        loop = asyncio.get_running_loop()
+        for level, config in self.config.items():
+            level_queue = _LevelQueue(level, config)
+            self._levels[level] = level_queue
+            for _ in range(config['workers']):
+                self._tasks.append(loop.create_task(self._worker(level_queue)))
+        self._tasks.append(loop.create_task(self._flush_aggregates()))
+
+    def submit(self, alert: Dict[str, Any]) -> bool:
+        """
+        Enfileira um alerta sem bloquear; retorna False se ele foi descartado ou agregado
+        """
+        level_queue = self._levels[alert['level']]
+        alert = dict(alert, enqueued_at=time.monotonic())
+        accepted = self._put(level_queue, alert)
+        ALERT_QUEUE_DEPTH.labels(level_queue.level).set(level_queue.queue.qsize())
+        return accepted
+
+    def _put(self, level_queue: _LevelQueue, alert: Dict[str, Any]) -> bool:
+        try:
+            level_queue.queue.put_nowait(alert)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        policy = level_queue.config['policy']
+        if policy == 'drop_oldest':
+            level_queue.queue.get_nowait()
+            level_queue.queue.task_done()
+            level_queue.queue.put_nowait(alert)
+            ALERTS_DROPPED.labels(level_queue.level, policy).inc()
+            return True
+        if policy == 'aggregate':
+            summary = level_queue.aggregated.get(alert['key'])
+            if summary is None:
+                level_queue.aggregated[alert['key']] = {'count': 1, 'first': alert, 'last': alert}
+            else:
+                summary['count'] += 1
+                summary['last'] = alert
+            ALERTS_AGGREGATED.labels(level_queue.level).inc()
+            return False
+        ALERTS_DROPPED.labels(level_queue.level, policy).inc()
+        return False
+
+    async def _next_batch(self, level_queue: _LevelQueue) -> List[Dict[str, Any]]:
+        batch = [await level_queue.queue.get()]
+        batch_size = level_queue.config['batch_size']
+        if batch_size > 1:
+            deadline = time.monotonic() + level_queue.config['batch_interval']
+            while len(batch) < batch_size:
+                if level_queue.queue.empty():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(level_queue.queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(level_queue.queue.get_nowait())
+        return batch
+
+    async def _deliver(self, level: str, batch: List[Dict[str, Any]]):
+        handler = self.handlers[level]
+        alerts = [{key: value for key, value in alert.items() if key != 'enqueued_at'} for alert in batch]
+        try:
+            if inspect.iscoroutinefunction(handler):
+                await handler(alerts)
+            else:
+                # Handlers síncronos (arquivo, HTTP bloqueante) não travam o event loop
+                await asyncio.get_running_loop().run_in_executor(None, handler, alerts)
+        except Exception as e:
+            ALERTS_FAILED.labels(level).inc()
+            logger.error(f"Alert handler for {level} failed on {len(batch)} alerts: {e}")
+            return
+        delivered_at = time.monotonic()
+        for alert in batch:
+            ALERT_DELIVERY.labels(level).observe(delivered_at - alert['enqueued_at'])
+
+    async def _worker(self, level_queue: _LevelQueue):
+        while True:
+            batch = await self._next_batch(level_queue)
+            ALERT_QUEUE_DEPTH.labels(level_queue.level).set(level_queue.queue.qsize())
+            try:
+                await self._deliver(level_queue.level, batch)
+            finally:
+                for _ in batch:
+                    level_queue.queue.task_done()
+
+    def _summary(self, level: str, key: str, summary: Dict[str, Any]) -> Dict[str, Any]:
+        last = summary['last']
+        return dict(last, aggregated_count=summary['count'],
+                    message=f"{summary['count']} alertas {level} agregados para {key}; "
+                            f"último: {last.get('message', '')}",
+                    enqueued_at=summary['first']['enqueued_at'])
+
+    async def _flush_aggregates(self):
+        """
+        Entrega os resumos dos alertas agregados quando as filas têm espaço
+        """
+        while True:
+            await asyncio.sleep(self.aggregate_interval)
+            self._move_aggregates()
+
+    def _move_aggregates(self):
+        for level, level_queue in self._levels.items():
+            for key in list(level_queue.aggregated):
+                if level_queue.queue.full():
+                    break
+                summary = level_queue.aggregated.pop(key)
+                level_queue.queue.put_nowait(self._summary(level, key, summary))
+
+    async def close(self, timeout: float = 5.0):
+        """
+        Entrega o que estiver pendente (até timeout segundos) e para os workers
+        """
+        if not self._tasks:
+            return
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                self._move_aggregates()
+                if all(level_queue.queue.empty() and not level_queue.aggregated
+                       for level_queue in self._levels.values()):
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.wait_for(
+                asyncio.gather(*(level_queue.queue.join() for level_queue in self._levels.values())),
+                max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            logger.warning("Alert dispatcher closed with undelivered alerts")
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
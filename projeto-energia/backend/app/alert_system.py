@@ -1,23 +1,87 @@
+import logging
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Any, Optional
+
+from anomaly_detector import StreamingAnomalyDetector
+from alert_dispatcher import AlertDispatcher, StdoutSink
+
+logger = logging.getLogger('alert_system')
 
 class AlertSystem:
-    def __init__(self):
+    def __init__(self, detector: Optional[StreamingAnomalyDetector] = None,
+                 sinks: Optional[List[Callable[[List[Dict[str, Any]]], None]]] = None,
+                 dispatch_config: Optional[Dict[str, Dict[str, Any]]] = None):
         self.alert_levels = {
             'critical': self._handle_critical,
             'warning': self._handle_warning,
             'info': self._handle_info
         }
-        
-    def monitor_metrics(self, current_metrics: Dict[str, float]) -> List[str]:
+        # Estado por série (janelas, EWMA, linha de base sazonal, cooldowns)
+        self.detector = detector or StreamingAnomalyDetector()
+        # Destinos das notificações, chamados com lotes de alertas
+        self.sinks = sinks if sinks is not None else [StdoutSink()]
+        # Com o dispatcher iniciado os handlers rodam fora do monitoramento
+        self.dispatcher = AlertDispatcher(self.alert_levels, dispatch_config)
+
+    def start(self):
+        """
+        Inicia a entrega assíncrona no event loop atual
+        """
+        self.dispatcher.start()
+
+    async def close(self):
+        await self.dispatcher.close()
+
+    def monitor_metrics(self, current_metrics: Dict[str, float],
+                        timestamp: Optional[datetime] = None) -> List[str]:
         """
         Monitora métricas em tempo real e gera alertas
+
+        Todas as séries do tick são avaliadas de uma vez pelo detector; só as
+        anomalias que passam pela deduplicação viram alertas. Com o dispatcher
+        iniciado os alertas só são enfileirados, então um destino lento não
+        atrasa o monitoramento.
         """
+        tick = (timestamp or datetime.now()).timestamp()
         alerts = []
-        
-        for metric_name, value in current_metrics.items():
-            if self._is_anomalous(metric_name, value):
-                alert = self._generate_alert(metric_name, value)
-                alerts.append(alert)
-                
-        return alerts 
\ No newline at end of file
+
+        for anomaly in self.detector.update(current_metrics, tick):
+            alert = self._generate_alert(anomaly)
+            record = dict(anomaly, message=alert)
+            if self.dispatcher.running:
+                self.dispatcher.submit(record)
+            else:
+                self.alert_levels[anomaly['level']]([record])
+            alerts.append(alert)
+
+        return alerts
+
+    def _generate_alert(self, anomaly: Dict[str, Any]) -> str:
+        """
+        Monta a mensagem do alerta
+        """
+        return (f"[{anomaly['level'].upper()}] {anomaly['key']}: valor {anomaly['value']:.2f} "
+                f"fora do padrão (score {anomaly['score']:.1f}, {anomaly['method']})")
+
+    def _notify(self, alerts: List[Dict[str, Any]]):
+        for sink in self.sinks:
+            try:
+                sink(alerts)
+            except Exception as e:
+                logger.error(f"Alert sink {type(sink).__name__} failed: {e}")
+
+    def _handle_critical(self, alerts: List[Dict[str, Any]]):
+        for alert in alerts:
+            logger.critical(alert['message'])
+        self._notify(alerts)
+
+    def _handle_warning(self, alerts: List[Dict[str, Any]]):
+        for alert in alerts:
+            logger.warning(alert['message'])
+        self._notify(alerts)
+
+    def _handle_info(self, alerts: List[Dict[str, Any]]):
+        # Alertas info chegam em lotes; um resumo evita uma linha de log por alerta
+        logger.info(f"{len(alerts)} alertas info: " + '; '.join(alert['message'] for alert in alerts[:5])
+                    + (' ...' if len(alerts) > 5 else ''))
+        self._notify(alerts)
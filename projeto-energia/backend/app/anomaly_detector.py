@@ -0,0 +1,191 @@
+import time
+import warnings
+import numpy as np
+from typing import Dict, List, Any, Optional, Sequence
+
+# Níveis de alerta em ordem de severidade (0 = sem alerta)
+LEVELS = ['none', 'info', 'warning', 'critical']
+
+# Fator que torna a MAD comparável ao desvio padrão numa distribuição normal
+_MAD_SCALE = 1.4826
+
+
+def _grow(array: Optional[np.ndarray], shape, fill) -> np.ndarray:
+    new = np.full(shape, fill, dtype=np.float64 if isinstance(fill, float) else np.int64)
+    if array is not None:
+        new[:len(array)] = array
+    return new
+
+
+class StreamingAnomalyDetector:
+    """
+    Detector de anomalias com estado para milhares de séries por tick.
+
+    Cada série (medidor/métrica) ocupa uma linha de arrays NumPy: uma janela
+    circular com os últimos valores, média e variância EWMA e, opcionalmente,
+    uma linha de base sazonal (média/variância EWMA por faixa horária). Cada
+    tick avalia todas as séries recebidas de uma vez:
+
+    - z EWMA: desvio em relação à média móvel exponencial
+    - z robusto: desvio em relação à mediana da janela, escalado pela MAD
+    - z sazonal: desvio em relação à média da mesma faixa do ciclo
+
+    O score é o maior |z| disponível. Alertas repetidos são suprimidos por um
+    cooldown por nível; uma escalada de nível sempre gera alerta. O nível
+    lembrado para a escalada envelhece como uma EWMA dos níveis de cada tick,
+    com o mesmo alpha das médias, e é esquecido depois de alguns ticks calmos.
+    """
+
+    def __init__(self, window: int = 60, alpha: float = 0.1, min_samples: int = 10,
+                 thresholds: Optional[Dict[str, float]] = None,
+                 cooldowns: Optional[Dict[str, float]] = None,
+                 season_slots: Optional[int] = None, slot_seconds: float = 3600.0,
+                 initial_capacity: int = 1024):
+        self.window = window
+        self.alpha = alpha
+        self.min_samples = min_samples
+        # Score mínimo de cada nível
+        self.thresholds = thresholds or {'info': 3.0, 'warning': 4.0, 'critical': 6.0}
+        # Segundos sem repetir um alerta do mesmo nível para a mesma série
+        self.cooldowns = cooldowns or {'info': 3600.0, 'warning': 900.0, 'critical': 300.0}
+        self.season_slots = season_slots
+        self.slot_seconds = slot_seconds
+
+        self.keys: List[str] = []
+        self.index: Dict[str, int] = {}
+        self._capacity = 0
+        self._buffer = self._position = self._count = self._mean = self._var = None
+        self._last_alert = self._last_level = None
+        self._season_mean = self._season_var = self._season_count = None
+        self._allocate(initial_capacity)
+
+    def _allocate(self, capacity: int):
+        """Cria ou aumenta os arrays de estado preservando as séries existentes"""
+        self._buffer = _grow(self._buffer, (capacity, self.window), np.nan)
+        self._position = _grow(self._position, capacity, 0)
+        self._count = _grow(self._count, capacity, 0)
+        self._mean = _grow(self._mean, capacity, 0.0)
+        self._var = _grow(self._var, capacity, 0.0)
+        self._last_alert = _grow(self._last_alert, capacity, -np.inf)
+        self._last_level = _grow(self._last_level, capacity, 0.0)
+        if self.season_slots:
+            self._season_mean = _grow(self._season_mean, (capacity, self.season_slots), 0.0)
+            self._season_var = _grow(self._season_var, (capacity, self.season_slots), 0.0)
+            self._season_count = _grow(self._season_count, (capacity, self.season_slots), 0)
+        self._capacity = capacity
+
+    def register(self, keys: Sequence[str]) -> np.ndarray:
+        """
+        Índices das séries, criando as novas; reutilize o resultado se as chaves não mudam
+        """
+        indices = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            idx = self.index.get(key)
+            if idx is None:
+                idx = len(self.keys)
+                self.index[key] = idx
+                self.keys.append(key)
+            indices[i] = idx
+        if len(self.keys) > self._capacity:
+            self._allocate(max(len(self.keys), 2 * self._capacity))
+        return indices
+
+    def _scores(self, idx: np.ndarray, values: np.ndarray, slot: Optional[int]) -> Dict[str, np.ndarray]:
+        """z-scores de cada método contra o estado anterior ao tick"""
+        ready = self._count[idx] >= self.min_samples
+        scores = {}
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.sqrt(self._var[idx])
+            scores['ewma'] = np.where(ready & (std > 0), (values - self._mean[idx]) / std, 0.0)
+
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)  # janelas ainda vazias
+                window = self._buffer[idx]
+                median = np.nanmedian(window, axis=1)
+                mad = np.nanmedian(np.abs(window - median[:, np.newaxis]), axis=1) * _MAD_SCALE
+            scores['robust'] = np.where(ready & (mad > 0), (values - median) / mad, 0.0)
+
+            if self.season_slots and slot is not None:
+                season_std = np.sqrt(self._season_var[idx, slot])
+                season_ready = self._season_count[idx, slot] >= self.min_samples
+                scores['seasonal'] = np.where(season_ready & (season_std > 0),
+                                              (values - self._season_mean[idx, slot]) / season_std, 0.0)
+        return scores
+
+    def _update_state(self, idx: np.ndarray, values: np.ndarray, slot: Optional[int]):
+        positions = self._position[idx]
+        self._buffer[idx, positions] = values
+        self._position[idx] = (positions + 1) % self.window
+
+        # EWMA da média e da variância; a primeira amostra só inicializa a média
+        first = self._count[idx] == 0
+        diff = values - self._mean[idx]
+        increment = self.alpha * diff
+        self._mean[idx] = np.where(first, values, self._mean[idx] + increment)
+        self._var[idx] = np.where(first, 0.0, (1 - self.alpha) * (self._var[idx] + diff * increment))
+        self._count[idx] += 1
+
+        if self.season_slots and slot is not None:
+            season_first = self._season_count[idx, slot] == 0
+            season_mean = self._season_mean[idx, slot]
+            season_diff = values - season_mean
+            season_increment = self.alpha * season_diff
+            self._season_mean[idx, slot] = np.where(season_first, values, season_mean + season_increment)
+            self._season_var[idx, slot] = np.where(
+                season_first, 0.0,
+                (1 - self.alpha) * (self._season_var[idx, slot] + season_diff * season_increment))
+            self._season_count[idx, slot] += 1
+
+    def update_indices(self, idx: np.ndarray, values: np.ndarray,
+                       timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Avalia e incorpora um tick; retorna os alertas que passaram pela deduplicação.
+        Cada série deve aparecer no máximo uma vez por tick.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        idx, values = idx[valid], values[valid]
+        slot = int(timestamp // self.slot_seconds) % self.season_slots if self.season_slots else None
+
+        scores = self._scores(idx, values, slot)
+        methods = list(scores)
+        stacked = np.abs(np.vstack([scores[method] for method in methods]))
+        best = np.argmax(stacked, axis=0)
+        score = stacked[best, np.arange(len(idx))]
+
+        level = np.zeros(len(idx), dtype=np.int64)
+        for level_index, name in enumerate(LEVELS[1:], start=1):
+            level[score >= self.thresholds[name]] = level_index
+
+        # Deduplicação: mesmo nível só depois do cooldown, escalada sempre
+        cooldown = np.array([0.0] + [self.cooldowns[name] for name in LEVELS[1:]])[level]
+        last_level = self._last_level[idx]
+        # Tolerância para o arredondamento da EWMA de um nível constante
+        remembered = np.ceil(last_level - 1e-9)
+        elapsed = timestamp - self._last_alert[idx]
+        emit = (level > 0) & ((level > remembered) | (elapsed >= cooldown))
+        self._last_alert[idx[emit]] = timestamp
+        self._last_level[idx] = np.where(emit, level, (1 - self.alpha) * last_level + self.alpha * level)
+
+        self._update_state(idx, values, slot)
+
+        return [
+            {
+                'key': self.keys[idx[i]],
+                'value': float(values[i]),
+                'score': float(score[i]),
+                'level': LEVELS[level[i]],
+                'method': methods[best[i]],
+                'timestamp': timestamp
+            }
+            for i in np.flatnonzero(emit)
+        ]
+
+    def update(self, metrics: Dict[str, float], timestamp: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Avalia um tick dado como {série: valor}
+        """
+        idx = self.register(list(metrics))
+        values = np.fromiter(metrics.values(), dtype=np.float64, count=len(metrics))
+        return self.update_indices(idx, values, timestamp)
@@ -1,9 +1,79 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import os
+import asyncio
+import logging
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query, Request
+from pydantic import BaseModel, root_validator
+from starlette.background import BackgroundTask
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from feature_store import DAY_TYPES, FeatureIndex, FeatureStore
+from model_registry import ModelRegistry
+from performance_tracker import PerformanceTracker, epoch_seconds
+from predictor import EnergyPredictor
+from prediction_batcher import MicroBatcher
+from prediction_cache import PredictionCache, SQLiteCacheBackend, cache_key
+from prediction_store import (GRANULARITIES, AsyncHistoryWriter, PredictionStore,
+                              decode_cursor, encode_cursor)
+from response_encoding import STREAM_CHUNK_SIZE, stream_rows
 
 router = APIRouter()
+logger = logging.getLogger('predictions')
+
+# Ordem das colunas da matriz de features enviada ao modelo
+FEATURE_COLUMNS = ['temperature', 'humidity', 'dayType', 'seasonality']
+MAX_BATCH_SIZE = 100000
+# Micro-batching das previsões individuais concorrentes
+BATCH_MAX_SIZE = int(os.getenv('PREDICTION_BATCH_MAX_SIZE', '64'))
+BATCH_MAX_WAIT_MS = float(os.getenv('PREDICTION_BATCH_MAX_WAIT_MS', '5'))
+# Registro de modelos e intervalo de checagem de novas versões ativadas
+MODEL_REGISTRY_PATH = os.getenv('MODEL_REGISTRY_PATH', 'models')
+MODEL_REFRESH_SECONDS = float(os.getenv('MODEL_REFRESH_SECONDS', '30'))
+
+energy_predictor = EnergyPredictor(ModelRegistry(MODEL_REGISTRY_PATH), n_features=len(FEATURE_COLUMNS))
+_refresh_task: Optional[asyncio.Task] = None
+
+# Cache de previsões; com PREDICTION_CACHE_SQLITE_PATH os workers compartilham os acertos
+CACHE_MAX_ENTRIES = int(os.getenv('PREDICTION_CACHE_MAX_ENTRIES', '10000'))
+CACHE_TTL_SECONDS = float(os.getenv('PREDICTION_CACHE_TTL_SECONDS', '300'))
+CACHE_SQLITE_PATH = os.getenv('PREDICTION_CACHE_SQLITE_PATH')
+
+prediction_cache = PredictionCache(
+    CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS,
+    SQLiteCacheBackend(CACHE_SQLITE_PATH) if CACHE_SQLITE_PATH else None
+)
+energy_predictor.swap_listeners.append(lambda name, version: prediction_cache.invalidate())
+
+# Histórico de previsões, gravado em lotes em segundo plano
+PREDICTION_STORE_URL = os.getenv('PREDICTION_STORE_URL', 'sqlite:///predictions.db')
+HISTORY_MAX_LIMIT = 10000
+
+# Desempenho do modelo: o histórico gravado alimenta drift e previsões
+# pendentes, e os valores reais enviados a /predictions/actuals fecham o erro,
+# por região. Previsões e valores reais sem região entram na série TRACKER_REGION
+TRACKER_REGION = 'all'
+
+def _request_model_update(report: Dict[str, Any]):
+    """
+    Chamado pelo performance_tracker quando há violações: o retreino roda fora
+    da API e ativa a nova versão no registro, então recarrega as versões ativas
+    no threadpool sem esperar o intervalo de MODEL_REFRESH_SECONDS
+    """
+    asyncio.get_running_loop().run_in_executor(None, energy_predictor.refresh)
+
+prediction_store = PredictionStore(PREDICTION_STORE_URL)
+performance_tracker = PerformanceTracker(retrain_callback=_request_model_update)
+history_writer = AsyncHistoryWriter(
+    prediction_store,
+    on_write=lambda rows: performance_tracker.record_history_rows(rows, TRACKER_REGION)
+)
+
+# Tabela de features materializada pelo feature_store; preenche as features
+# das requisições que informam só a região
+FEATURE_STORE_PATH = os.getenv('FEATURE_STORE_PATH', 'processed_data/features')
+
+feature_index = FeatureIndex(FeatureStore(FEATURE_STORE_PATH))
 
 class PredictionFeatures(BaseModel):
     temperature: float
@@ -12,8 +82,18 @@ class PredictionFeatures(BaseModel):
     seasonality: float
 
 class PredictionRequest(BaseModel):
+    """
+    Sem features, elas são lidas da tabela de features da região no timestamp
+    """
     timestamp: datetime
-    features: PredictionFeatures
+    region: Optional[str] = None
+    features: Optional[PredictionFeatures] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_features(cls, values):
+        if values.get('features') is None and values.get('region') is None:
+            raise ValueError("Provide features or a region to read them from the feature store")
+        return values
 
 class PredictionResponse(BaseModel):
     timestamp: datetime
@@ -21,40 +101,427 @@ class PredictionResponse(BaseModel):
     confidence: float
     features: PredictionFeatures
 
+class PredictionAggregate(BaseModel):
+    """
+    Previsões de um intervalo do histórico agregado por granularity
+    """
+    timestamp: datetime
+    predicted: float
+    predicted_min: float
+    predicted_max: float
+    confidence: float
+    count: int
+
+class PredictionBatchRequest(BaseModel):
+    """
+    Lote de previsões em um dos dois formatos:
+    - linhas: items, uma lista de PredictionRequest
+    - colunar: timestamps e uma lista por feature, todas do mesmo tamanho;
+      com region, as listas de features podem ser omitidas
+    """
+    items: Optional[List[PredictionRequest]] = None
+    timestamps: Optional[List[datetime]] = None
+    region: Optional[List[str]] = None
+    temperature: Optional[List[float]] = None
+    humidity: Optional[List[float]] = None
+    dayType: Optional[List[str]] = None
+    seasonality: Optional[List[float]] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_layout(cls, values):
+        columns = ['timestamps'] + FEATURE_COLUMNS
+        given = [col for col in columns if values.get(col) is not None]
+        if values.get('items') is not None:
+            if given or values.get('region') is not None:
+                raise ValueError("Use either items or the columnar fields, not both")
+            size = len(values['items'])
+        else:
+            if values.get('region') is not None:
+                # Sem as listas de features, elas são lidas da tabela de features
+                if given == ['timestamps']:
+                    columns = ['timestamps']
+                columns = columns + ['region']
+                given = given + ['region']
+            if len(given) != len(columns):
+                missing = [col for col in columns if col not in given]
+                raise ValueError(f"Missing columnar fields: {missing}")
+            sizes = {len(values[col]) for col in columns}
+            if len(sizes) != 1:
+                raise ValueError("Columnar fields must have the same length")
+            size = sizes.pop()
+        if size > MAX_BATCH_SIZE:
+            raise ValueError(f"Batch size {size} exceeds the limit of {MAX_BATCH_SIZE}")
+        return values
+
+def _features_arrow_type():
+    import pyarrow as pa
+    return pa.struct([('temperature', pa.float64()), ('humidity', pa.float64()),
+                      ('dayType', pa.string()), ('seasonality', pa.float64())])
+
+def prediction_arrow_schema():
+    """
+    Schema Arrow de PredictionResponse, fixo para que nenhum bloco dependa da inferência
+    """
+    import pyarrow as pa
+    return pa.schema([('timestamp', pa.timestamp('us')), ('predicted', pa.float64()),
+                      ('confidence', pa.float64()), ('features', _features_arrow_type())])
+
+def aggregate_arrow_schema():
+    """
+    Schema Arrow de PredictionAggregate
+    """
+    import pyarrow as pa
+    return pa.schema([('timestamp', pa.timestamp('us')), ('predicted', pa.float64()),
+                      ('predicted_min', pa.float64()), ('predicted_max', pa.float64()),
+                      ('confidence', pa.float64()), ('count', pa.int64())])
+
+def predict_matrix(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Executa o modelo sobre a matriz de features (uma linha por previsão)
+    """
+    if energy_predictor.is_loaded:
+        return energy_predictor.predict(matrix)
+    # Sem modelo no registro, retorna valores de exemplo
+    n_rows = matrix.shape[0]
+    predicted = np.full(n_rows, 120.5)  # Valor exemplo
+    confidence = np.full(n_rows, 0.95)  # Valor exemplo
+    return predicted, confidence
+
+BatchColumns = Tuple[List[datetime], List[float], List[float], List[str], List[float]]
+
+# Junta as chamadas concorrentes de create_prediction em uma chamada do modelo
+batcher = MicroBatcher(predict_matrix, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+async def _refresh_models():
+    """
+    Troca para as versões ativadas no registro por outros workers ou processos
+    e para a tabela de features materializada mais recente
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(MODEL_REFRESH_SECONDS)
+        try:
+            await loop.run_in_executor(None, energy_predictor.refresh)
+        except Exception as e:
+            logger.error(f"Model refresh failed: {e}")
+        try:
+            await loop.run_in_executor(None, feature_index.refresh)
+        except Exception as e:
+            logger.error(f"Feature index refresh failed: {e}")
+
+async def load_models():
+    """
+    Carrega e aquece os modelos uma vez, na inicialização do worker
+    """
+    global _refresh_task
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, energy_predictor.load)
+    except Exception as e:
+        logger.error(f"Error loading models from {MODEL_REGISTRY_PATH}: {e}")
+    if MODEL_REFRESH_SECONDS > 0:
+        _refresh_task = loop.create_task(_refresh_models())
+
+async def shutdown_models():
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+    await batcher.close()
+
+async def load_features():
+    """
+    Carrega o índice da tabela de features, se já houver uma materializada
+    """
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, feature_index.refresh)
+    except Exception as e:
+        logger.error(f"Error loading features from {FEATURE_STORE_PATH}: {e}")
+
+async def start_history():
+    """
+    Cria o schema do histórico e inicia a gravação em lotes
+    """
+    await asyncio.get_running_loop().run_in_executor(None, prediction_store.create_schema)
+    history_writer.start()
+
+async def stop_history():
+    # Grava as previsões que ainda estão na fila
+    await history_writer.close()
+
+def _stored_features(regions: List[str], timestamps: List[datetime]) -> Tuple[List[float], List[float],
+                                                                              List[str], List[float]]:
+    """
+    Features de cada (região, timestamp) lidas da tabela de features, com os
+    mesmos valores que uma linha de treino naquele instante teria
+    """
+    if not feature_index.is_loaded:
+        raise LookupError(f"No feature table loaded from {FEATURE_STORE_PATH}")
+    frame = feature_index.lookup(regions, timestamps)
+    return (frame['temperature'].tolist(), frame['humidity'].tolist(),
+            frame['day_type'].tolist(), frame['seasonality'].tolist())
+
+def _batch_columns(batch: PredictionBatchRequest) -> BatchColumns:
+    """
+    Converte o lote para o formato colunar, completando pela tabela de features
+    as linhas enviadas só com a região
+    """
+    if batch.items is None:
+        if batch.temperature is None:
+            return (batch.timestamps, *_stored_features(batch.region, batch.timestamps))
+        return batch.timestamps, batch.temperature, batch.humidity, batch.dayType, batch.seasonality
+    items = batch.items
+    features = [item.features for item in items]
+    columns = ([item.timestamp for item in items],
+               [f.temperature if f else None for f in features],
+               [f.humidity if f else None for f in features],
+               [f.dayType if f else None for f in features],
+               [f.seasonality if f else None for f in features])
+    missing = [i for i, f in enumerate(features) if f is None]
+    if missing:
+        stored = _stored_features([items[i].region for i in missing], [items[i].timestamp for i in missing])
+        for column, values in zip(columns[1:], stored):
+            for i, value in zip(missing, values):
+                column[i] = value
+    return columns
+
+def build_feature_matrix(temperature: List[float], humidity: List[float],
+                         day_type: List[str], seasonality: List[float]) -> np.ndarray:
+    """
+    Monta a matriz de features na ordem de FEATURE_COLUMNS
+    """
+    matrix = np.empty((len(temperature), len(FEATURE_COLUMNS)), dtype=np.float64)
+    matrix[:, 0] = temperature
+    matrix[:, 1] = humidity
+    matrix[:, 2] = [DAY_TYPES.get(value, -1) for value in day_type]
+    matrix[:, 3] = seasonality
+    return matrix
+
+def _predict_columns(columns: BatchColumns) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Monta a matriz do lote e executa o modelo sobre ela
+    """
+    return predict_matrix(build_feature_matrix(*columns[1:]))
+
+def _prediction_items(timestamps: List[datetime], temperature: List[float], humidity: List[float],
+                      day_type: List[str], seasonality: List[float],
+                      predicted: np.ndarray, confidence: np.ndarray) -> Iterator[Dict[str, Any]]:
+    predicted = predicted.tolist()
+    confidence = confidence.tolist()
+    for i in range(len(timestamps)):
+        yield {
+            "timestamp": timestamps[i],
+            "predicted": predicted[i],
+            "confidence": confidence[i],
+            "features": {
+                "temperature": temperature[i],
+                "humidity": humidity[i],
+                "dayType": day_type[i],
+                "seasonality": seasonality[i]
+            }
+        }
+
+def _history_row(timestamp: datetime, features: Dict[str, Any], predicted: float,
+                 confidence: float, model_version: Optional[str],
+                 region: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        'timestamp': timestamp,
+        'region': region,
+        'predicted': predicted,
+        'confidence': confidence,
+        'temperature': features['temperature'],
+        'humidity': features['humidity'],
+        'day_type': features['dayType'],
+        'seasonality': features['seasonality'],
+        'model_version': model_version
+    }
+
+def _batch_regions(batch: PredictionBatchRequest) -> List[Optional[str]]:
+    if batch.items is not None:
+        return [item.region for item in batch.items]
+    return batch.region if batch.region is not None else [None] * len(batch.timestamps)
+
+async def _record_batch(columns: BatchColumns, regions: List[Optional[str]], predicted: np.ndarray,
+                        confidence: np.ndarray, model_version: Optional[str]):
+    # Roda no event loop (a fila do histórico não é thread-safe), cedendo a vez entre blocos
+    items = _prediction_items(*columns, predicted, confidence)
+    for i, (item, region) in enumerate(zip(items, regions), 1):
+        history_writer.record(_history_row(item['timestamp'], item['features'], item['predicted'],
+                                           item['confidence'], model_version, region))
+        if i % STREAM_CHUNK_SIZE == 0:
+            await asyncio.sleep(0)
+
+def _history_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "timestamp": row['timestamp'],
+        "predicted": row['predicted'],
+        "confidence": row['confidence'],
+        "features": {
+            "temperature": row['temperature'],
+            "humidity": row['humidity'],
+            "dayType": row['day_type'],
+            "seasonality": row['seasonality']
+        }
+    }
+
 @router.post("/predictions", response_model=PredictionResponse)
 async def create_prediction(request: PredictionRequest):
+    features = request.features
+    if features is None:
+        try:
+            temperature, humidity, day_type, seasonality = _stored_features([request.region],
+                                                                            [request.timestamp])
+        except LookupError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        features = PredictionFeatures(temperature=temperature[0], humidity=humidity[0],
+                                      dayType=day_type[0], seasonality=seasonality[0])
     try:
-        # Aqui seria chamado o modelo ML real
+        key = cache_key(energy_predictor.version(), features.dict())
+        cached = await prediction_cache.aget(key)
+        if cached is not None:
+            predicted, confidence = cached
+        else:
+            matrix = build_feature_matrix([features.temperature], [features.humidity],
+                                          [features.dayType], [features.seasonality])
+            predicted, confidence = await batcher.submit(matrix[0])
+            await prediction_cache.aset(key, [predicted, confidence])
+        history_writer.record(_history_row(request.timestamp, features.dict(), predicted,
+                                           confidence, energy_predictor.version(), request.region))
         prediction = {
             "timestamp": request.timestamp,
-            "predicted": 120.5,  # Valor exemplo
-            "confidence": 0.95,  # Valor exemplo
-            "features": request.features
+            "predicted": predicted,
+            "confidence": confidence,
+            "features": features
         }
         return prediction
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/predictions/history", response_model=List[PredictionResponse])
+@router.post("/predictions/batch", response_model=List[PredictionResponse])
+async def create_predictions_batch(batch: PredictionBatchRequest, request: Request):
+    """
+    Previsões em lote: o modelo roda uma vez sobre a matriz de todas as linhas
+    e o resultado é enviado em streaming, na ordem do pedido, como array JSON,
+    NDJSON ou Arrow IPC conforme o Accept
+    """
+    # A leitura das features e o modelo rodam no threadpool, fora do event loop
+    loop = asyncio.get_running_loop()
+    try:
+        columns = await loop.run_in_executor(None, _batch_columns, batch)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        predicted, confidence = await loop.run_in_executor(None, _predict_columns, columns)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    # As linhas são montadas bloco a bloco enquanto a resposta é enviada
+    return stream_rows(
+        _prediction_items(*columns, predicted, confidence),
+        request.headers.get('accept'),
+        # O histórico é gravado depois que a resposta foi enviada
+        background=BackgroundTask(_record_batch, columns, _batch_regions(batch), predicted,
+                                  confidence, energy_predictor.version()),
+        arrow_schema=prediction_arrow_schema
+    )
+
+@router.get("/predictions/history",
+            response_model=Union[List[PredictionResponse], List[PredictionAggregate]])
 async def get_prediction_history(
+    request: Request,
     start_date: Optional[datetime] = None,
-    end_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None,
+    granularity: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=HISTORY_MAX_LIMIT),
+    cursor: Optional[str] = None
 ):
+    """
+    Histórico de previsões no período, em ordem de timestamp.
+
+    Sem granularity retorna até limit previsões; o cabeçalho X-Next-Cursor traz
+    o cursor da página seguinte. Com granularity (hourly, daily, monthly) retorna
+    as previsões agregadas por intervalo. A resposta é NDJSON com Accept:
+    application/x-ndjson, Arrow IPC com application/vnd.apache.arrow.stream e
+    um array JSON nos demais casos.
+    """
+    if granularity is not None and granularity not in GRANULARITIES:
+        raise HTTPException(status_code=422, detail=f"granularity must be one of {list(GRANULARITIES)}")
     try:
-        # Aqui seria buscado o histórico real
-        predictions = [
-            {
-                "timestamp": datetime.now(),
-                "predicted": 120.5,
-                "confidence": 0.95,
-                "features": {
-                    "temperature": 25.0,
-                    "humidity": 0.7,
-                    "dayType": "weekday",
-                    "seasonality": 0.8
-                }
-            }
-        ]
-        return predictions
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+    loop = asyncio.get_running_loop()
+    headers = {}
+    arrow_schema = prediction_arrow_schema
+    try:
+        if granularity is not None:
+            rows = await loop.run_in_executor(None, prediction_store.aggregate,
+                                              granularity, start_date, end_date)
+            items = rows
+            arrow_schema = aggregate_arrow_schema
+        else:
+            rows, next_cursor = await loop.run_in_executor(None, prediction_store.page,
+                                                           start_date, end_date, limit, after)
+            items = (_history_item(row) for row in rows)
+            if next_cursor is not None:
+                headers['X-Next-Cursor'] = encode_cursor(next_cursor)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return stream_rows(items, request.headers.get('accept'), headers=headers, arrow_schema=arrow_schema)
+
+class ActualsRequest(BaseModel):
+    """
+    Consumo real observado, casado com as previsões feitas para os mesmos
+    timestamps na mesma região
+    """
+    timestamps: List[datetime]
+    actual: List[float]
+    region: Optional[str] = None
+
+    @root_validator(skip_on_failure=True)
+    def check_lengths(cls, values):
+        if len(values['timestamps']) != len(values['actual']):
+            raise ValueError("timestamps and actual must have the same length")
+        if len(values['timestamps']) > MAX_BATCH_SIZE:
+            raise ValueError(f"At most {MAX_BATCH_SIZE} values per request")
+        return values
+
+@router.post("/predictions/actuals")
+async def record_actuals(actuals: ActualsRequest):
+    """
+    Registra valores reais; retorna quantos casaram com previsões pendentes
+    """
+    matched = performance_tracker.record_actuals(
+        actuals.region or TRACKER_REGION, [epoch_seconds(timestamp) for timestamp in actuals.timestamps], actuals.actual)
+    return {"received": len(actuals.actual), "matched": matched}
+
+@router.get("/predictions/performance")
+async def get_performance():
+    """
+    Erro, drift e saúde do fluxo de previsões nas janelas atuais
+    """
+    return performance_tracker.evaluate_system_performance()
+
+class ModelActivation(BaseModel):
+    version: str
+
+@router.get("/models")
+async def get_models():
+    """
+    Versões carregadas neste worker
+    """
+    return {"loaded": energy_predictor.versions()}
+
+@router.post("/models/{name}/activate")
+async def activate_model(name: str, activation: ModelActivation):
+    """
+    Ativa uma versão no registro e troca o modelo sem reiniciar o worker;
+    os demais workers trocam no próximo refresh
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        version = await loop.run_in_executor(None, energy_predictor.activate, name, activation.version)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"name": name, "version": version}
@@ -0,0 +1,328 @@
+import os
+import glob
+import hashlib
+import time
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Tuple
+
+from etl_pipeline import ETLPipeline, NumericTransformer, CategoryVocabulary
+from etl_manifest import SourceManifest, config_hash
+
+logger = logging.getLogger('batch_executor')
+
+SUPPORTED_EXTENSIONS = ('.csv', '.xlsx', '.xls', '.json', '.jsonl', '.ndjson', '.parquet',
+                        '.feather', '.arrow', '.ipc')
+
+
+def discover_sources(source: str, pattern: str = '*') -> List[str]:
+    """List the data files of a directory (recursively) or of a glob expression"""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '**', pattern), recursive=True)
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(path for path in paths
+                  if os.path.isfile(path) and path.endswith(SUPPORTED_EXTENSIONS))
+
+
+def _partition_path(source_path: str, source_root: str, destination: str, format_type: str) -> str:
+    """Mirror the source layout under destination, one output partition per file.
+
+    A hash of the relative source path keeps sources that only differ by
+    extension (x.csv and x.json) from sharing an output.
+    """
+    relative = os.path.relpath(source_path, source_root)
+    stem = os.path.splitext(relative)[0]
+    digest = hashlib.sha256(relative.replace(os.sep, '/').encode()).hexdigest()[:8]
+    return os.path.join(destination, f"{stem}-{digest}.{format_type}")
+
+
+def _fit_file(source_path: str, config_path: Optional[str], chunksize: Optional[int]) -> Dict[str, Any]:
+    """Fit the transformation statistics of one file in a worker process"""
+    return ETLPipeline(config_path).fit_transformation_stats(source_path, chunksize)
+
+
+def _process_file(source_path: str, output_path: str, config_path: Optional[str],
+                  chunksize: Optional[int], max_retries: int, retry_delay: float,
+                  transformations: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Run the ETL pipeline for one file in a worker process, retrying transient errors"""
+    attempts = 0
+    started = time.perf_counter()
+    while True:
+        attempts += 1
+        try:
+            # The parent process owns the manifest and the fitted statistics,
+            # workers always process and only apply them
+            pipeline = ETLPipeline(config_path)
+            pipeline.config['transformations'].update(transformations or {})
+            result = pipeline.process_raw_data(source_path, output_path,
+                                               chunksize=chunksize, incremental=False)
+        except Exception as e:
+            result = {'status': 'error', 'message': str(e)}
+
+        # Validation failures are deterministic, retrying would not help
+        if result['status'] == 'success' or 'details' in result or attempts > max_retries:
+            break
+        time.sleep(retry_delay * attempts)
+
+    result['source_path'] = source_path
+    result['attempts'] = attempts
+    result['duration_seconds'] = time.perf_counter() - started
+    return result
+
+
+def merge_validation_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine per-file validation reports into one report for the whole batch"""
+    schema = {'is_valid': True, 'errors': []}
+    missing_values: Dict[str, int] = {}
+    outliers: Dict[str, int] = {}
+    duplicates = 0
+    rows = 0
+    weighted_score = 0.0
+    missing_cells = 0
+    total_cells = 0
+    column_missing: Dict[str, float] = {}
+    column_rows: Dict[str, int] = {}
+
+    for result in results:
+        validation = result.get('validation_results') or result.get('details')
+        if not validation:
+            continue
+        source = result.get('source_path', '')
+
+        if not validation['schema']['is_valid']:
+            schema['is_valid'] = False
+        schema['errors'].extend(f"{source}: {error}" for error in validation['schema']['errors'])
+
+        completeness = validation['completeness']
+        n_columns = len(completeness['column_completeness'])
+        n_rows = completeness['total_cells'] // n_columns if n_columns else 0
+        rows += n_rows
+        missing_cells += completeness['missing_cells']
+        total_cells += completeness['total_cells']
+        for col, value in completeness['column_completeness'].items():
+            column_missing[col] = column_missing.get(col, 0.0) + (1.0 - value) * n_rows
+            column_rows[col] = column_rows.get(col, 0) + n_rows
+
+        weighted_score += validation['quality']['quality_score'] * n_rows
+        for issue in validation['quality']['issues']:
+            if issue['type'] == 'missing_values':
+                for col, count in issue['details'].items():
+                    missing_values[col] = missing_values.get(col, 0) + count
+            elif issue['type'] == 'duplicates':
+                duplicates += issue['count']
+            elif issue['type'] == 'outliers':
+                outliers[issue['column']] = outliers.get(issue['column'], 0) + issue['count']
+
+    issues = []
+    if missing_values:
+        issues.append({'type': 'missing_values', 'details': missing_values})
+    if duplicates:
+        # Duplicates are counted within each file, not across files
+        issues.append({'type': 'duplicates', 'count': duplicates})
+    for col, count in outliers.items():
+        issues.append({'type': 'outliers', 'column': col, 'count': count})
+
+    return {
+        'schema': schema,
+        'quality': {
+            'quality_score': weighted_score / rows if rows > 0 else 1.0,
+            'issues': issues
+        },
+        'completeness': {
+            'overall_completeness': 1.0 - (missing_cells / total_cells) if total_cells > 0 else 0,
+            'column_completeness': {
+                col: 1.0 - column_missing[col] / column_rows[col] if column_rows[col] > 0 else 0
+                for col in column_missing
+            },
+            'missing_cells': int(missing_cells),
+            'total_cells': int(total_cells)
+        }
+    }
+
+
+class BatchETLExecutor:
+    """Fan the files of a directory or glob out across a process pool.
+
+    Each file runs through its own ETLPipeline and is written as one partition
+    under the destination, mirroring the source layout. A failing file is
+    retried and then reported without affecting the others. Numeric statistics
+    and the category vocabulary are fitted once over all files and saved
+    before any file is transformed, so every partition is scaled and encoded
+    alike and workers never write the shared files.
+    """
+
+    def __init__(self, config_path: Optional[str] = None, max_workers: Optional[int] = None,
+                 max_retries: Optional[int] = None, chunksize: Optional[int] = None):
+        self.config_path = config_path
+        self.config = ETLPipeline(config_path).config
+        batch_config = self.config['batch']
+        self.max_workers = max_workers or batch_config.get('max_workers') or os.cpu_count() or 1
+        self.max_retries = max_retries if max_retries is not None else batch_config.get('max_retries', 2)
+        self.retry_delay = batch_config.get('retry_delay', 1.0)
+        self.pattern = batch_config.get('pattern', '*')
+        self.chunksize = chunksize
+
+    def _submit_args(self, source_path: str, source_root: str, destination: str,
+                     transformations: Dict[str, Any]) -> tuple:
+        format_type = self.config['output'].get('format', 'csv')
+        output_path = _partition_path(source_path, source_root, destination, format_type)
+        return (source_path, output_path, self.config_path, self.chunksize,
+                self.max_retries, self.retry_delay, transformations)
+
+    def _map(self, pool: Optional[ProcessPoolExecutor], fn, args: Dict[str, tuple]) -> Dict[str, Any]:
+        """Run fn for every path, in the pool if there is one; failures map to exceptions"""
+        if pool is None:
+            results = {}
+            for path, path_args in args.items():
+                try:
+                    results[path] = fn(*path_args)
+                except Exception as e:
+                    results[path] = e
+            return results
+        futures = {pool.submit(fn, *path_args): path for path, path_args in args.items()}
+        results = {}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                results[futures[future]] = e
+        return results
+
+    def _fit_global(self, pool: Optional[ProcessPoolExecutor], sources: List[str], destination: str,
+                    recorded: Optional[List[Dict[str, Any]]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Fit statistics over all sources, save them and return the worker overrides.
+
+        recorded holds the numeric statistics of sources processed by earlier
+        incremental runs, which are merged with those fitted now. The numeric
+        statistics fitted on each source are returned with the overrides.
+        """
+        transformations = self.config['transformations']
+        normalize = transformations.get('apply_normalization', True)
+        one_hot = transformations.get('apply_one_hot_encoding', True)
+        if not sources or not (normalize or one_hot):
+            return {}, {}
+
+        stats_path = (transformations.get('numeric_stats_path')
+                      or os.path.join(destination, 'numeric_stats.json'))
+        vocabulary_path = (transformations.get('category_vocabulary_path')
+                           or os.path.join(destination, 'category_vocabulary.json'))
+        # Persisted statistics are reused as they are, as in ETLPipeline; an
+        # incremental run instead merges the new and changed sources into the
+        # statistics of the sources it processed before
+        incremental = self.config['incremental'].get('enabled', False)
+        reuse = bool(transformations.get('numeric_stats_path')) and not incremental
+        fit_numeric = normalize and not (reuse and os.path.exists(stats_path))
+
+        fits = self._map(pool, _fit_file, {path: (path, self.config_path, self.chunksize) for path in sources})
+        numeric = NumericTransformer()
+        for stats in recorded or []:
+            numeric.merge(NumericTransformer.from_dict(stats))
+        fitted: Dict[str, Any] = {}
+        categories: Dict[str, set] = {}
+        for path, fit in fits.items():
+            if isinstance(fit, Exception):
+                # The file fails again, and is reported, when it is processed
+                logger.error(f"Fitting statistics failed for {path}: {fit}")
+                continue
+            fitted[path] = fit['numeric']
+            numeric.merge(NumericTransformer.from_dict(fit['numeric']))
+            for col, values in fit['categories'].items():
+                categories.setdefault(col, set()).update(values)
+
+        overrides = {'fit_statistics': False}
+        if fit_numeric:
+            numeric.save(stats_path)
+            logger.info(f"Saved numeric statistics fitted on {len(sources)} files to {stats_path}")
+        if normalize:
+            overrides['numeric_stats_path'] = stats_path
+        if one_hot:
+            vocabulary = (CategoryVocabulary.load(vocabulary_path) if os.path.exists(vocabulary_path)
+                          else CategoryVocabulary())
+            max_categories = transformations.get('one_hot_max_categories', 10)
+            for col, values in categories.items():
+                vocabulary.fit_one_hot(col, values, max_categories)
+            vocabulary.save(vocabulary_path)
+            overrides['category_vocabulary_path'] = vocabulary_path
+        return overrides, fitted
+
+    def run(self, source: str, destination: Optional[str] = None) -> Dict[str, Any]:
+        """Process every file of source and return the merged batch report"""
+        destination = destination or self.config['output']['destination']
+        sources = discover_sources(source, self.pattern)
+        if os.path.isdir(source):
+            source_root = source
+        else:
+            source_root = os.path.commonpath([os.path.dirname(path) for path in sources]) if sources else ''
+
+        started = time.perf_counter()
+        results = []
+
+        # Reuse the outputs of sources the manifest shows unchanged
+        manifest = None
+        pending = sources
+        recorded = None
+        if self.config['incremental'].get('enabled', False):
+            manifest = SourceManifest(self.config['incremental']['manifest_path'])
+            current_config_hash = config_hash(self.config)
+            pending = []
+            for path in sources:
+                entry = manifest.lookup(path, current_config_hash)
+                if entry is None:
+                    pending.append(path)
+                else:
+                    results.append(SourceManifest.skipped_result(path, entry))
+            logger.info(f"Skipping {len(results)} unchanged files")
+            recorded = manifest.numeric_stats(current_config_hash, exclude=pending)
+
+        logger.info(f"Processing {len(pending)} files with {self.max_workers} workers")
+        pool = ProcessPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+        try:
+            transformations, fitted = self._fit_global(pool, pending, destination, recorded)
+            processed = self._map(pool, _process_file, {
+                path: self._submit_args(path, source_root, destination, transformations)
+                for path in pending
+            })
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        for path, result in processed.items():
+            if isinstance(result, Exception):
+                # A crashed worker only fails its own file
+                logger.error(f"Worker failed for {path}: {result}")
+                result = {'status': 'error', 'message': str(result), 'source_path': path}
+            results.append(result)
+
+        results.sort(key=lambda result: result['source_path'])
+        skipped = [result for result in results if result['status'] == 'skipped']
+        succeeded = [result for result in results if result['status'] == 'success']
+        failed = [result for result in results if result['status'] not in ('success', 'skipped')]
+        if manifest is not None:
+            for result in succeeded:
+                manifest.record(result['source_path'], current_config_hash, result,
+                                numeric_stats=fitted.get(result['source_path']))
+            manifest.save()
+        for result in failed:
+            logger.error(f"Failed to process {result['source_path']}: {result['message']}")
+
+        return {
+            'status': 'success' if not failed else ('partial' if succeeded or skipped else 'error'),
+            'files_total': len(sources),
+            'files_succeeded': len(succeeded),
+            'files_skipped': len(skipped),
+            'files_failed': len(failed),
+            'rows_processed': sum(result['rows_processed'] for result in succeeded),
+            'output_paths': [result['output_path'] for result in succeeded + skipped],
+            'failures': [{'source_path': result['source_path'], 'message': result['message'],
+                          'attempts': result.get('attempts', 1)} for result in failed],
+            'validation_results': merge_validation_results(results),
+            'duration_seconds': time.perf_counter() - started
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    executor = BatchETLExecutor()
+    result = executor.run("dados/consumo_energia/", "dados/processed/consumo_energia/")
+    print(json.dumps(result, indent=2, default=str))
@@ -0,0 +1,455 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import importlib.util
+import platform
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Callable, Dict, List, Any, Iterator, Optional
+
+from instrumentation import StageRecorder, reset_peak_rss, peak_rss_bytes
+
+# Acima disso o ETL roda em streaming e o DataProcessor recebe os dados em blocos
+IN_MEMORY_MAX_ROWS = 2_000_000
+GENERATOR_CHUNK_ROWS = 1_000_000
+
+REGIONS = ['centro', 'norte', 'sul', 'leste', 'oeste', 'metropolitana', 'entorno_df', 'sudoeste']
+
+# Métricas em que um valor maior é melhor; nas demais (tempos, memória) menor é melhor
+HIGHER_IS_BETTER = ('_per_second',)
+
+
+def parse_scale(value: str) -> int:
+    """
+    '10k', '1M', '100M' ou um número de linhas
+    """
+    units = {'k': 1_000, 'm': 1_000_000, 'g': 1_000_000_000}
+    value = value.strip().lower()
+    if value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def generate_consumption(rows: int, seed: int = 0, start: str = '2023-01-01',
+                         offset: int = 0) -> pd.DataFrame:
+    """
+    Leituras sintéticas de consumo com clima: uma leitura por medidor a cada
+    15 minutos, com ciclo diário, efeito da temperatura e ruído
+    """
+    rng = np.random.default_rng(seed + offset)
+    index = np.arange(offset, offset + rows)
+    n_meters = 1000
+    timestamps = pd.Timestamp(start) + pd.to_timedelta((index // n_meters) * 15, unit='min')
+    hours = timestamps.hour.to_numpy() + timestamps.minute.to_numpy() / 60
+    day_of_year = timestamps.dayofyear.to_numpy()
+
+    temperature = 24 + 6 * np.sin(2 * np.pi * (hours - 9) / 24) \
+        + 3 * np.sin(2 * np.pi * day_of_year / 365) + rng.normal(0, 1.5, rows)
+    humidity = np.clip(65 - 1.5 * (temperature - 24) + rng.normal(0, 5, rows), 10, 100)
+    weekday = timestamps.dayofweek.to_numpy()
+    day_type = np.where(weekday >= 5, 'weekend', 'weekday').astype(object)
+    day_type[rng.random(rows) < 0.01] = 'holiday'
+    meter = index % n_meters
+    consumption = (80 + 40 * np.sin(2 * np.pi * (hours - 14) / 24) + 2.5 * np.maximum(temperature - 22, 0)
+                   + (meter % 17) * 3 + rng.gamma(2.0, 4.0, rows))
+
+    return pd.DataFrame({
+        'timestamp': timestamps.strftime('%Y-%m-%d %H:%M:%S'),
+        'meter_id': meter.astype(np.int64),
+        'region': np.array(REGIONS, dtype=object)[meter % len(REGIONS)],
+        'consumption': consumption,
+        'temperature': temperature,
+        'humidity': humidity,
+        'dayType': day_type
+    })
+
+
+def iter_consumption_chunks(rows: int, seed: int = 0,
+                            chunk_rows: int = GENERATOR_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Os mesmos dados de generate_consumption em blocos, para escalas que não cabem na memória
+    """
+    for offset in range(0, rows, chunk_rows):
+        yield generate_consumption(min(chunk_rows, rows - offset), seed, offset=offset)
+
+
+def write_dataset(path: str, rows: int, seed: int = 0) -> str:
+    """
+    Grava o conjunto sintético em CSV, bloco a bloco
+    """
+    for i, chunk in enumerate(iter_consumption_chunks(rows, seed)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
+
+
+def _percentiles(durations: List[float]) -> Dict[str, float]:
+    values = np.asarray(durations) * 1000
+    return {
+        'latency_p50_ms': float(np.percentile(values, 50)),
+        'latency_p95_ms': float(np.percentile(values, 95)),
+        'latency_p99_ms': float(np.percentile(values, 99)),
+        'latency_max_ms': float(values.max())
+    }
+
+
+def _timed_request(send: Callable[[], Any]) -> float:
+    """
+    Duração de uma requisição; uma resposta de erro não pode entrar como um resultado rápido
+    """
+    start = time.perf_counter()
+    response = send()
+    seconds = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path} "
+                           f"returned {response.status_code}: {response.text[:200]}")
+    return seconds
+
+
+def bench_etl(workdir: str, source: str, rows: int) -> Dict[str, Any]:
+    """
+    Tempo, vazão e pico de memória de cada etapa do ETLPipeline
+    """
+    from etl_pipeline import ETLPipeline
+
+    pipeline = ETLPipeline()
+    chunksize = pipeline.config['streaming']['chunksize'] if rows > IN_MEMORY_MAX_ROWS else None
+    start = time.perf_counter()
+    result = pipeline.process_raw_data(source, os.path.join(workdir, 'etl_output') + os.sep, chunksize)
+    seconds = time.perf_counter() - start
+    if result['status'] != 'success':
+        raise RuntimeError(f"ETL benchmark failed: {result.get('message')}")
+
+    metrics = {'seconds': seconds, 'rows_per_second': rows / seconds,
+               'mode': 'streaming' if chunksize else 'in_memory'}
+    for stage, stats in result['stage_metrics'].items():
+        metrics[f'{stage}_seconds'] = stats['seconds']
+        if stats['rows_per_second'] is not None:
+            metrics[f'{stage}_rows_per_second'] = stats['rows_per_second']
+        if stats['peak_rss_bytes'] is not None:
+            metrics[f'{stage}_peak_rss_bytes'] = stats['peak_rss_bytes']
+    return metrics
+
+
+def bench_data_processor(rows: int, seed: int) -> Dict[str, Any]:
+    """
+    DataProcessor.process_energy_data em blocos de até IN_MEMORY_MAX_ROWS linhas
+    """
+    from data_processor import DataProcessor
+
+    processor = DataProcessor()
+    recorder = StageRecorder('benchmark')
+    durations = []
+    for chunk in iter_consumption_chunks(rows, seed, min(rows, IN_MEMORY_MAX_ROWS)):
+        with recorder.stage('process', rows=len(chunk)) as stats:
+            start = time.perf_counter()
+            processor.process_energy_data(chunk)
+            durations.append(time.perf_counter() - start)
+    stats = recorder.stages['process'].to_dict()
+    return dict({'seconds': stats['seconds'], 'rows_per_second': stats['rows_per_second'],
+                 'peak_rss_bytes': stats['peak_rss_bytes']}, **_percentiles(durations))
+
+
+class LinearConsumptionModel:
+    """
+    Modelo linear sintético com a interface predict dos modelos do registro
+    """
+
+    def __init__(self, n_features: int, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.coef_ = rng.normal(size=n_features)
+        self.intercept_ = 100.0
+        self.n_features_in_ = n_features
+
+    def predict(self, matrix: np.ndarray) -> np.ndarray:
+        return matrix @ self.coef_ + self.intercept_
+
+
+def _load_routes(workdir: str, seed: int) -> Any:
+    """
+    Cópia isolada do módulo de rotas ligada a um registro e um histórico temporários.
+
+    O módulo lê a configuração do ambiente ao ser importado, então as variáveis
+    são definidas só durante o carregamento desta cópia, que não toca o módulo
+    já importado pela aplicação nem o histórico ou o cache configurados no host.
+    """
+    from model_registry import ModelRegistry
+
+    registry_path = os.path.join(workdir, 'models')
+    ModelRegistry(registry_path).save('consumption', LinearConsumptionModel(4, seed), {'n_features': 4})
+    overrides = {
+        'PREDICTION_STORE_URL': f"sqlite:///{os.path.join(workdir, 'predictions.db')}",
+        'MODEL_REGISTRY_PATH': registry_path,
+        'MODEL_REFRESH_SECONDS': '0',
+        'PREDICTION_CACHE_SQLITE_PATH': None,
+        'FEATURE_STORE_PATH': os.path.join(workdir, 'features')
+    }
+    previous = {name: os.environ.get(name) for name in overrides}
+    try:
+        for name, value in overrides.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api', 'routes', 'predictions.py')
+        spec = importlib.util.spec_from_file_location('_benchmark_predictions', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+    return module
+
+
+def bench_api(workdir: str, requests: int, batch_rows: int, seed: int) -> Dict[str, Any]:
+    """
+    Endpoints de previsão num cliente ASGI no mesmo processo (sem rede), servindo
+    um modelo sintético gravado num registro temporário
+    """
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    predictions = _load_routes(workdir, seed)
+    app = FastAPI()
+    app.include_router(predictions.router, prefix='/api/v1')
+    app.router.on_startup.extend([predictions.load_models, predictions.start_history])
+    app.router.on_shutdown.extend([predictions.shutdown_models, predictions.stop_history])
+
+    data = generate_consumption(max(requests, batch_rows), seed)
+    metrics: Dict[str, Any] = {}
+    reset_peak_rss()
+    with TestClient(app) as client:
+        if not predictions.energy_predictor.is_loaded:
+            raise RuntimeError("Synthetic model was not loaded")
+        durations = []
+        for row in data.head(requests).itertuples(index=False):
+            body = {'timestamp': row.timestamp.replace(' ', 'T'),
+                    'features': {'temperature': row.temperature, 'humidity': row.humidity,
+                                 'dayType': row.dayType, 'seasonality': 1.0}}
+            durations.append(_timed_request(lambda: client.post('/api/v1/predictions', json=body)))
+        metrics.update({f'single_{key}': value for key, value in _percentiles(durations).items()})
+        metrics['single_requests_per_second'] = len(durations) / sum(durations)
+
+        batch = data.head(batch_rows)
+        body = {'timestamps': [value.replace(' ', 'T') for value in batch['timestamp']],
+                'temperature': batch['temperature'].tolist(), 'humidity': batch['humidity'].tolist(),
+                'dayType': batch['dayType'].tolist(), 'seasonality': [1.0] * len(batch)}
+        for name, accept in (('json', 'application/json'), ('ndjson', 'application/x-ndjson'),
+                             ('arrow', 'application/vnd.apache.arrow.stream')):
+            seconds = _timed_request(lambda: client.post('/api/v1/predictions/batch', json=body,
+                                                         headers={'accept': accept}))
+            metrics[f'batch_{name}_seconds'] = seconds
+            metrics[f'batch_{name}_rows_per_second'] = batch_rows / seconds
+
+        durations = [_timed_request(lambda: client.get('/api/v1/predictions/history',
+                                                       params={'limit': 1000}))
+                     for _ in range(20)]
+        metrics.update({f'history_{key}': value for key, value in _percentiles(durations).items()})
+    metrics['peak_rss_bytes'] = peak_rss_bytes()
+    return metrics
+
+
+def build_flatted_graph(nodes: int) -> Dict[str, Any]:
+    """
+    Payload circular no formato do dashboard: cada nó aponta para a raiz, para o
+    nó anterior e para um grupo compartilhado, e repete rótulos (strings internadas)
+    """
+    root: Dict[str, Any] = {'name': 'dashboard', 'nodes': []}
+    groups = [{'name': f'grupo-{i}', 'root': root} for i in range(100)]
+    previous = root
+    for i in range(nodes):
+        node = {'id': i, 'label': f'medidor-{i % 1000}', 'region': 'goias', 'root': root,
+                'previous': previous, 'group': groups[i % len(groups)], 'values': [i, i * 0.5]}
+        root['nodes'].append(node)
+        previous = node
+    root['groups'] = groups
+    return root
+
+
+def bench_flatted(nodes: int, repeat: int = 3) -> Dict[str, Any]:
+    """
+    flatted.stringify/parse sobre um grafo circular de nodes nós
+    """
+    import flatted
+
+    graph = build_flatted_graph(nodes)
+    reset_peak_rss()
+    stringify_runs, parse_runs = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = flatted.stringify(graph)
+        stringify_runs.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        parsed = flatted.parse(payload)
+        parse_runs.append(time.perf_counter() - start)
+        # Os ciclos precisam sobreviver à ida e volta
+        if parsed['nodes'][-1]['root'] is not parsed or \
+                (nodes > 1 and parsed['nodes'][1]['previous'] is not parsed['nodes'][0]):
+            raise RuntimeError("flatted round trip lost the graph's references")
+    stringify_seconds = float(np.median(stringify_runs))
+    parse_seconds = float(np.median(parse_runs))
+    return {
+        'nodes': nodes,
+        'bytes': len(payload),
+        'stringify_seconds': stringify_seconds,
+        'parse_seconds': parse_seconds,
+        'stringify_nodes_per_second': nodes / stringify_seconds,
+        'parse_nodes_per_second': nodes / parse_seconds,
+        'stringify_bytes_per_second': len(payload) / stringify_seconds,
+        'peak_rss_bytes': peak_rss_bytes()
+    }
+
+
+BENCHMARKS = ('etl', 'data_processor', 'api', 'flatted')
+
+
+def run_benchmarks(rows: int, seed: int = 0, only: Optional[List[str]] = None,
+                   api_requests: int = 200, api_batch_rows: Optional[int] = None,
+                   flatted_nodes: Optional[int] = None, workdir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Executa os benchmarks numa pasta temporária e retorna os resultados
+    """
+    selected = only or list(BENCHMARKS)
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix='energia_bench_')
+    results: Dict[str, Any] = {
+        'meta': {
+            'rows': rows,
+            'seed': seed,
+            'created_at': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__
+        },
+        'benchmarks': {}
+    }
+    try:
+        if 'etl' in selected:
+            source = write_dataset(os.path.join(workdir, 'consumption.csv'), rows, seed)
+            results['meta']['source_bytes'] = os.path.getsize(source)
+            results['benchmarks']['etl'] = bench_etl(workdir, source, rows)
+        if 'data_processor' in selected:
+            results['benchmarks']['data_processor'] = bench_data_processor(rows, seed)
+        if 'api' in selected:
+            results['benchmarks']['api'] = bench_api(workdir, api_requests,
+                                                     api_batch_rows or min(rows, 100_000), seed)
+        if 'flatted' in selected:
+            results['benchmarks']['flatted'] = bench_flatted(flatted_nodes or min(rows, 100_000))
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def baseline_mismatch(results: Dict[str, Any], baseline: Dict[str, Any]) -> Optional[str]:
+    """
+    Motivo pelo qual a baseline não é comparável (outra escala), ou None
+    """
+    if baseline['meta'].get('rows') != results['meta']['rows']:
+        return f"Baseline has {baseline['meta'].get('rows')} rows, this run {results['meta']['rows']}"
+    return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Métricas que pioraram mais que tolerance (fração) em relação à baseline
+    """
+    regressions = []
+    for name, metrics in baseline['benchmarks'].items():
+        current = results['benchmarks'].get(name)
+        if current is None:
+            continue
+        for metric, expected in metrics.items():
+            actual = current.get(metric)
+            if not isinstance(expected, (int, float)) or not isinstance(actual, (int, float)) \
+                    or expected <= 0 or metric in ('nodes', 'bytes'):
+                continue
+            if metric.endswith(HIGHER_IS_BETTER):
+                change = (expected - actual) / expected
+            else:
+                change = (actual - expected) / expected
+            if change > tolerance:
+                regressions.append({'benchmark': name, 'metric': metric, 'baseline': expected,
+                                    'current': actual, 'change': change})
+    return regressions
+
+
+class PerformanceBenchmarks:
+    """
+    Benchmarks como parte do TestSuite: grava os resultados e falha se houver
+    regressão além da tolerância em relação à baseline
+    """
+
+    def __init__(self, scale: str = '100k', baseline_path: Optional[str] = None,
+                 output_path: Optional[str] = None, tolerance: float = 0.2, seed: int = 0):
+        self.rows = parse_scale(scale)
+        self.baseline_path = baseline_path or os.getenv('BENCHMARK_BASELINE')
+        self.output_path = output_path
+        self.tolerance = tolerance
+        self.seed = seed
+        self.results: Dict[str, Any] = {}
+        self.regressions: List[Dict[str, Any]] = []
+
+    def run(self) -> bool:
+        self.results = run_benchmarks(self.rows, self.seed)
+        if self.output_path:
+            with open(self.output_path, 'w') as f:
+                json.dump(self.results, f, indent=2)
+        if self.baseline_path and os.path.exists(self.baseline_path):
+            with open(self.baseline_path) as f:
+                baseline = json.load(f)
+            mismatch = baseline_mismatch(self.results, baseline)
+            if mismatch:
+                raise ValueError(mismatch)
+            self.regressions = compare(self.results, baseline, self.tolerance)
+        return not self.regressions
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks de ETL, transformações, API e serialização')
+    parser.add_argument('--scale', default='100k', help='linhas sintéticas: 10k, 1M, 100M...')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS)
+    parser.add_argument('--api-requests', type=int, default=200)
+    parser.add_argument('--flatted-nodes', type=int, help='nós do grafo do flatted (padrão: min(linhas, 100k))')
+    parser.add_argument('--output', help='arquivo JSON dos resultados')
+    parser.add_argument('--baseline', help='resultados de referência; falha se houver regressão')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='piora máxima aceita em relação à baseline (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(parse_scale(args.scale), args.seed, args.only, args.api_requests,
+                             flatted_nodes=args.flatted_nodes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    print(json.dumps(results['benchmarks'], indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatch = baseline_mismatch(results, baseline)
+        if mismatch:
+            print(mismatch)
+            return 2
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']}.{regression['metric']}: "
+                  f"{regression['baseline']:.4g} -> {regression['current']:.4g} "
+                  f"({regression['change']:+.0%})")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
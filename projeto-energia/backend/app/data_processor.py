@@ -1,23 +1,28 @@
-from typing import Dict, List
+from typing import Dict, List, Any, Optional
 import pandas as pd
 
+from etl_pipeline import NumericTransformer, CategoricalTransformer, TemporalFeatureExtractor, CategoryVocabulary
+from transform_engine import FusedTransformEngine
+
 class DataProcessor:
-    def __init__(self):
+    def __init__(self, vocabulary_path: Optional[str] = None):
+        # Vocabulário de categorias gravado pelo ETL, para códigos iguais aos do treino
+        vocabulary = CategoryVocabulary.load(vocabulary_path) if vocabulary_path else None
         self.transformers = {
             'numeric': NumericTransformer(),
-            'categorical': CategoricalTransformer(),
+            'categorical': CategoricalTransformer(vocabulary),
             'temporal': TemporalFeatureExtractor()
         }
+        # Executa temporal -> numeric -> categorical numa única passada
+        self.engine = FusedTransformEngine(numeric_transformer=self.transformers['numeric'],
+                                           vocabulary=vocabulary)
+        self.last_report: Dict[str, Any] = {}
     
     def process_energy_data(self, raw_data: pd.DataFrame) -> pd.DataFrame:
         """
         Processa dados brutos de consumo energético
         """
-        processed_data = (
-            raw_data
-            .pipe(self.transformers['temporal'].extract_features)
-            .pipe(self.transformers['numeric'].normalize)
-            .pipe(self.transformers['categorical'].encode)
-        )
+        processed_data = self.engine.transform(raw_data)
+        self.last_report = self.engine.last_report
         
-        return processed_data 
\ No newline at end of file
+        return processed_data
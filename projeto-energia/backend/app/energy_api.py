@@ -1,8 +1,28 @@
-from fastapi import FastAPI, HTTPException
+import os
+import asyncio
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
+from datetime import datetime
 from typing import List, Optional
 
+from rollups import LEVELS, RollupStore
+from response_encoding import stream_frame
+from instrumentation import MetricsMiddleware
+from prediction_cache import PredictionCache, cache_key
+
 app = FastAPI(title="API de Análise Energética")
+app.add_middleware(MetricsMiddleware)
+
+# Agregados de consumo mantidos pelo ETL (rollups horário -> diário -> mensal por região)
+rollup_store = RollupStore(os.getenv('ROLLUP_DB_URL', 'sqlite:///processed_data/rollups.db'))
+
+# Respostas de /consumption/aggregates; a chave inclui a versão do rollup da
+# métrica, então uma carga do ETL nunca serve agregados antigos. O cache fica
+# só em memória e guarda os próprios DataFrames, com os tipos das colunas
+AGGREGATES_CACHE_MAX_ENTRIES = int(os.getenv('AGGREGATES_CACHE_MAX_ENTRIES', '1000'))
+AGGREGATES_CACHE_TTL_SECONDS = float(os.getenv('AGGREGATES_CACHE_TTL_SECONDS', '300'))
+aggregates_cache = PredictionCache(AGGREGATES_CACHE_MAX_ENTRIES, AGGREGATES_CACHE_TTL_SECONDS,
+                                   name='consumption_aggregates')
 
 class PredictionRequest(BaseModel):
     region: str
@@ -21,4 +41,38 @@ async def predict_consumption(request: PredictionRequest):
         )
         return predictions
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
+
+@app.get("/consumption/aggregates")
+async def consumption_aggregates(
+    request: Request,
+    metric: str = "consumption",
+    granularity: str = "daily",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    region: Optional[str] = None
+):
+    """
+    Consumo agregado por região e intervalo em [start_date, end_date),
+    lido do rollup mais grosso que atende a granularidade e o período e
+    guardado em cache até a próxima atualização do rollup;
+    JSON, NDJSON ou Arrow IPC conforme o Accept
+    """
+    if granularity not in LEVELS:
+        raise HTTPException(status_code=422, detail=f"granularity must be one of {LEVELS}")
+    # As consultas ao banco rodam no threadpool, fora do event loop
+    loop = asyncio.get_running_loop()
+    try:
+        version = await loop.run_in_executor(None, rollup_store.version, metric)
+        key = cache_key(str(version), {'metric': metric, 'granularity': granularity,
+                                       'start_date': start_date, 'end_date': end_date,
+                                       'region': region})
+        rows = await aggregates_cache.aget(key)
+        if rows is None:
+            rows = await loop.run_in_executor(
+                None, rollup_store.query, metric, granularity, start_date, end_date,
+                [region] if region else None)
+            await aggregates_cache.aset(key, rows)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return stream_frame(rows, request.headers.get('accept'))
@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, Iterable, List, Optional
+
+logger = logging.getLogger('etl_manifest')
+
+# Config sections that change how the pipeline runs but not what it produces
+_EXECUTION_ONLY_SECTIONS = ('streaming', 'batch', 'incremental')
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Stable hash of the config sections that affect the pipeline output"""
+    relevant = {key: value for key, value in config.items() if key not in _EXECUTION_ONLY_SECTIONS}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SourceManifest:
+    """Persisted record of processed source files and the outputs they produced.
+
+    A source is considered unchanged when its size and mtime match the manifest;
+    only when they differ is the content hash recomputed, so a touched but
+    identical file is still skipped without reading unchanged history.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f).get('sources', {})
+            except Exception as e:
+                logger.error(f"Error loading manifest {path}, starting empty: {e}")
+
+    @staticmethod
+    def _key(source_path: str) -> str:
+        return os.path.abspath(source_path)
+
+    def lookup(self, source_path: str, current_config_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the manifest entry if the source can be skipped, else None"""
+        entry = self.entries.get(self._key(source_path))
+        if entry is None or entry['config_hash'] != current_config_hash:
+            return None
+        if not os.path.exists(entry['output_path']):
+            return None
+
+        stat = os.stat(source_path)
+        if stat.st_size == entry['size'] and stat.st_mtime == entry['mtime']:
+            return entry
+        if stat.st_size == entry['size'] and file_hash(source_path) == entry['sha256']:
+            entry['mtime'] = stat.st_mtime
+            return entry
+        return None
+
+    def record(self, source_path: str, current_config_hash: str, result: Dict[str, Any],
+               numeric_stats: Optional[Dict[str, Any]] = None):
+        """Store the fingerprint of a successfully processed source and its own statistics"""
+        stat = os.stat(source_path)
+        self.entries[self._key(source_path)] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'sha256': file_hash(source_path),
+            'config_hash': current_config_hash,
+            'output_path': result['output_path'],
+            'rows_processed': result.get('rows_processed'),
+            'columns_processed': result.get('columns_processed'),
+            'validation_results': result.get('validation_results'),
+            'numeric_stats': numeric_stats,
+            'processed_at': datetime.now().isoformat()
+        }
+
+    def numeric_stats(self, current_config_hash: str, exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+        """Numeric statistics recorded for the processed sources, except those excluded.
+
+        Merged with those of new or changed sources, they give statistics in which
+        every source is counted once.
+        """
+        excluded = {self._key(path) for path in exclude}
+        return [entry['numeric_stats'] for key, entry in self.entries.items()
+                if key not in excluded and entry.get('numeric_stats')
+                and entry['config_hash'] == current_config_hash]
+
+    def save(self):
+        """Write the manifest atomically so an interrupted run never corrupts it"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'sources': self.entries}, f, indent=2, default=str)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def skipped_result(source_path: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Pipeline result for a source whose previous output is reused"""
+        return {
+            'status': 'skipped',
+            'message': 'Source unchanged, reusing previous output',
+            'source_path': source_path,
+            'output_path': entry['output_path'],
+            'validation_results': entry.get('validation_results'),
+            'rows_processed': entry.get('rows_processed'),
+            'columns_processed': entry.get('columns_processed')
+        }
@@ -3,8 +3,18 @@ import numpy as np
 import os
 import json
 import logging
-from typing import Dict, List, Any, Optional, Union
-from datetime import datetime
+import operator
+import shutil
+import tempfile
+import warnings
+from typing import Dict, List, Any, Optional, Union, Iterator, Tuple
+from datetime import date, datetime
+
+from etl_manifest import SourceManifest, config_hash
+from instrumentation import StageRecorder
+from schema_inference import DatetimeInferrer
+from rollups import RollupAccumulator, RollupStore
+from sketches import HyperLogLog, KLLSketch, TailSample
 
 # Configure logging
 logging.basicConfig(
@@ -122,7 +132,491 @@ class CompletenessAnalyzer:
         }
 
 
+class RowHashSpill:
+    """Exact count of distinct row hashes with bounded memory.
+
+    Hashes are buffered until max_in_memory of them are held, then written to
+    hash-partitioned files on disk. Counting loads one partition at a time and
+    splits any partition that is still too large on further hash digits, so
+    memory stays bounded whatever the size of the source.
+    """
+
+    def __init__(self, max_in_memory: int = 1000000, partitions: int = 64,
+                 directory: Optional[str] = None):
+        self.max_in_memory = max_in_memory
+        self.partitions = partitions
+        self.directory = directory
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._tempdir = None
+        self._distinct: Optional[int] = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._tempdir is not None
+
+    def add(self, hashes: np.ndarray):
+        self._buffer.append(np.asarray(hashes, dtype=np.uint64))
+        self._buffered += len(hashes)
+        self._distinct = None
+        if self._buffered > self.max_in_memory:
+            self._flush()
+
+    def _partition_path(self, root: str, index: int) -> str:
+        return os.path.join(root, f"hashes-{index:03d}.bin")
+
+    def _write_partitions(self, hashes: np.ndarray, root: str, depth: int):
+        """Append hashes to the partition files of root, keyed on the depth-th hash digit"""
+        keys = (hashes // np.uint64(self.partitions ** depth)) % np.uint64(self.partitions)
+        order = np.argsort(keys, kind='stable')
+        hashes, keys = hashes[order], keys[order]
+        bounds = np.searchsorted(keys, np.arange(self.partitions + 1, dtype=np.uint64))
+        for index in range(self.partitions):
+            part = hashes[bounds[index]:bounds[index + 1]]
+            if len(part):
+                with open(self._partition_path(root, index), 'ab') as f:
+                    part.tofile(f)
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        if self._tempdir is None:
+            self._tempdir = tempfile.TemporaryDirectory(prefix='etl-row-hashes-', dir=self.directory)
+        hashes = np.unique(np.concatenate(self._buffer))
+        self._buffer, self._buffered = [], 0
+        self._write_partitions(hashes, self._tempdir.name, 0)
+
+    def _count_file(self, path: str, depth: int) -> int:
+        """Distinct hashes of one partition file, splitting it further if too large"""
+        n_hashes = os.path.getsize(path) // 8
+        # After 64 ** 10 > 2 ** 59 partitions every hash digit is used up
+        if n_hashes <= self.max_in_memory or depth >= 10:
+            return len(np.unique(np.fromfile(path, dtype=np.uint64)))
+        root = tempfile.mkdtemp(dir=os.path.dirname(path))
+        try:
+            values = np.memmap(path, dtype=np.uint64, mode='r')
+            for start in range(0, n_hashes, self.max_in_memory):
+                self._write_partitions(np.unique(values[start:start + self.max_in_memory]), root, depth)
+            del values
+            return sum(self._count_file(self._partition_path(root, index), depth + 1)
+                       for index in range(self.partitions)
+                       if os.path.exists(self._partition_path(root, index)))
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    def distinct_count(self) -> int:
+        if not self.spilled:
+            return len(np.unique(np.concatenate(self._buffer))) if self._buffer else 0
+        if self._distinct is None:
+            self._flush()
+            self._distinct = sum(self._count_file(self._partition_path(self._tempdir.name, index), 1)
+                                 for index in range(self.partitions)
+                                 if os.path.exists(self._partition_path(self._tempdir.name, index)))
+        return self._distinct
+
+    def close(self):
+        self._buffer, self._buffered, self._distinct = [], 0, None
+        if self._tempdir is not None:
+            self._tempdir.cleanup()
+            self._tempdir = None
+
+
+class QualityScan:
+    """Mergeable partial result of one fused validation pass.
+
+    Holds everything the schema, quality and completeness reports are built
+    from, so scans of separate chunks or partitions can be merged and
+    reported as if the whole dataset had been scanned at once.
+    """
+
+    def __init__(self, approximate: bool = False, outlier_threshold: Optional[float] = None):
+        self.row_count = 0
+        self.columns: List[str] = []
+        self.schema = {'is_valid': True, 'errors': []}
+        self.null_counts: Dict[str, int] = {}
+        self.row_hashes: List[np.ndarray] = []
+        # When set, merged row hashes go to disk-backed partitions instead of row_hashes
+        self.spill: Optional[RowHashSpill] = None
+        self.stats: Dict[str, 'RunningStats'] = {}
+        self.outlier_counts: Dict[str, int] = {}
+        # Constant-memory state used instead of row hashes and outlier counts
+        self.approximate = approximate
+        self.outlier_threshold = outlier_threshold
+        self.distinct: Optional[HyperLogLog] = None
+        self.quantiles: Dict[str, KLLSketch] = {}
+        self.examples: Dict[str, TailSample] = {}
+
+    def merge(self, other: 'QualityScan') -> 'QualityScan':
+        """Combine the scan of another chunk into this one"""
+        if not self.columns:
+            self.columns = list(other.columns)
+        self.row_count += other.row_count
+
+        if not other.schema['is_valid']:
+            self.schema['is_valid'] = False
+        for error in other.schema['errors']:
+            if error not in self.schema['errors']:
+                self.schema['errors'].append(error)
+
+        for col, count in other.null_counts.items():
+            self.null_counts[col] = self.null_counts.get(col, 0) + count
+        if self.spill is not None:
+            for hashes in other.row_hashes:
+                self.spill.add(hashes)
+        else:
+            self.row_hashes.extend(other.row_hashes)
+        for col, stats in other.stats.items():
+            self.stats.setdefault(col, RunningStats()).merge(stats)
+        for col, count in other.outlier_counts.items():
+            self.outlier_counts[col] = self.outlier_counts.get(col, 0) + count
+
+        if other.approximate:
+            self.approximate = True
+            self.outlier_threshold = other.outlier_threshold
+            if self.distinct is None:
+                self.distinct = other.distinct
+            elif other.distinct is not None:
+                self.distinct.merge(other.distinct)
+            for col, sketch in other.quantiles.items():
+                if col in self.quantiles:
+                    self.quantiles[col].merge(sketch)
+                else:
+                    self.quantiles[col] = sketch
+            for col, sample in other.examples.items():
+                if col in self.examples:
+                    self.examples[col].merge(sample)
+                else:
+                    self.examples[col] = sample
+        return self
+
+    def count_outliers(self, df: pd.DataFrame, threshold: float,
+                       values: Optional[np.ndarray] = None):
+        """Count z-score outliers of df against the moments accumulated so far"""
+        columns = [col for col in self.stats if col in df.columns]
+        if not columns:
+            return
+        if values is None:
+            values = df[columns].to_numpy(dtype=float, na_value=np.nan)
+        means = np.array([self.stats[col].mean for col in columns])
+        stds = np.array([self.stats[col].std for col in columns])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            counts = (np.abs((values - means) / stds) > threshold).sum(axis=0)
+        for col, count in zip(columns, counts):
+            self.outlier_counts[col] = self.outlier_counts.get(col, 0) + int(count)
+
+    def duplicate_count(self) -> int:
+        if self.distinct is not None:
+            return max(0, int(round(self.row_count - self.distinct.estimate())))
+        if self.spill is not None:
+            return self.row_count - self.spill.distinct_count()
+        if not self.row_hashes:
+            return 0
+        return self.row_count - len(np.unique(np.concatenate(self.row_hashes)))
+
+    def _approximate_outliers(self) -> List[Dict[str, Any]]:
+        """Outlier issues estimated from the quantile sketches and reservoir samples"""
+        issues = []
+        if self.outlier_threshold is None:
+            return issues
+        for col, sketch in self.quantiles.items():
+            stats = self.stats.get(col)
+            if stats is None or not stats.std > 0:
+                continue
+            lower = stats.mean - self.outlier_threshold * stats.std
+            upper = stats.mean + self.outlier_threshold * stats.std
+            count = sketch.count_outside(lower, upper)
+            if count > 0:
+                # Picked against the global thresholds, most extreme first
+                sample = self.examples.get(col)
+                examples = sample.most_extreme(stats.mean, lower, upper) if sample else []
+                issues.append({
+                    'type': 'outliers',
+                    'column': col,
+                    'count': count,
+                    'examples': examples
+                })
+        return issues
+
+    def reports(self) -> Dict[str, Any]:
+        """Build the schema, quality and completeness reports of the validators"""
+        n_rows = self.row_count
+        total_cells = n_rows * len(self.columns)
+        missing_cells = sum(self.null_counts.values())
+
+        quality = {'quality_score': 1.0, 'issues': []}
+        if missing_cells > 0:
+            quality['quality_score'] -= missing_cells / total_cells
+            quality['issues'].append({
+                'type': 'missing_values',
+                'details': {col: count for col, count in self.null_counts.items() if count > 0}
+            })
+
+        duplicate_count = self.duplicate_count()
+        if duplicate_count > 0:
+            quality['quality_score'] -= duplicate_count / n_rows
+            quality['issues'].append({
+                'type': 'duplicates',
+                'count': int(duplicate_count)
+            })
+
+        for col, count in self.outlier_counts.items():
+            if count > 0:
+                quality['issues'].append({
+                    'type': 'outliers',
+                    'column': col,
+                    'count': count
+                })
+        quality['quality_score'] = max(0.0, min(1.0, quality['quality_score']))
+
+        if self.approximate:
+            quality['issues'].extend(self._approximate_outliers())
+            quality['approximate'] = {
+                'duplicate_relative_error': self.distinct.relative_error if self.distinct else None,
+                'quantile_rank_error': min((1.7 / sketch.k for sketch in self.quantiles.values()),
+                                           default=None)
+            }
+
+        completeness = {
+            'overall_completeness': 1.0 - (missing_cells / total_cells) if total_cells > 0 else 0,
+            'column_completeness': {
+                col: 1.0 - (self.null_counts.get(col, 0) / n_rows) if n_rows > 0 else 0
+                for col in self.columns
+            },
+            'missing_cells': int(missing_cells),
+            'total_cells': int(total_cells)
+        }
+
+        return {
+            'schema': self.schema,
+            'quality': quality,
+            'completeness': completeness
+        }
+
+
+class FusedQualityScanner:
+    """Single-pass replacement for SchemaValidator, QualityChecker and CompletenessAnalyzer.
+
+    One scan computes null counts, row hashes for duplicates, numeric moments
+    and type checks; z-score outliers are then counted on the numeric block
+    already in hand. Reports match those of the three validators.
+    """
+
+    def __init__(self, schema_validator: Optional[SchemaValidator] = None,
+                 quality_config: Optional[Dict[str, Any]] = None):
+        self.schema_validator = schema_validator or SchemaValidator()
+        self.quality_config = quality_config or {}
+        self.approximate_config = self.quality_config.get('approximate') or {}
+
+    @property
+    def approximate(self) -> bool:
+        """Whether duplicates and outliers are estimated with sketches"""
+        return bool(self.approximate_config.get('enabled', False))
+
+    @property
+    def outlier_threshold(self) -> Optional[float]:
+        """Z-score threshold if outlier detection is configured"""
+        detection = self.quality_config.get('outlier_detection')
+        if detection and detection.get('method') == 'zscore':
+            return detection['threshold']
+        return None
+
+    def scan(self, df: pd.DataFrame, count_outliers: bool = True) -> QualityScan:
+        """Scan one frame; pass count_outliers=False for chunks of a larger dataset"""
+        threshold = self.outlier_threshold
+        result = QualityScan(self.approximate, threshold)
+        result.columns = list(df.columns)
+        result.row_count = len(df)
+        result.schema = self.schema_validator.validate(df)
+
+        null_counts = df.isnull().sum()
+        result.null_counts = {col: int(count) for col, count in null_counts.items()}
+        row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        if self.approximate:
+            result.distinct = HyperLogLog(self.approximate_config.get('distinct_error', 0.01))
+            result.distinct.update(row_hashes)
+        else:
+            result.row_hashes = [np.unique(row_hashes)]
+
+        numeric_cols = list(df.select_dtypes(include=[np.number]).columns)
+        values = df[numeric_cols].to_numpy(dtype=float, na_value=np.nan)
+        counts = (~np.isnan(values)).sum(axis=0)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-null columns
+            means = np.nanmean(values, axis=0)
+            m2s = np.nansum((values - means) ** 2, axis=0)
+            mins = np.nanmin(values, axis=0)
+            maxs = np.nanmax(values, axis=0)
+        for j, col in enumerate(numeric_cols):
+            if counts[j] > 0:
+                result.stats[col] = RunningStats(int(counts[j]), float(means[j]), float(m2s[j]),
+                                                 float(mins[j]), float(maxs[j]))
+
+        if self.approximate:
+            self._sketch_numeric(result, numeric_cols, values)
+        elif count_outliers and threshold is not None:
+            result.count_outliers(df, threshold, values[:, [j for j, col in enumerate(numeric_cols)
+                                                             if col in result.stats]])
+        return result
+
+    def _sketch_numeric(self, result: QualityScan, numeric_cols: List[str], values: np.ndarray):
+        """Feed quantile sketches and keep outlier example candidates of the numeric columns"""
+        rank_error = self.approximate_config.get('quantile_error', 0.01)
+        sample_size = self.approximate_config.get('sample_size', 5)
+        seed = self.approximate_config.get('seed')
+        for j, col in enumerate(numeric_cols):
+            if col not in result.stats:
+                continue
+            column = values[:, j]
+            result.quantiles[col] = KLLSketch(rank_error, seed=seed).update(column)
+            if result.outlier_threshold is not None:
+                # The tails hold the global outliers whatever the final moments
+                result.examples[col] = TailSample(sample_size).update(column)
+
+    def validate(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """Return the schema, quality and completeness reports of df"""
+        return self.scan(df).reports()
+
+
+class RunningStats:
+    """Mergeable count/min/max/mean/variance of one numeric column.
+
+    Batches are combined with Chan's parallel update of Welford's algorithm, so
+    statistics accumulated over chunks or partitions equal those of the full data.
+    """
+
+    def __init__(self, count: int = 0, mean: float = 0.0, m2: float = 0.0,
+                 min: Optional[float] = None, max: Optional[float] = None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def update(self, values: Union[pd.Series, np.ndarray]) -> 'RunningStats':
+        """Add a batch of values, ignoring nulls"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        mean = float(values.mean())
+        batch = RunningStats(
+            count=len(values),
+            mean=mean,
+            m2=float(((values - mean) ** 2).sum()),
+            min=float(values.min()),
+            max=float(values.max())
+        )
+        return self.merge(batch)
+
+    def merge(self, other: 'RunningStats') -> 'RunningStats':
+        """Combine the statistics of another batch into this one"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (ddof=1), matching pandas"""
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(self.variance))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RunningStats':
+        return cls(**data)
+
+
 class NumericTransformer:
+    def __init__(self):
+        self.stats: Dict[str, RunningStats] = {}
+
+    @property
+    def is_fitted(self) -> bool:
+        return bool(self.stats)
+
+    def partial_fit(self, df: pd.DataFrame) -> 'NumericTransformer':
+        """Accumulate statistics of the numeric columns of one batch"""
+        for col in df.select_dtypes(include=[np.number]).columns:
+            self.stats.setdefault(col, RunningStats()).update(df[col])
+        return self
+
+    def fit(self, df: pd.DataFrame) -> 'NumericTransformer':
+        """Reset and fit statistics on a single frame"""
+        self.stats = {}
+        return self.partial_fit(df)
+
+    def merge(self, other: 'NumericTransformer') -> 'NumericTransformer':
+        """Combine statistics fitted on another partition"""
+        for col, stats in other.stats.items():
+            self.stats.setdefault(col, RunningStats()).merge(stats)
+        return self
+
+    def transform(self, df: pd.DataFrame, method: str = 'normalize') -> pd.DataFrame:
+        """Normalize or standardize numeric columns with the fitted statistics"""
+        if not self.is_fitted:
+            raise ValueError("NumericTransformer is not fitted. Call fit or partial_fit first.")
+        if method not in ('normalize', 'standardize'):
+            raise ValueError(f"Unsupported numeric transformation: {method}")
+
+        result = df.copy()
+        for col in result.select_dtypes(include=[np.number]).columns:
+            stats = self.stats.get(col)
+            if stats is None or stats.count == 0:
+                continue
+            if method == 'normalize':
+                if stats.max > stats.min:  # Avoid division by zero
+                    result[col] = (result[col] - stats.min) / (stats.max - stats.min)
+            elif stats.std > 0:  # Avoid division by zero
+                result[col] = (result[col] - stats.mean) / stats.std
+
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {col: stats.to_dict() for col, stats in self.stats.items()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NumericTransformer':
+        transformer = cls()
+        transformer.stats = {col: RunningStats.from_dict(stats) for col, stats in data.items()}
+        return transformer
+
+    def save(self, path: str) -> str:
+        """Persist fitted statistics as JSON for later batches and inference"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'NumericTransformer':
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
     def normalize(self, df: pd.DataFrame) -> pd.DataFrame:
         """Normalize numeric columns"""
         numeric_cols = df.select_dtypes(include=[np.number]).columns
@@ -150,31 +644,172 @@ class NumericTransformer:
         return result
 
 
+def _json_scalar(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+OTHER_CATEGORY = '__other__'
+
+
+class CategoryVocabulary:
+    """Persisted per-column category lists giving stable codes across batches.
+
+    A category's code is its position in the column's list. Categories are only
+    ever appended, so codes keep their meaning when later batches bring new
+    values; values missing from the vocabulary encode as -1. The JSON file is
+    meant to be shared between the ETL and the inference service.
+
+    Whether a column is one-hot encoded is decided once, when it is first
+    fitted, and stored with the number of categories given dummy columns.
+    Categories appended after that decision share the OTHER_CATEGORY dummy, so
+    an encoded column keeps the same dummy columns in every batch.
+    """
+
+    def __init__(self, categories: Optional[Dict[str, List[Any]]] = None,
+                 one_hot: Optional[Dict[str, Optional[int]]] = None):
+        self.categories: Dict[str, List[Any]] = {
+            col: list(values) for col, values in (categories or {}).items()
+        }
+        # Column -> number of leading categories with a dummy, None if not one-hot encoded
+        self.one_hot: Dict[str, Optional[int]] = dict(one_hot or {})
+
+    def __contains__(self, col: str) -> bool:
+        return col in self.categories
+
+    def extend(self, col: str, values) -> bool:
+        """Append unseen values of a column, returning whether any were added"""
+        known = self.categories.setdefault(col, [])
+        seen = set(known)
+        new = {_json_scalar(value) for value in values if value not in seen}
+        if not new:
+            return False
+        try:
+            # Sorted like pd.get_dummies, so a fresh vocabulary reproduces its columns
+            known.extend(sorted(new))
+        except TypeError:
+            known.extend(sorted(new, key=str))
+        return True
+
+    def update(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> bool:
+        """Extend the vocabulary with the values of the categorical columns"""
+        if columns is None:
+            columns = df.select_dtypes(include=['object', 'category']).columns
+        changed = False
+        for col in columns:
+            changed = self.extend(col, df[col].dropna().unique()) or changed
+        return changed
+
+    def fit_one_hot(self, col: str, values, max_categories: int) -> bool:
+        """Extend a column for one-hot encoding, deciding on its first fit whether it is encoded.
+
+        values may be truncated past max_categories distinct values, which is
+        enough to rule the column out. Returns whether the vocabulary changed.
+        """
+        if col in self.one_hot or col in self.categories:
+            if self.one_hot_size(col, max_categories) is None:
+                return False
+            changed = col not in self.one_hot
+            self.one_hot[col] = self.one_hot_size(col, max_categories)
+            return self.extend(col, values) or changed
+        values = set(values)
+        if len(values) > max_categories:
+            self.one_hot[col] = None
+            return True
+        self.extend(col, values)
+        self.one_hot[col] = len(self.categories[col])
+        return True
+
+    def one_hot_size(self, col: str, max_categories: int) -> Optional[int]:
+        """Number of categories of the column with a dummy, None if it is not one-hot encoded"""
+        if col in self.one_hot:
+            return self.one_hot[col]
+        # Vocabularies saved before decisions were stored: decide from the current size
+        if col in self.categories and len(self.categories[col]) <= max_categories:
+            return len(self.categories[col])
+        return None
+
+    def one_hot_values(self, series: pd.Series, size: int) -> pd.Series:
+        """Categorical values of a one-hot column, later categories mapped to OTHER_CATEGORY"""
+        dummies = self.categories[series.name][:size]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            series = series.astype(object)
+        known = series.isin(dummies) | series.isna()
+        values = series.where(known, OTHER_CATEGORY)
+        return values.astype(pd.CategoricalDtype(dummies + [OTHER_CATEGORY]))
+
+    def dtype(self, col: str) -> pd.CategoricalDtype:
+        return pd.CategoricalDtype(self.categories[col])
+
+    def codes(self, series: pd.Series) -> pd.Series:
+        """Stable integer codes of a column, -1 for missing or unknown values"""
+        return series.astype(self.dtype(series.name)).cat.codes
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'categories': {col: list(values) for col, values in self.categories.items()},
+            'one_hot': dict(self.one_hot)
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CategoryVocabulary':
+        if set(data) == {'categories', 'one_hot'} and isinstance(data['categories'], dict):
+            return cls(data['categories'], data['one_hot'])
+        # Plain {column: categories} file written before one-hot decisions were stored
+        return cls(data)
+
+    def save(self, path: str) -> str:
+        """Persist the vocabulary as JSON for later batches and inference"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> 'CategoryVocabulary':
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
 class CategoricalTransformer:
+    def __init__(self, vocabulary: Optional[CategoryVocabulary] = None):
+        self.vocabulary = vocabulary
+
     def encode(self, df: pd.DataFrame) -> pd.DataFrame:
         """Encode categorical columns"""
         result = df.copy()
         cat_columns = result.select_dtypes(include=['object', 'category']).columns
         
         for col in cat_columns:
-            result[col] = result[col].astype('category').cat.codes
+            if self.vocabulary is not None and col in self.vocabulary:
+                result[col] = self.vocabulary.codes(result[col])
+            else:
+                result[col] = result[col].astype('category').cat.codes
         
         return result
     
-    def one_hot_encode(self, df: pd.DataFrame, max_categories: int = 10) -> pd.DataFrame:
-        """One-hot encode categorical columns with limited cardinality"""
-        result = df.copy()
-        cat_columns = result.select_dtypes(include=['object', 'category']).columns
+    def one_hot_encode(self, df: pd.DataFrame, max_categories: int = 10,
+                       sparse: bool = False) -> pd.DataFrame:
+        """One-hot encode categorical columns with limited cardinality.
         
-        for col in cat_columns:
-            if result[col].nunique() <= max_categories:
-                # Create dummies and add to result
-                dummies = pd.get_dummies(result[col], prefix=col)
-                result = pd.concat([result, dummies], axis=1)
-                # Drop original column
-                result = result.drop(col, axis=1)
+        With a vocabulary the columns and dummies follow its stored decisions,
+        so every batch gets the same columns; categories added after a column
+        was first encoded go to its OTHER_CATEGORY dummy. sparse=True returns
+        SparseDtype dummies.
+        """
+        cat_columns = df.select_dtypes(include=['object', 'category']).columns
+        if self.vocabulary is None:
+            encoded = [col for col in cat_columns if df[col].nunique() <= max_categories]
+            values = {col: df[col] for col in encoded}
+        else:
+            sizes = {col: self.vocabulary.one_hot_size(col, max_categories) for col in cat_columns}
+            encoded = [col for col in cat_columns if sizes[col] is not None]
+            values = {col: self.vocabulary.one_hot_values(df[col], sizes[col]) for col in encoded}
         
-        return result
+        # Build all dummies first and concatenate once instead of once per column
+        dummies = [pd.get_dummies(values[col], prefix=col, sparse=sparse) for col in encoded]
+        return pd.concat([df.drop(columns=encoded)] + dummies, axis=1)
 
 
 class TemporalFeatureExtractor:
@@ -194,6 +829,421 @@ class TemporalFeatureExtractor:
         return result
 
 
+# Row filters are (column, operator, value) tuples combined with AND,
+# e.g. [('region', '==', 'norte'), ('timestamp', '>=', datetime(2024, 1, 1))]
+FilterSpec = List[Tuple[str, str, Any]]
+
+ARROW_IPC_EXTENSIONS = ('.feather', '.arrow', '.ipc')
+
+_FILTER_OPERATORS = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
+
+def _filter_literal(value: Any, field_type) -> Any:
+    """Convert a string literal, e.g. a date from a JSON config, to the field's temporal type"""
+    import pyarrow as pa
+    if field_type is None or not isinstance(value, str):
+        return value
+    if pa.types.is_timestamp(field_type):
+        timestamp = pd.Timestamp(value)
+        if field_type.tz is not None and timestamp.tzinfo is None:
+            timestamp = timestamp.tz_localize(field_type.tz)
+        elif field_type.tz is None and timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_convert(None)
+        return pa.scalar(timestamp.to_pydatetime(), type=field_type)
+    if pa.types.is_date(field_type):
+        return pa.scalar(pd.Timestamp(value).date(), type=field_type)
+    return value
+
+
+def filter_expression(filters: FilterSpec, schema=None):
+    """Translate filters into a pyarrow dataset expression for pushdown.
+    
+    With the dataset schema, string literals compared with timestamp or date
+    fields are converted to scalars of the field's type.
+    """
+    import pyarrow.dataset as ds
+    expression = None
+    for col, op, value in filters:
+        field = ds.field(col)
+        field_type = schema.field(col).type if schema is not None and col in schema.names else None
+        if op in _FILTER_OPERATORS:
+            condition = _FILTER_OPERATORS[op](field, _filter_literal(value, field_type))
+        elif op in ('in', 'not in'):
+            condition = field.isin([_filter_literal(item, field_type) for item in value])
+            if op == 'not in':
+                condition = ~condition
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _temporal_literal(value: Any, tz) -> Any:
+    """Convert a date, datetime or date string to a Timestamp in the column's timezone"""
+    if not isinstance(value, (str, date, np.datetime64)):
+        return value
+    timestamp = pd.Timestamp(value)
+    if tz is not None and timestamp.tzinfo is None:
+        return timestamp.tz_localize(tz)
+    if tz is None and timestamp.tzinfo is not None:
+        return timestamp.tz_convert(None)
+    return timestamp
+
+
+def _filter_operands(column: pd.Series, value: Any) -> Tuple[pd.Series, Any]:
+    """Make a column and a filter literal comparable.
+    
+    Text readers (CSV, JSON) leave dates as strings until the datetime
+    inference that runs after filtering, so a column compared with a date or
+    datetime literal is parsed first, unparseable values becoming NaT and
+    never matching. Literals compared with datetime columns become Timestamps.
+    """
+    items = list(value) if isinstance(value, (list, tuple, set)) else [value]
+    if (not pd.api.types.is_datetime64_any_dtype(column)
+            and any(isinstance(item, (date, np.datetime64)) for item in items)):
+        column = pd.to_datetime(column, errors='coerce')
+    if not pd.api.types.is_datetime64_any_dtype(column):
+        return column, value
+    if isinstance(value, (list, tuple, set)):
+        return column, [_temporal_literal(item, column.dt.tz) for item in value]
+    return column, _temporal_literal(value, column.dt.tz)
+
+
+def apply_filters(df: pd.DataFrame, filters: Optional[FilterSpec]) -> pd.DataFrame:
+    """Apply filters to a frame for readers that cannot push them down"""
+    if not filters:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for col, op, value in filters:
+        column, value = _filter_operands(df[col], value)
+        if op in _FILTER_OPERATORS:
+            mask &= _FILTER_OPERATORS[op](column, value).to_numpy()
+        elif op == 'in':
+            mask &= column.isin(list(value)).to_numpy()
+        elif op == 'not in':
+            mask &= ~column.isin(list(value)).to_numpy()
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+    return df[mask].reset_index(drop=True)
+
+
+def _read_columns(columns: Optional[List[str]], filters: Optional[FilterSpec]) -> Optional[List[str]]:
+    """Columns a reader must parse: the projection plus any filtered column"""
+    if columns is None:
+        return None
+    extra = [col for col, _, _ in (filters or []) if col not in columns]
+    return list(columns) + extra
+
+
+def _project(df: pd.DataFrame, columns: Optional[List[str]], filters: Optional[FilterSpec]) -> pd.DataFrame:
+    df = apply_filters(df, filters)
+    return df if columns is None else df[list(columns)]
+
+
+def _arrow_dataset(source_path: str):
+    """Open Parquet (file or Hive dataset) or Arrow IPC/Feather as a lazily scanned dataset"""
+    import pyarrow.dataset as ds
+    if source_path.endswith(ARROW_IPC_EXTENSIONS):
+        return ds.dataset(source_path, format='ipc')
+    return ds.dataset(source_path, format='parquet', partitioning='hive')
+
+
+def read_arrow_table(source_path: str, columns: Optional[List[str]] = None,
+                     filters: Optional[FilterSpec] = None):
+    """Read Parquet (file or Hive dataset) or Arrow IPC with projection and filter pushdown.
+    
+    Parquet skips row groups and partitions through their statistics and paths;
+    Arrow IPC/Feather files are memory-mapped, so projected columns are not
+    copied until rows are filtered or converted.
+    """
+    if source_path.endswith(ARROW_IPC_EXTENSIONS):
+        import pyarrow.feather as feather
+        table = feather.read_table(source_path, columns=_read_columns(columns, filters), memory_map=True)
+        if filters:
+            table = table.filter(filter_expression(filters, table.schema))
+        return table.select(list(columns)) if columns is not None else table
+
+    dataset = _arrow_dataset(source_path)
+    return dataset.to_table(columns=columns,
+                            filter=filter_expression(filters, dataset.schema) if filters else None)
+
+
+def iter_source_chunks(source_path: str, chunksize: int, columns: Optional[List[str]] = None,
+                       filters: Optional[FilterSpec] = None) -> Iterator[pd.DataFrame]:
+    """Yield chunks of at most chunksize rows from a data source without loading it whole"""
+    if source_path.endswith('.csv'):
+        for chunk in pd.read_csv(source_path, chunksize=chunksize, usecols=_read_columns(columns, filters)):
+            yield _project(chunk, columns, filters)
+    elif source_path.endswith('.jsonl') or source_path.endswith('.ndjson'):
+        for chunk in pd.read_json(source_path, lines=True, chunksize=chunksize):
+            yield _project(chunk, columns, filters)
+    elif (source_path.endswith('.parquet') or source_path.endswith(ARROW_IPC_EXTENSIONS)
+          or os.path.isdir(source_path)):
+        # The dataset scanner reads and filters batch by batch, never the whole table
+        dataset = _arrow_dataset(source_path)
+        batches = dataset.to_batches(columns=columns, batch_size=chunksize,
+                                     filter=filter_expression(filters, dataset.schema) if filters else None)
+        for batch in batches:
+            if batch.num_rows > 0:
+                yield batch.to_pandas()
+    elif source_path.endswith('.json'):
+        raise ValueError(f"Streaming JSON requires JSON lines (.jsonl/.ndjson): {source_path}")
+    else:
+        raise ValueError(f"Unsupported streaming format: {source_path}")
+
+
+class StreamingProfile:
+    """Accumulates validation and transformation statistics across chunks.
+
+    The first pass over the source fills the profile so that the second pass can
+    validate and transform every chunk against global statistics, giving the
+    same result as the in-memory path. Row hashes for exact duplicate counts
+    spill to disk past duplicate_memory_rows, so memory does not grow with the
+    source; call close() to remove the spilled files.
+    """
+
+    def __init__(self, max_categories: int = 10, duplicate_memory_rows: int = 1000000,
+                 spill_directory: Optional[str] = None):
+        self.max_categories = max_categories
+        self.scan = QualityScan()
+        self.scan.spill = RowHashSpill(duplicate_memory_rows, directory=spill_directory)
+        self.datetime_candidates: Dict[str, bool] = {}
+        self.categories: Dict[str, set] = {}
+        self.numeric = NumericTransformer()
+
+    @property
+    def schema_results(self) -> Dict[str, Any]:
+        return self.scan.schema
+
+    def update_categories(self, chunk: pd.DataFrame):
+        """Collect distinct values of the raw categorical columns"""
+        for col in chunk.select_dtypes(include=['object', 'category']).columns:
+            seen = self.categories.setdefault(col, set())
+            if len(seen) <= self.max_categories:
+                seen.update(chunk[col].dropna().unique())
+
+    def update_transformation(self, chunk: pd.DataFrame, attempted: List[str], parsed: List[str],
+                              fit_numeric: bool = True):
+        """Merge the statistics needed to transform chunks consistently"""
+        # A column is only treated as datetime if it parsed in every chunk
+        for col in attempted:
+            self.datetime_candidates[col] = self.datetime_candidates.get(col, True) and col in parsed
+
+        if fit_numeric:
+            self.numeric.partial_fit(chunk)
+
+    @property
+    def datetime_columns(self) -> List[str]:
+        return [col for col, parsed in self.datetime_candidates.items() if parsed]
+
+    def encoded_categories(self) -> Dict[str, List[Any]]:
+        """Categories of the non-datetime categorical columns, truncated past max_categories"""
+        datetime_columns = set(self.datetime_columns)
+        return {
+            col: list(values)
+            for col, values in self.categories.items()
+            if col not in datetime_columns
+        }
+
+    def validation_results(self) -> Dict[str, Any]:
+        """Build the same report structure produced by the in-memory validators"""
+        return self.scan.reports()
+
+    def close(self):
+        self.scan.spill.close()
+
+
+HIVE_DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+
+def _path_size(path: str) -> int:
+    """Size in bytes of a file, or of all files under a (partitioned) directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _smallest_int_dtype(min_val: float, max_val: float) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= min_val and max_val <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def downcast_dtypes(df: pd.DataFrame, value_ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+                    category_columns: Optional[List[str]] = None,
+                    max_category_ratio: float = 0.5) -> pd.DataFrame:
+    """Shrink column dtypes for columnar storage.
+    
+    Integers get the smallest signed type that fits their range (taken from
+    value_ranges when given, so every chunk gets the same type), floats become
+    float32 and repetitive strings become categories. Pass category_columns to
+    fix which columns are categorized instead of deciding by cardinality.
+    """
+    value_ranges = value_ranges or {}
+    result = df.copy(deep=False)
+    for col in result.columns:
+        values = result[col]
+        if pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            if len(values) == 0:
+                continue
+            min_val, max_val = value_ranges.get(col, (values.min(), values.max()))
+            result[col] = values.astype(_smallest_int_dtype(min_val, max_val))
+        elif pd.api.types.is_float_dtype(values):
+            result[col] = values.astype(np.float32)
+        elif category_columns is not None:
+            if col in category_columns:
+                result[col] = values.astype('category')
+        elif values.dtype == object and len(values) > 0:
+            if values.nunique() <= max_category_ratio * len(values):
+                result[col] = values.astype('category')
+    return result
+
+
+class ParquetOutput:
+    """Write frames as compressed Parquet, optionally as a Hive-partitioned dataset.
+    
+    The Arrow schema of the first frame is reused for every later frame, with
+    dictionary indices widened to int32, so chunks written separately stay
+    readable as one dataset. Row-group statistics are always written.
+    """
+
+    def __init__(self, path: str, output_config: Optional[Dict[str, Any]] = None,
+                 value_ranges: Optional[Dict[str, Tuple[float, float]]] = None):
+        output_config = output_config or {}
+        self.path = path
+        self.partition_by: List[str] = list(output_config.get('partition_by') or [])
+        self.compression = output_config.get('compression', 'snappy')
+        self.row_group_size = output_config.get('row_group_size', 100000)
+        self.downcast = output_config.get('downcast', True)
+        self.value_ranges = value_ranges
+        self.schema = None
+        self.category_columns: Optional[List[str]] = None
+        self._writer = None
+        self._parts_written = 0
+
+    def _to_table(self, df: pd.DataFrame):
+        import pyarrow as pa
+        sparse = [col for col in df.columns if isinstance(df[col].dtype, pd.SparseDtype)]
+        if sparse:
+            # Parquet has no sparse layout, its encodings compress the zeros instead
+            df = df.assign(**{col: df[col].sparse.to_dense() for col in sparse})
+        if self.downcast:
+            df = downcast_dtypes(df, self.value_ranges, self.category_columns)
+            if self.category_columns is None:
+                self.category_columns = [col for col in df.columns
+                                         if isinstance(df[col].dtype, pd.CategoricalDtype)]
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self.schema is None:
+            fields = [
+                field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                if pa.types.is_dictionary(field.type) else field
+                for field in table.schema
+            ]
+            self.schema = pa.schema(fields, metadata=table.schema.metadata)
+            table = table.cast(self.schema)
+        return table
+
+    def write(self, df: pd.DataFrame):
+        import pyarrow.parquet as pq
+        if not self.partition_by:
+            table = self._to_table(df)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, self.schema, compression=self.compression,
+                                                write_statistics=True)
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+            return
+
+        missing = [col for col in self.partition_by if col not in df.columns]
+        if missing:
+            raise ValueError(f"Partition columns not in output: {missing}")
+        table = self._to_table(df)
+        # Hive layout stores partition values in directory names, not in the files
+        file_table = table.drop(self.partition_by)
+        keys = df[self.partition_by].reset_index(drop=True)
+        for values, group in keys.groupby(self.partition_by, dropna=False, sort=False).indices.items():
+            values = values if isinstance(values, tuple) else (values,)
+            directory = os.path.join(self.path, *[
+                f"{col}={HIVE_DEFAULT_PARTITION if pd.isnull(value) else value}"
+                for col, value in zip(self.partition_by, values)
+            ])
+            os.makedirs(directory, exist_ok=True)
+            part_path = os.path.join(directory, f"part-{self._parts_written:05d}.parquet")
+            pq.write_table(file_table.take(group), part_path, compression=self.compression,
+                           row_group_size=self.row_group_size, write_statistics=True)
+        self._parts_written += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        elif self.schema is None and not self.partition_by:
+            # Nothing was written, still leave an empty file behind
+            open(self.path, 'w').close()
+
+
+class ChunkWriter:
+    """Append transformed chunks to a single output file"""
+
+    def __init__(self, path: str, format_type: str, output_config: Optional[Dict[str, Any]] = None,
+                 value_ranges: Optional[Dict[str, Tuple[float, float]]] = None):
+        if format_type not in ('csv', 'parquet', 'json'):
+            raise ValueError(f"Unsupported output format: {format_type}")
+        self.path = path
+        self.format_type = format_type
+        self.rows_written = 0
+        self.columns: Optional[List[str]] = None
+        self._parquet_output = (ParquetOutput(path, output_config, value_ranges)
+                                if format_type == 'parquet' else None)
+        self._json_file = None
+
+    def write(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+        else:
+            # Chunks must share the column layout of the first one
+            chunk = chunk.reindex(columns=self.columns)
+
+        if self.format_type == 'csv':
+            chunk.to_csv(self.path, mode='w' if self.rows_written == 0 else 'a',
+                         header=self.rows_written == 0, index=False)
+        elif self.format_type == 'parquet':
+            self._parquet_output.write(chunk)
+        else:
+            if self._json_file is None:
+                self._json_file = open(self.path, 'w')
+                self._json_file.write('[')
+            elif len(chunk) > 0:
+                self._json_file.write(',')
+            if len(chunk) > 0:
+                self._json_file.write(chunk.to_json(orient='records')[1:-1])
+
+        self.rows_written += len(chunk)
+
+    def close(self):
+        if self._parquet_output is not None:
+            self._parquet_output.close()
+        if self.format_type == 'json':
+            if self._json_file is None:
+                self._json_file = open(self.path, 'w')
+                self._json_file.write('[')
+            self._json_file.write(']')
+            self._json_file.close()
+        elif self.format_type == 'csv' and self.rows_written == 0:
+            open(self.path, 'w').close()
+
+
 class ETLPipeline:
     def __init__(self, config_path: Optional[str] = None):
         """Initialize ETL pipeline with optional configuration"""
@@ -213,16 +1263,30 @@ class ETLPipeline:
             'temporal': TemporalFeatureExtractor()
         }
         
+        # Fused single-pass scanner producing the three validator reports
+        self.quality_scanner = FusedQualityScanner(self.data_validators['schema'],
+                                                   self.config.get('quality', {}))
+        
+        # Sample-based datetime detection, cached per source schema
+        inference_config = self.config.get('inference', {})
+        self.datetime_inferrer = DatetimeInferrer(inference_config.get('sample_size', 100),
+                                                  inference_config.get('schema_cache_path'))
+        
         # Initialize pipeline state
         self.raw_data = None
         self.validated_data = None
         self.transformed_data = None
         self.validation_results = {}
         self.transformation_results = {}
+        self.inferred_schema = {}
     
     def _load_config(self, config_path: Optional[str]) -> Dict[str, Any]:
         """Load configuration from file or use defaults"""
         default_config = {
+            'input': {
+                'columns': None,
+                'filters': None
+            },
             'schema': {
                 'required_columns': [],
                 'column_types': {}
@@ -231,16 +1295,67 @@ class ETLPipeline:
                 'outlier_detection': {
                     'method': 'zscore',
                     'threshold': 3.0
+                },
+                'approximate': {
+                    'enabled': False,
+                    'distinct_error': 0.01,
+                    'quantile_error': 0.01,
+                    'sample_size': 5,
+                    'seed': None
                 }
             },
+            'inference': {
+                # Values sampled per object column to detect datetime formats
+                'sample_size': 100,
+                'schema_cache_path': None
+            },
             'transformations': {
                 'apply_normalization': True,
+                'numeric_stats_path': None,
                 'apply_one_hot_encoding': True,
+                'one_hot_max_categories': 10,
+                # Sparse dummies for wide one-hot encodings (e.g. region, tariff class)
+                'sparse_one_hot': False,
+                'category_vocabulary_path': None,
+                # False only applies the persisted statistics and vocabulary, never
+                # refitting or saving them (batch workers after the global fit)
+                'fit_statistics': True,
                 'extract_temporal_features': True
             },
             'output': {
                 'format': 'csv',
-                'destination': 'processed_data/'
+                'destination': 'processed_data/',
+                # Parquet only: Hive-style partition columns, kept untransformed
+                'partition_by': [],
+                'compression': 'snappy',
+                'row_group_size': 100000,
+                'downcast': True
+            },
+            'streaming': {
+                'enabled': False,
+                'chunksize': 100000,
+                # Row hashes kept in memory for duplicate counts before spilling to disk
+                'duplicate_memory_rows': 1000000,
+                'spill_directory': None
+            },
+            'batch': {
+                'max_workers': None,
+                'max_retries': 2,
+                'retry_delay': 1.0,
+                'pattern': '*'
+            },
+            'incremental': {
+                'enabled': False,
+                'manifest_path': 'processed_data/manifest.json'
+            },
+            'rollups': {
+                # Hourly/daily/monthly aggregates per region, updated per source
+                'enabled': False,
+                'url': 'sqlite:///processed_data/rollups.db',
+                'timestamp_column': 'timestamp',
+                'region_column': 'region',
+                # Empty means every numeric column
+                'value_columns': []
             }
         }
         
@@ -259,21 +1374,34 @@ class ETLPipeline:
         
         return default_config
     
-    def load_data(self, source_path: str) -> pd.DataFrame:
-        """Load data from various sources"""
+    def load_data(self, source_path: str, columns: Optional[List[str]] = None,
+                  filters: Optional[FilterSpec] = None) -> pd.DataFrame:
+        """Load data from various sources.
+        
+        columns projects the result and filters keeps only matching rows; both
+        default to the 'input' config block. Parquet and Arrow IPC/Feather push
+        them into the reader, CSV and Excel parse only the needed columns.
+        """
         logger.info(f"Loading data from {source_path}")
+        columns = columns if columns is not None else self.config['input'].get('columns')
+        filters = filters if filters is not None else self.config['input'].get('filters')
         
         if source_path.endswith('.csv'):
-            self.raw_data = pd.read_csv(source_path)
+            self.raw_data = pd.read_csv(source_path, usecols=_read_columns(columns, filters))
         elif source_path.endswith('.xlsx') or source_path.endswith('.xls'):
-            self.raw_data = pd.read_excel(source_path)
+            self.raw_data = pd.read_excel(source_path, usecols=_read_columns(columns, filters))
         elif source_path.endswith('.json'):
             self.raw_data = pd.read_json(source_path)
-        elif source_path.endswith('.parquet'):
-            self.raw_data = pd.read_parquet(source_path)
+        elif source_path.endswith('.jsonl') or source_path.endswith('.ndjson'):
+            self.raw_data = pd.read_json(source_path, lines=True)
+        elif source_path.endswith('.parquet') or source_path.endswith(ARROW_IPC_EXTENSIONS):
+            self.raw_data = read_arrow_table(source_path, columns, filters).to_pandas()
         else:
             raise ValueError(f"Unsupported file format: {source_path}")
         
+        if not source_path.endswith('.parquet') and not source_path.endswith(ARROW_IPC_EXTENSIONS):
+            self.raw_data = _project(self.raw_data, columns, filters)
+        
         logger.info(f"Loaded data with shape {self.raw_data.shape}")
         return self.raw_data
     
@@ -283,11 +1411,7 @@ class ETLPipeline:
             raise ValueError("No data loaded. Call load_data first.")
         
         logger.info("Validating data...")
-        self.validation_results = {
-            'schema': self.data_validators['schema'].validate(self.raw_data),
-            'quality': self.data_validators['quality'].check_quality(self.raw_data),
-            'completeness': self.data_validators['completeness'].analyze(self.raw_data)
-        }
+        self.validation_results = self.quality_scanner.validate(self.raw_data)
         
         # Check if validation passed
         validation_passed = self.validation_results['schema']['is_valid']
@@ -307,32 +1431,63 @@ class ETLPipeline:
         df = self.validated_data.copy()
         
         # Convert datetime columns
-        for col in df.select_dtypes(include=['object']).columns:
-            try:
-                df[col] = pd.to_datetime(df[col])
-            except:
-                pass  # Not a datetime column
+        self.datetime_inferrer.inferred_schema = {}
+        self._convert_datetime_columns(df)
+        self.inferred_schema = dict(self.datetime_inferrer.inferred_schema)
+        
+        # Temporal extraction and normalization run fused in one pass; partition
+        # columns are left raw and come out last
+        from transform_engine import FusedTransformEngine
+        transformations = self.config['transformations']
+        normalize = transformations.get('apply_normalization', True)
+        numeric, fit = self._transform_statistics() if normalize else (None, False)
+        engine = FusedTransformEngine(extract_temporal=transformations.get('extract_temporal_features', True),
+                                      normalize=normalize, encode_categorical=False,
+                                      numeric_transformer=numeric, raw_columns=self._partition_columns())
+        df = engine.transform(df, fit=fit)
+        if fit:
+            self._save_numeric_stats(numeric)
+        self.transformation_results = engine.last_report
         
-        # Apply transformations based on config
-        if self.config['transformations'].get('extract_temporal_features', True):
-            df = self.transformers['temporal'].extract_features(df)
+        df, partition_keys = self._split_partition_columns(df)
         
-        if self.config['transformations'].get('apply_normalization', True):
-            df = self.transformers['numeric'].normalize(df)
+        if transformations.get('apply_one_hot_encoding', True):
+            df = self._one_hot_encode(df)
         
-        if self.config['transformations'].get('apply_one_hot_encoding', True):
-            df = self.transformers['categorical'].one_hot_encode(df)
+        if partition_keys is not None:
+            df = pd.concat([df, partition_keys], axis=1)
         
         self.transformed_data = df
         logger.info(f"Data transformed with new shape {df.shape}")
         
         return self.transformed_data
     
-    def load_processed_data(self, destination: Optional[str] = None) -> str:
-        """Save processed data to destination"""
-        if self.transformed_data is None:
-            raise ValueError("No transformed data. Call transform_data first.")
-        
+    def _convert_datetime_columns(self, df: pd.DataFrame,
+                                  columns: Optional[List[str]] = None) -> List[str]:
+        """Parse object columns as datetimes in place, returning the converted ones"""
+        return self.datetime_inferrer.convert(df, columns)
+    
+    def _input_selection(self) -> Dict[str, Any]:
+        """Column projection and row filters configured for the source"""
+        return {
+            'columns': self.config['input'].get('columns'),
+            'filters': self.config['input'].get('filters')
+        }
+    
+    def _partition_columns(self) -> List[str]:
+        if self.config['output'].get('format', 'csv') != 'parquet':
+            return []
+        return list(self.config['output'].get('partition_by') or [])
+    
+    def _split_partition_columns(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[pd.DataFrame]]:
+        """Set partition columns aside so normalization and encoding leave them raw"""
+        partition_cols = [col for col in self._partition_columns() if col in df.columns]
+        if not partition_cols:
+            return df, None
+        return df.drop(columns=partition_cols), df[partition_cols]
+    
+    def _resolve_output_path(self, destination: Optional[str] = None) -> str:
+        """Build the output file path for the configured format"""
         # Use config destination if not specified
         destination = destination or self.config['output']['destination']
         format_type = self.config['output'].get('format', 'csv')
@@ -344,9 +1499,16 @@ class ETLPipeline:
         if os.path.isdir(destination):
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"processed_data_{timestamp}.{format_type}"
-            full_path = os.path.join(destination, filename)
-        else:
-            full_path = destination
+            return os.path.join(destination, filename)
+        return destination
+    
+    def load_processed_data(self, destination: Optional[str] = None) -> str:
+        """Save processed data to destination"""
+        if self.transformed_data is None:
+            raise ValueError("No transformed data. Call transform_data first.")
+        
+        format_type = self.config['output'].get('format', 'csv')
+        full_path = self._resolve_output_path(destination)
         
         logger.info(f"Saving processed data to {full_path}")
         
@@ -354,7 +1516,9 @@ class ETLPipeline:
         if format_type == 'csv':
             self.transformed_data.to_csv(full_path, index=False)
         elif format_type == 'parquet':
-            self.transformed_data.to_parquet(full_path, index=False)
+            output = ParquetOutput(full_path, self.config['output'])
+            output.write(self.transformed_data)
+            output.close()
         elif format_type == 'json':
             self.transformed_data.to_json(full_path, orient='records')
         else:
@@ -362,27 +1526,380 @@ class ETLPipeline:
         
         return full_path
     
-    def process_raw_data(self, source_path: str, destination: Optional[str] = None) -> Dict[str, Any]:
+    def _load_numeric_stats(self) -> Optional[NumericTransformer]:
+        """Load previously fitted numeric statistics, if configured"""
+        stats_path = self.config['transformations'].get('numeric_stats_path')
+        if stats_path and os.path.exists(stats_path):
+            logger.info(f"Reusing numeric statistics from {stats_path}")
+            return NumericTransformer.load(stats_path)
+        return None
+    
+    def _save_numeric_stats(self, transformer: NumericTransformer):
+        stats_path = self.config['transformations'].get('numeric_stats_path')
+        if stats_path:
+            transformer.save(stats_path)
+            logger.info(f"Saved numeric statistics to {stats_path}")
+    
+    def _transform_statistics(self) -> Tuple[Optional[NumericTransformer], bool]:
+        """Numeric statistics to normalize with, and whether they must be fitted on the frame.
+        
+        Without a configured path the frame is normalized with its own ranges.
+        """
+        if not self.config['transformations'].get('numeric_stats_path'):
+            return None, False
+        
+        transformer = self._load_numeric_stats()
+        fit = transformer is None
+        if fit:
+            if not self.config['transformations'].get('fit_statistics', True):
+                raise ValueError("Numeric statistics not found and fitting is disabled")
+            transformer = NumericTransformer()
+        self.transformers['numeric'] = transformer
+        return transformer, fit
+    
+    def _fit_vocabulary(self, values: Dict[str, Any]) -> CategoryVocabulary:
+        """Extend the persisted category vocabulary (if configured) and encode with it"""
+        transformations = self.config['transformations']
+        vocabulary_path = transformations.get('category_vocabulary_path')
+        if vocabulary_path and os.path.exists(vocabulary_path):
+            vocabulary = CategoryVocabulary.load(vocabulary_path)
+        else:
+            vocabulary = CategoryVocabulary()
+        
+        if not transformations.get('fit_statistics', True):
+            self.transformers['categorical'] = CategoricalTransformer(vocabulary)
+            return vocabulary
+        
+        max_categories = transformations.get('one_hot_max_categories', 10)
+        changed = False
+        for col, col_values in values.items():
+            changed = vocabulary.fit_one_hot(col, col_values, max_categories) or changed
+        if changed and vocabulary_path:
+            vocabulary.save(vocabulary_path)
+            logger.info(f"Saved category vocabulary to {vocabulary_path}")
+        
+        self.transformers['categorical'] = CategoricalTransformer(vocabulary)
+        return vocabulary
+    
+    def _one_hot_encode(self, df: pd.DataFrame) -> pd.DataFrame:
+        """One-hot encode with the persisted vocabulary when configured, else with the frame's own"""
+        transformations = self.config['transformations']
+        max_categories = transformations.get('one_hot_max_categories', 10)
+        sparse = transformations.get('sparse_one_hot', False)
+        cat_columns = df.select_dtypes(include=['object', 'category']).columns
+        self._fit_vocabulary({col: df[col].dropna().unique() for col in cat_columns})
+        return self.transformers['categorical'].one_hot_encode(df, max_categories, sparse)
+    
+    def fit_transformation_stats(self, source_path: str,
+                                 chunksize: Optional[int] = None) -> Dict[str, Any]:
+        """Fit numeric statistics and collect category values of one source without transforming it.
+        
+        The result is mergeable across sources, so a batch can fit once over
+        all of its files before any of them is normalized or encoded.
+        """
+        chunksize = chunksize or (self.config['streaming'].get('chunksize', 100000)
+                                  if self.config['streaming'].get('enabled', False) else None)
+        if chunksize and source_path.endswith(('.csv', '.jsonl', '.ndjson', '.parquet') + ARROW_IPC_EXTENSIONS):
+            frames = iter_source_chunks(source_path, chunksize, **self._input_selection())
+        else:
+            frames = iter([self.load_data(source_path)])
+        
+        max_categories = self.config['transformations'].get('one_hot_max_categories', 10)
+        extract_temporal = self.config['transformations'].get('extract_temporal_features', True)
+        numeric = NumericTransformer()
+        categories: Dict[str, set] = {}
+        for frame in frames:
+            self._convert_datetime_columns(frame)
+            if extract_temporal:
+                frame = self.transformers['temporal'].extract_features(frame)
+            frame, _ = self._split_partition_columns(frame)
+            numeric.partial_fit(frame)
+            for col in frame.select_dtypes(include=['object', 'category']).columns:
+                seen = categories.setdefault(col, set())
+                # One value past the limit is enough to rule the column out
+                if len(seen) <= max_categories:
+                    seen.update(frame[col].dropna().unique())
+        return {
+            'numeric': numeric.to_dict(),
+            'categories': {col: list(values) for col, values in categories.items()}
+        }
+    
+    def _rollup_accumulator(self) -> Optional[RollupAccumulator]:
+        rollup_config = self.config['rollups']
+        if not rollup_config.get('enabled', False):
+            return None
+        return RollupAccumulator(rollup_config['timestamp_column'], rollup_config.get('value_columns') or [],
+                                 rollup_config.get('region_column'))
+    
+    def _update_rollup_accumulator(self, accumulator: RollupAccumulator, df: pd.DataFrame):
+        """Add the raw readings of a frame to the hourly aggregates"""
+        timestamp_column = accumulator.timestamp_column
+        if timestamp_column not in df.columns:
+            logger.warning(f"Rollups skipped, no '{timestamp_column}' column")
+            return
+        if not accumulator.value_columns:
+            accumulator.value_columns = [col for col in df.select_dtypes(include=[np.number]).columns
+                                         if col != timestamp_column]
+        columns = [timestamp_column] + accumulator.value_columns
+        if accumulator.region_column in df.columns:
+            columns.append(accumulator.region_column)
+        frame = df[columns].copy()
+        if not pd.api.types.is_datetime64_any_dtype(frame[timestamp_column]):
+            if timestamp_column not in self.datetime_inferrer.convert(frame, [timestamp_column]):
+                logger.warning(f"Rollups skipped, '{timestamp_column}' is not a datetime column")
+                return
+        accumulator.update(frame)
+    
+    def _write_rollups(self, accumulator: RollupAccumulator, source_path: str):
+        """Replace the source's contribution to the rollup tables"""
+        RollupStore(self.config['rollups']['url']).update(
+            os.path.abspath(source_path), accumulator.result(), accumulator.value_columns)
+    
+    def _finish_stages(self, recorder: StageRecorder) -> Dict[str, Dict[str, Any]]:
+        """Publish the run's stage metrics and log where the time went"""
+        summary = recorder.finish()
+        logger.info("Stage timings: " + ", ".join(
+            f"{stage} {stats['seconds']:.2f}s ({stats['rows']} rows)" for stage, stats in summary.items()))
+        return summary
+    
+    def _profile_chunks(self, source_path: str, chunksize: int) -> StreamingProfile:
+        """First streaming pass: collect global validation and transformation statistics"""
+        streaming = self.config['streaming']
+        profile = StreamingProfile(self.config['transformations'].get('one_hot_max_categories', 10),
+                                   streaming.get('duplicate_memory_rows', 1000000),
+                                   streaming.get('spill_directory'))
+        self.datetime_inferrer.inferred_schema = {}
+        extract_temporal = self.config['transformations'].get('extract_temporal_features', True)
+        
+        try:
+            fitted = self._load_numeric_stats()
+            if fitted is not None:
+                profile.numeric = fitted
+            elif not self.config['transformations'].get('fit_statistics', True):
+                raise ValueError("Numeric statistics not found and fitting is disabled")
+            
+            for chunk in iter_source_chunks(source_path, chunksize, **self._input_selection()):
+                profile.scan.merge(self.quality_scanner.scan(chunk, count_outliers=False))
+                profile.update_categories(chunk)
+                
+                attempted = list(chunk.select_dtypes(include=['object']).columns)
+                parsed = self._convert_datetime_columns(chunk, attempted)
+                if extract_temporal:
+                    chunk = self.transformers['temporal'].extract_features(chunk)
+                profile.update_transformation(chunk, attempted, parsed, fit_numeric=fitted is None)
+            
+            if fitted is None:
+                self._save_numeric_stats(profile.numeric)
+            self.transformers['numeric'] = profile.numeric
+            self._fit_vocabulary(profile.encoded_categories())
+        except Exception:
+            # The caller only closes profiles it receives
+            profile.close()
+            raise
+        # A column is a datetime only if every chunk parsed as one
+        self.inferred_schema = {
+            col: info if col in profile.datetime_columns else {'type': 'string', 'format': None}
+            for col, info in self.datetime_inferrer.inferred_schema.items()
+        }
+        return profile
+    
+    def _transform_chunk(self, chunk: pd.DataFrame, profile: StreamingProfile) -> pd.DataFrame:
+        """Apply the configured transformations to one chunk using global statistics"""
+        transformations = self.config['transformations']
+        self._convert_datetime_columns(chunk, profile.datetime_columns)
+        
+        if transformations.get('extract_temporal_features', True):
+            chunk = self.transformers['temporal'].extract_features(chunk)
+        
+        chunk, partition_keys = self._split_partition_columns(chunk)
+        
+        if transformations.get('apply_normalization', True) and profile.numeric.is_fitted:
+            chunk = profile.numeric.transform(chunk, 'normalize')
+        
+        if transformations.get('apply_one_hot_encoding', True):
+            # Dummy columns follow the vocabulary fitted on the whole source
+            chunk = self.transformers['categorical'].one_hot_encode(
+                chunk, transformations.get('one_hot_max_categories', 10),
+                transformations.get('sparse_one_hot', False))
+        
+        if partition_keys is not None:
+            chunk = pd.concat([chunk, partition_keys], axis=1)
+        
+        return chunk
+    
+    def process_raw_data_streaming(self, source_path: str, destination: Optional[str] = None,
+                                   chunksize: Optional[int] = None) -> Dict[str, Any]:
+        """Run the ETL pipeline chunk by chunk with bounded memory.
+        
+        The source is read twice: once to collect global statistics and once to
+        validate, transform and write each chunk as it goes.
+        """
+        chunksize = chunksize or self.config['streaming'].get('chunksize', 100000)
+        recorder = StageRecorder('streaming', {'source': os.path.basename(source_path)})
+        profile = None
+        try:
+            logger.info(f"Streaming data from {source_path} in chunks of {chunksize} rows")
+            with recorder.stage('profile', nbytes=_path_size(source_path)) as stats:
+                profile = self._profile_chunks(source_path, chunksize)
+                stats.rows += profile.scan.row_count
+            
+            if not profile.schema_results['is_valid']:
+                # Nothing is written for an invalid schema, so the second pass is skipped
+                # and the report has no outlier counts of the exact scan
+                self.validation_results = profile.validation_results()
+                logger.error("Data validation failed")
+                return {
+                    'status': 'error',
+                    'message': 'Data validation failed',
+                    'details': self.validation_results,
+                    'stage_metrics': self._finish_stages(recorder)
+                }
+            threshold = self.quality_scanner.outlier_threshold
+            
+            value_ranges = {col: (stats.min, stats.max)
+                            for col, stats in profile.numeric.stats.items()}
+            writer = ChunkWriter(self._resolve_output_path(destination),
+                                 self.config['output'].get('format', 'csv'),
+                                 self.config['output'], value_ranges)
+            logger.info(f"Saving processed data to {writer.path}")
+            
+            rollups = self._rollup_accumulator()
+            chunks_processed = 0
+            chunks = recorder.iterate(
+                'load', iter_source_chunks(source_path, chunksize, **self._input_selection()),
+                nbytes=_path_size(source_path))
+            try:
+                for chunk in chunks:
+                    if threshold is not None and not self.quality_scanner.approximate:
+                        with recorder.stage('validate', rows=len(chunk)):
+                            profile.scan.count_outliers(chunk, threshold)
+                    if rollups is not None:
+                        with recorder.stage('rollups', rows=len(chunk)):
+                            self._update_rollup_accumulator(rollups, chunk)
+                    with recorder.stage('transform', rows=len(chunk)):
+                        transformed = self._transform_chunk(chunk, profile)
+                    with recorder.stage('save', rows=len(transformed)):
+                        writer.write(transformed)
+                    chunks_processed += 1
+            finally:
+                with recorder.stage('save') as stats:
+                    writer.close()
+                    stats.bytes += _path_size(writer.path)
+            if rollups is not None:
+                with recorder.stage('rollups'):
+                    self._write_rollups(rollups, source_path)
+            
+            self.validation_results = profile.validation_results()
+            logger.info("Data validation passed")
+            logger.info(f"Streamed {writer.rows_written} rows in {chunks_processed} chunks")
+            return {
+                'status': 'success',
+                'message': 'ETL pipeline completed successfully',
+                'output_path': writer.path,
+                'validation_results': self.validation_results,
+                'rows_processed': writer.rows_written,
+                'columns_processed': len(writer.columns or []),
+                'chunks_processed': chunks_processed,
+                'inferred_schema': self.inferred_schema,
+                'stage_metrics': self._finish_stages(recorder)
+            }
+        
+        except Exception as e:
+            logger.error(f"ETL pipeline error: {str(e)}")
+            return {
+                'status': 'error',
+                'message': str(e),
+                'stage_metrics': self._finish_stages(recorder)
+            }
+        finally:
+            if profile is not None:
+                profile.close()
+    
+    def _process_incremental(self, source_path: str, destination: Optional[str],
+                             chunksize: Optional[int]) -> Dict[str, Any]:
+        """Skip the source if the manifest shows it unchanged, otherwise process and record it"""
+        manifest = SourceManifest(self.config['incremental']['manifest_path'])
+        current_config_hash = config_hash(self.config)
+        
+        entry = manifest.lookup(source_path, current_config_hash)
+        if entry is not None:
+            logger.info(f"Skipping unchanged source {source_path}, reusing {entry['output_path']}")
+            manifest.save()  # Persist refreshed mtimes of touched but identical files
+            return SourceManifest.skipped_result(source_path, entry)
+        
+        numeric_stats = self._merge_incremental_stats(manifest, current_config_hash, source_path, chunksize)
+        result = self.process_raw_data(source_path, destination, chunksize, incremental=False)
+        if result['status'] == 'success':
+            manifest.record(source_path, current_config_hash, result, numeric_stats)
+            manifest.save()
+        return result
+    
+    def _merge_incremental_stats(self, manifest: SourceManifest, current_config_hash: str,
+                                 source_path: str, chunksize: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Save numeric statistics of the source merged with those of the sources processed before.
+        
+        Returns the source's own statistics for the manifest, or None when
+        statistics are not persisted or not fitted.
+        """
+        transformations = self.config['transformations']
+        if not (transformations.get('numeric_stats_path') and transformations.get('apply_normalization', True)
+                and transformations.get('fit_statistics', True)):
+            return None
+        
+        fitted = self.fit_transformation_stats(source_path, chunksize)['numeric']
+        # A changed source replaces its earlier statistics instead of being counted twice
+        numeric = NumericTransformer.from_dict(fitted)
+        for stats in manifest.numeric_stats(current_config_hash, exclude=[source_path]):
+            numeric.merge(NumericTransformer.from_dict(stats))
+        self._save_numeric_stats(numeric)
+        return fitted
+    
+    def process_raw_data(self, source_path: str, destination: Optional[str] = None,
+                         chunksize: Optional[int] = None,
+                         incremental: Optional[bool] = None) -> Dict[str, Any]:
         """Run the full ETL pipeline"""
+        if incremental is None:
+            incremental = self.config['incremental'].get('enabled', False)
+        if incremental:
+            return self._process_incremental(source_path, destination, chunksize)
+        
+        if chunksize or self.config['streaming'].get('enabled', False):
+            return self.process_raw_data_streaming(source_path, destination, chunksize)
+        
+        recorder = StageRecorder('in_memory', {'source': os.path.basename(source_path)})
         try:
             # Load data
-            self.load_data(source_path)
+            with recorder.stage('load', nbytes=_path_size(source_path)) as stats:
+                self.load_data(source_path)
+                stats.rows += len(self.raw_data)
             
             # Validate data
-            validation_results = self.validate_data()
+            with recorder.stage('validate', rows=len(self.raw_data)):
+                validation_results = self.validate_data()
             if not validation_results['schema']['is_valid']:
                 logger.error("Data validation failed")
                 return {
                     'status': 'error',
                     'message': 'Data validation failed',
-                    'details': validation_results
+                    'details': validation_results,
+                    'stage_metrics': self._finish_stages(recorder)
                 }
             
             # Transform data
-            self.transform_data()
+            with recorder.stage('transform', rows=len(self.validated_data)):
+                self.transform_data()
             
             # Load processed data
-            output_path = self.load_processed_data(destination)
+            with recorder.stage('save', rows=len(self.transformed_data)) as stats:
+                output_path = self.load_processed_data(destination)
+                stats.bytes += _path_size(output_path)
+            
+            # Update the rollup tables from the raw readings
+            rollups = self._rollup_accumulator()
+            if rollups is not None:
+                with recorder.stage('rollups', rows=len(self.validated_data)):
+                    self._update_rollup_accumulator(rollups, self.validated_data)
+                    self._write_rollups(rollups, source_path)
             
             return {
                 'status': 'success',
@@ -390,14 +1907,17 @@ class ETLPipeline:
                 'output_path': output_path,
                 'validation_results': validation_results,
                 'rows_processed': len(self.transformed_data),
-                'columns_processed': len(self.transformed_data.columns)
+                'columns_processed': len(self.transformed_data.columns),
+                'inferred_schema': self.inferred_schema,
+                'stage_metrics': self._finish_stages(recorder)
             }
         
         except Exception as e:
             logger.error(f"ETL pipeline error: {str(e)}")
             return {
                 'status': 'error',
-                'message': str(e)
+                'message': str(e),
+                'stage_metrics': self._finish_stages(recorder)
             }
 
 # Example usage
@@ -0,0 +1,487 @@
+import os
+import json
+import shutil
+import logging
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Sequence, Tuple, Union
+
+from etl_pipeline import FilterSpec, ParquetOutput, iter_source_chunks, read_arrow_table
+from instrumentation import StageRecorder
+
+logger = logging.getLogger('feature_store')
+
+# Model inputs in matrix order, and the codes used for day_type (unknown -> -1)
+MODEL_FEATURES = ['temperature', 'humidity', 'day_type', 'seasonality']
+WEATHER_FEATURES = ['temperature', 'humidity']
+DAY_TYPES = {'weekday': 0, 'weekend': 1, 'holiday': 2}
+
+DEFAULT_FEATURE_CONFIG = {
+    'timestamp_column': 'timestamp',
+    'region_column': 'region',
+    'target_column': 'consumption',
+    'weather_timestamp_column': 'timestamp',
+    # Empty means every numeric column of the source
+    'weather_columns': [],
+    # Observations older than this are not joined (pandas offset string)
+    'max_weather_age': '3h',
+    # Without this column demographics are treated as static per region
+    'demographic_timestamp_column': 'reference_date',
+    'demographic_columns': [],
+    # Calendar features use local days
+    'timezone': 'America/Sao_Paulo',
+    'holidays': [],
+    'partition_by': ['month'],
+    'compression': 'snappy',
+    'row_group_size': 100000,
+    'chunksize': 100000,
+    'keep_versions': 2
+}
+
+CURRENT_FILE = 'CURRENT'
+# Leading underscore keeps pyarrow from reading these as part of the dataset
+MANIFEST_FILE = '_manifest.json'
+WEATHER_FILE = '_weather.parquet'
+
+Source = Union[str, pd.DataFrame]
+
+
+def to_naive_utc(values: pd.Series) -> pd.Series:
+    """Parse a timestamp column as naive UTC; naive input is taken as UTC"""
+    values = pd.to_datetime(values, errors='coerce', utc=True)
+    return values.dt.tz_localize(None)
+
+
+def month_partition(timestamps: pd.Series) -> np.ndarray:
+    """YYYY-MM of each timestamp, used as the partition value"""
+    return timestamps.to_numpy(dtype='datetime64[ns]').astype('datetime64[M]').astype(str)
+
+
+def calendar_features(timestamps: pd.Series, timezone: str = DEFAULT_FEATURE_CONFIG['timezone'],
+                      holidays: Sequence[str] = ()) -> pd.DataFrame:
+    """day_type and seasonality of naive UTC timestamps, evaluated on local days.
+
+    seasonality is the position in the yearly cycle, cos(2*pi*(day_of_year - 1)/365.25),
+    so it is 1 at the start of January and -1 around early July.
+    """
+    local = timestamps.dt.tz_localize('UTC').dt.tz_convert(timezone)
+    day_type = np.where(local.dt.dayofweek.to_numpy() >= 5, 'weekend', 'weekday').astype(object)
+    if len(holidays) > 0:
+        dates = local.dt.strftime('%Y-%m-%d')
+        day_type[dates.isin([str(pd.Timestamp(day).date()) for day in holidays]).to_numpy()] = 'holiday'
+    seasonality = np.cos(2 * np.pi * (local.dt.dayofyear.to_numpy() - 1) / 365.25)
+    return pd.DataFrame({'day_type': day_type, 'seasonality': seasonality}, index=timestamps.index)
+
+
+def feature_matrix(frame: pd.DataFrame) -> np.ndarray:
+    """Model input matrix in MODEL_FEATURES order"""
+    matrix = np.empty((len(frame), len(MODEL_FEATURES)), dtype=np.float64)
+    matrix[:, 0] = frame['temperature'].to_numpy(dtype=np.float64)
+    matrix[:, 1] = frame['humidity'].to_numpy(dtype=np.float64)
+    matrix[:, 2] = frame['day_type'].map(DAY_TYPES).fillna(-1).to_numpy(dtype=np.float64)
+    matrix[:, 3] = frame['seasonality'].to_numpy(dtype=np.float64)
+    return matrix
+
+
+def _region_keys(values: pd.Series) -> pd.Series:
+    return values.astype(object).where(values.notna(), '').astype(str)
+
+
+def _read_source(source: Source, chunksize: int) -> pd.DataFrame:
+    if isinstance(source, pd.DataFrame):
+        return source
+    chunks = list(iter_source_chunks(source, chunksize))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def _iter_source(source: Source, chunksize: int) -> Iterator[pd.DataFrame]:
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunksize):
+            yield source.iloc[start:start + chunksize]
+        return
+    yield from iter_source_chunks(source, chunksize)
+
+
+def _sorted_side(frame: pd.DataFrame, timestamp_column: str, region_column: str,
+                 value_columns: List[str], as_of_column: str) -> pd.DataFrame:
+    """Right side of an as-of join: one row per (region, timestamp), sorted by time"""
+    side = pd.DataFrame({
+        region_column: _region_keys(frame[region_column]),
+        as_of_column: to_naive_utc(frame[timestamp_column])
+    })
+    for col in value_columns:
+        side[col] = frame[col].to_numpy()
+    side = side[side[as_of_column].notna()]
+    numeric = [col for col in value_columns if pd.api.types.is_numeric_dtype(side[col])]
+    if len(numeric) == len(value_columns):
+        # Several stations per region reporting at the same time are averaged
+        side = side.groupby([region_column, as_of_column], sort=False)[value_columns].mean().reset_index()
+    else:
+        side = side.drop_duplicates([region_column, as_of_column], keep='last')
+    return side.sort_values(as_of_column, kind='mergesort').reset_index(drop=True)
+
+
+class FeatureStore:
+    """Materialized consumption features joined point-in-time with weather and demographics.
+
+    Every consumption reading is joined with the latest weather observation of
+    its region at or before the reading (within max_weather_age) and with the
+    latest demographic record at or before it, so no row ever sees data from
+    its future. The joins are sorted merges: weather and demographics are
+    parsed and sorted by timestamp once, then each consumption chunk is sorted
+    and merged against them, which keeps memory bounded by the chunk size.
+
+    Each build is written as a new Hive-partitioned Parquet snapshot
+    <path>/v<N>/month=YYYY-MM/ and then made current, so readers never see a
+    half-written table. The parsed weather observations are saved with the
+    snapshot as their own table, including those no reading was joined to.
+    Training reads slices with read()/training_set() and the API looks
+    features up through FeatureIndex.
+    """
+
+    def __init__(self, path: str = 'processed_data/features', config: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.config = dict(DEFAULT_FEATURE_CONFIG, **(config or {}))
+
+    def versions(self) -> List[str]:
+        if not os.path.isdir(self.path):
+            return []
+        versions = [entry for entry in os.listdir(self.path)
+                    if entry.startswith('v') and entry[1:].isdigit()
+                    and os.path.exists(os.path.join(self.path, entry, MANIFEST_FILE))]
+        return sorted(versions, key=lambda version: int(version[1:]))
+
+    def current_version(self) -> Optional[str]:
+        current_path = os.path.join(self.path, CURRENT_FILE)
+        if os.path.exists(current_path):
+            with open(current_path, 'r') as f:
+                return f.read().strip() or None
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def manifest(self, version: Optional[str] = None) -> Dict[str, Any]:
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No feature table in {self.path}")
+        with open(os.path.join(self.path, version, MANIFEST_FILE), 'r') as f:
+            return json.load(f)
+
+    def _activate(self, version: str):
+        tmp_path = os.path.join(self.path, f"{CURRENT_FILE}.tmp")
+        with open(tmp_path, 'w') as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.path, CURRENT_FILE))
+
+    def _prune(self):
+        """Drop old snapshots, keeping the newest keep_versions for readers still on them"""
+        keep = max(1, int(self.config['keep_versions']))
+        for version in self.versions()[:-keep]:
+            shutil.rmtree(os.path.join(self.path, version), ignore_errors=True)
+
+    def _load_weather(self, source: Source, chunksize: int) -> pd.DataFrame:
+        config = self.config
+        weather = _read_source(source, chunksize)
+        columns = config['weather_columns'] or [
+            col for col in weather.select_dtypes(include=[np.number]).columns
+            if col not in (config['weather_timestamp_column'], config['region_column'])]
+        return _sorted_side(weather, config['weather_timestamp_column'], config['region_column'],
+                            list(columns), 'weather_observed_at')
+
+    def _load_demographics(self, source: Optional[Source], chunksize: int) -> Optional[pd.DataFrame]:
+        if source is None:
+            return None
+        config = self.config
+        demographics = _read_source(source, chunksize)
+        region_column = config['region_column']
+        timestamp_column = config['demographic_timestamp_column']
+        columns = config['demographic_columns'] or [
+            col for col in demographics.columns if col not in (region_column, timestamp_column)]
+        if timestamp_column not in demographics.columns:
+            logger.warning(f"Demographics have no '{timestamp_column}' column, joining them as static")
+            static = demographics[[region_column] + list(columns)].copy()
+            static[region_column] = _region_keys(static[region_column])
+            return static.drop_duplicates(region_column, keep='last')
+        return _sorted_side(demographics, timestamp_column, region_column, list(columns),
+                            'demographics_as_of')
+
+    def join(self, chunk: pd.DataFrame, weather: pd.DataFrame,
+             demographics: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Point-in-time join of one consumption chunk, sorted by (region, timestamp)"""
+        config = self.config
+        timestamp_column = config['timestamp_column']
+        region_column = config['region_column']
+
+        frame = chunk.copy()
+        frame[timestamp_column] = to_naive_utc(frame[timestamp_column])
+        frame[region_column] = _region_keys(frame[region_column])
+        frame = frame[frame[timestamp_column].notna()].sort_values(timestamp_column, kind='mergesort')
+
+        # Weather values only ever come from the weather source, as when serving
+        frame = frame.drop(columns=[col for col in weather.columns
+                                    if col in frame.columns and col != region_column])
+        joined = pd.merge_asof(frame, weather, left_on=timestamp_column, right_on='weather_observed_at',
+                               by=region_column, direction='backward',
+                               tolerance=pd.Timedelta(config['max_weather_age']))
+        if demographics is not None:
+            if 'demographics_as_of' in demographics.columns:
+                joined = pd.merge_asof(joined, demographics, left_on=timestamp_column,
+                                       right_on='demographics_as_of', by=region_column,
+                                       direction='backward', suffixes=('', '_demographic'))
+            else:
+                joined = joined.merge(demographics, on=region_column, how='left',
+                                      suffixes=('', '_demographic'))
+
+        calendar = calendar_features(joined[timestamp_column], config['timezone'], config['holidays'])
+        joined['day_type'] = calendar['day_type'].to_numpy()
+        joined['seasonality'] = calendar['seasonality'].to_numpy()
+        if 'month' in config['partition_by']:
+            joined['month'] = month_partition(joined[timestamp_column])
+        return joined.sort_values([region_column, timestamp_column], kind='mergesort').reset_index(drop=True)
+
+    def materialize(self, consumption: Source, weather: Source,
+                    demographics: Optional[Source] = None,
+                    chunksize: Optional[int] = None) -> Dict[str, Any]:
+        """Build a new snapshot of the feature table and make it current"""
+        chunksize = chunksize or self.config['chunksize']
+        recorder = StageRecorder('streaming', {'source': 'features'})
+        os.makedirs(self.path, exist_ok=True)
+        existing = self.versions()
+        version = f"v{int(existing[-1][1:]) + 1 if existing else 1}"
+        tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=self.path)
+
+        try:
+            with recorder.stage('features_load') as stats:
+                weather_side = self._load_weather(weather, chunksize)
+                demographic_side = self._load_demographics(demographics, chunksize)
+                stats.rows += len(weather_side) + (len(demographic_side) if demographic_side is not None else 0)
+
+            # Serving needs the latest observations even when no reading is joined to them yet
+            with recorder.stage('features_save', rows=len(weather_side)):
+                weather_output = ParquetOutput(os.path.join(tmp_dir, WEATHER_FILE), {
+                    'compression': self.config['compression'],
+                    'row_group_size': self.config['row_group_size'],
+                    'downcast': False
+                })
+                weather_output.write(weather_side)
+                weather_output.close()
+
+            # Unpartitioned tables are a single file inside the snapshot directory
+            output_path = tmp_dir if self.config['partition_by'] else os.path.join(tmp_dir, 'part-00000.parquet')
+            output = ParquetOutput(output_path, {
+                'partition_by': self.config['partition_by'],
+                'compression': self.config['compression'],
+                'row_group_size': self.config['row_group_size'],
+                # Chunks may differ in range, keep the source dtypes for a stable schema
+                'downcast': False
+            })
+            rows_read = rows_written = 0
+            columns: Optional[List[str]] = None
+            for chunk in recorder.iterate('features_read', _iter_source(consumption, chunksize)):
+                rows_read += len(chunk)
+                with recorder.stage('features_join', rows=len(chunk)):
+                    joined = self.join(chunk, weather_side, demographic_side)
+                if columns is None:
+                    columns = list(joined.columns)
+                with recorder.stage('features_save', rows=len(joined)):
+                    output.write(joined.reindex(columns=columns))
+                rows_written += len(joined)
+            output.close()
+
+            manifest = {
+                'version': version,
+                'built_at': datetime.now().isoformat(),
+                'rows': rows_written,
+                'rows_dropped': rows_read - rows_written,
+                'columns': columns or [],
+                'weather_rows': len(weather_side),
+                'sources': {
+                    name: source if isinstance(source, str) else '<frame>'
+                    for name, source in (('consumption', consumption), ('weather', weather),
+                                         ('demographics', demographics)) if source is not None
+                },
+                'config': self.config
+            }
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+                json.dump(manifest, f, indent=2, default=str)
+            os.replace(tmp_dir, os.path.join(self.path, version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self._activate(version)
+        self._prune()
+        logger.info(f"Materialized feature table {version}: {rows_written} rows "
+                    f"({rows_read - rows_written} without timestamp dropped)")
+        return {
+            'status': 'success',
+            'version': version,
+            'output_path': os.path.join(self.path, version),
+            'rows_processed': rows_written,
+            'rows_dropped': rows_read - rows_written,
+            'stage_metrics': recorder.finish()
+        }
+
+    def _filters(self, start: Optional[datetime], end: Optional[datetime],
+                 regions: Optional[Sequence[str]]) -> FilterSpec:
+        timestamp_column = self.config['timestamp_column']
+        filters: FilterSpec = []
+        partitioned_by_month = 'month' in self.config['partition_by']
+        if start is not None:
+            start = to_naive_utc(pd.Series([start]))[0].to_pydatetime()
+            filters.append((timestamp_column, '>=', start))
+            if partitioned_by_month:
+                filters.append(('month', '>=', start.strftime('%Y-%m')))
+        if end is not None:
+            end = to_naive_utc(pd.Series([end]))[0].to_pydatetime()
+            filters.append((timestamp_column, '<', end))
+            if partitioned_by_month:
+                filters.append(('month', '<=', end.strftime('%Y-%m')))
+        if regions is not None:
+            filters.append((self.config['region_column'], 'in', list(regions)))
+        return filters
+
+    def read(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             regions: Optional[Sequence[str]] = None, columns: Optional[List[str]] = None,
+             version: Optional[str] = None) -> pd.DataFrame:
+        """Rows with start <= timestamp < end, read with partition and row-group pruning"""
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No feature table in {self.path}")
+        filters = self._filters(start, end, regions)
+        table = read_arrow_table(os.path.join(self.path, version), columns, filters or None)
+        return table.to_pandas()
+
+    def read_weather(self, columns: Optional[List[str]] = None,
+                     version: Optional[str] = None) -> pd.DataFrame:
+        """Weather observations saved with a snapshot, one row per (region, weather_observed_at)"""
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No feature table in {self.path}")
+        path = os.path.join(self.path, version, WEATHER_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Feature table {version} has no weather table")
+        return read_arrow_table(path, columns).to_pandas()
+
+    def training_set(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     regions: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Model matrix and target for the rows that have every feature"""
+        target_column = self.config['target_column']
+        frame = self.read(start, end, regions, MODEL_FEATURES + [target_column])
+        frame = frame.dropna(subset=MODEL_FEATURES + [target_column])
+        return feature_matrix(frame), frame[target_column].to_numpy(dtype=np.float64)
+
+
+class FeatureIndex:
+    """Point-in-time feature lookups for serving, from the current feature table.
+
+    Keeps, per region, the sorted observation times and values of the weather
+    table saved with the current snapshot (snapshots built before it existed
+    fall back to the observations joined into the table). A lookup takes the
+    latest observation at or before the requested timestamp (binary search)
+    within the table's max_weather_age, and derives the calendar features from
+    the timestamp, so the API gets exactly the values a training row at that
+    time would have.
+    """
+
+    def __init__(self, store: FeatureStore):
+        self.store = store
+        self.version: Optional[str] = None
+        self._max_age = pd.Timedelta(store.config['max_weather_age'])
+        self._timezone = store.config['timezone']
+        self._holidays: List[str] = list(store.config['holidays'])
+        self._regions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.version is not None
+
+    def refresh(self) -> bool:
+        """Reload when a new snapshot became current; returns whether it did"""
+        version = self.store.current_version()
+        if version is None or version == self.version:
+            return False
+
+        config = self.store.manifest(version)['config']
+        region_column = config['region_column']
+        columns = [region_column, 'weather_observed_at'] + WEATHER_FEATURES
+        try:
+            frame = self.store.read_weather(columns, version)
+        except FileNotFoundError:
+            frame = self.store.read(columns=columns, version=version)
+        frame = frame.dropna(subset=['weather_observed_at'])
+        frame = frame.drop_duplicates([region_column, 'weather_observed_at'])
+
+        regions = {}
+        for region, group in frame.groupby(region_column, sort=False):
+            group = group.sort_values('weather_observed_at', kind='mergesort')
+            regions[str(region)] = (group['weather_observed_at'].to_numpy(dtype='datetime64[ns]'),
+                                    group[WEATHER_FEATURES].to_numpy(dtype=np.float64))
+
+        # Swapped together so concurrent lookups see one snapshot or the other
+        self._regions = regions
+        self._max_age = pd.Timedelta(config['max_weather_age'])
+        self._timezone = config['timezone']
+        self._holidays = list(config['holidays'])
+        self.version = version
+        logger.info(f"Loaded feature index {version} ({len(regions)} regions)")
+        return True
+
+    def lookup(self, regions: Sequence[str], timestamps: Sequence[datetime]) -> pd.DataFrame:
+        """Features for each (region, timestamp); raises LookupError if one has none"""
+        region_index = self._regions
+        times = to_naive_utc(pd.Series(list(timestamps)))
+        wanted = times.to_numpy(dtype='datetime64[ns]')
+        values = np.full((len(wanted), len(WEATHER_FEATURES)), np.nan)
+        observed = np.full(len(wanted), np.datetime64('NaT'), dtype='datetime64[ns]')
+
+        keys = pd.Series(list(regions), dtype=object)
+        for region, positions in keys.groupby(keys, sort=False).indices.items():
+            indexed = region_index.get(str(region))
+            if indexed is None:
+                raise LookupError(f"No features for region {region}")
+            observed_at, region_values = indexed
+            found = np.searchsorted(observed_at, wanted[positions], side='right') - 1
+            valid = found >= 0
+            hits = positions[valid]
+            observed[hits] = observed_at[found[valid]]
+            values[hits] = region_values[found[valid]]
+
+        missing = np.isnat(observed) | (wanted - observed > self._max_age.to_timedelta64())
+        if missing.any():
+            first = int(np.flatnonzero(missing)[0])
+            raise LookupError(f"No weather for region {keys[first]} at {times[first]} "
+                              f"within {self._max_age}")
+
+        frame = pd.DataFrame(values, columns=WEATHER_FEATURES)
+        calendar = calendar_features(times, self._timezone, self._holidays)
+        frame['day_type'] = calendar['day_type'].to_numpy()
+        frame['seasonality'] = calendar['seasonality'].to_numpy()
+        frame['weather_observed_at'] = observed
+        return frame
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Materialize the joined consumption feature table")
+    parser.add_argument('consumption', help="Consumption readings (CSV, JSON lines, Parquet or Arrow)")
+    parser.add_argument('weather', help="Weather observations per region")
+    parser.add_argument('--demographics', help="Demographic records per region")
+    parser.add_argument('--path', default='processed_data/features', help="Feature table directory")
+    parser.add_argument('--config', help="JSON file overriding DEFAULT_FEATURE_CONFIG")
+    parser.add_argument('--chunksize', type=int, help="Consumption rows joined per chunk")
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    result = FeatureStore(args.path, config).materialize(args.consumption, args.weather,
+                                                         args.demographics, args.chunksize)
+    print(json.dumps({key: value for key, value in result.items() if key != 'stage_metrics'}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
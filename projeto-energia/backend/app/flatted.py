@@ -18,27 +18,10 @@ import json as _json
 
 class _Known:
     def __init__(self):
-        self.key = []
-        self.value = []
-
-class _String:
-    def __init__(self, value):
-        self.value = value
-
-
-def _array_keys(value):
-    keys = []
-    i = 0
-    for _ in value:
-        keys.append(i)
-        i += 1
-    return keys
-
-def _object_keys(value):
-    keys = []
-    for key in value:
-        keys.append(key)
-    return keys
+        # Strings are interned by value, lists and dicts by identity, so every
+        # lookup is a dict access instead of an equality scan over all entries
+        self.strings = {}
+        self.objects = {}
 
 def _is_array(value):
     return isinstance(value, (list, tuple))
@@ -52,88 +35,64 @@ def _is_string(value):
 def _index(known, input, value):
     input.append(value)
     index = str(len(input) - 1)
-    known.key.append(value)
-    known.value.append(index)
+    if _is_string(value):
+        known.strings[value] = index
+    else:
+        # input keeps the value alive, so its id() cannot be reused meanwhile
+        known.objects[id(value)] = index
     return index
 
-def _loop(keys, input, known, output):
-    for key in keys:
-        value = output[key]
-        if isinstance(value, _String):
-            _ref(key, input[int(value.value)], input, known, output)
-
+def _relate_all(known, input, values):
+    # Type checks and lookups inlined over a container's values: this runs once
+    # per value in the graph, so per-value function calls dominated stringify
+    strings = known.strings
+    objects = known.objects
+    output = []
+    for value in values:
+        if isinstance(value, str):
+            index = strings.get(value)
+            output.append(index if index is not None else _index(known, input, value))
+        elif isinstance(value, (list, tuple, dict)):
+            index = objects.get(id(value))
+            output.append(index if index is not None else _index(known, input, value))
+        else:
+            output.append(value)
     return output
 
-def _ref(key, value, input, known, output):
-    if _is_array(value) and value not in known:
-        known.append(value)
-        value = _loop(_array_keys(value), input, known, value)
-    elif _is_object(value) and value not in known:
-        known.append(value)
-        value = _loop(_object_keys(value), input, known, value)
-
-    output[key] = value
-
-def _relate(known, input, value):
-    if _is_string(value) or _is_array(value) or _is_object(value):
-        try:
-            return known.value[known.key.index(value)]
-        except:
-            return _index(known, input, value)
-
-    return value
-
 def _transform(known, input, value):
     if _is_array(value):
-        output = []
-        for val in value:
-            output.append(_relate(known, input, val))
-        return output
+        return _relate_all(known, input, value)
 
     if _is_object(value):
-        obj = {}
-        for key in value:
-            obj[key] = _relate(known, input, value[key])
-        return obj
+        return dict(zip(value.keys(), _relate_all(known, input, value.values())))
 
     return value
 
-def _wrap(value):
-    if _is_string(value):
-        return _String(value)
-
-    if _is_array(value):
-        i = 0
-        for val in value:
-            value[i] = _wrap(val)
-            i += 1
-
-    elif _is_object(value):
-        for key in value:
-            value[key] = _wrap(value[key])
-
-    return value
+def _revive(input, root):
+    # In the wire format every string inside a container is the index of its
+    # value in input, so strings are resolved in place with no wrapping pass.
+    # Each container is revived exactly once (tracked by id()), with an
+    # explicit stack so deep graphs do not hit the recursion limit.
+    revived = {id(root)}
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        items = enumerate(current) if type(current) is list else current.items()
+        for key, value in items:
+            if type(value) is str:
+                value = input[int(value)]
+                current[key] = value
+                if type(value) in (list, dict) and id(value) not in revived:
+                    revived.add(id(value))
+                    stack.append(value)
+    return root
 
 def parse(value, *args, **kwargs):
-    json = _json.loads(value, *args, **kwargs)
-    wrapped = []
-    for value in json:
-        wrapped.append(_wrap(value))
-
-    input = []
-    for value in wrapped:
-        if isinstance(value, _String):
-            input.append(value.value)
-        else:
-            input.append(value)
-
+    input = _json.loads(value, *args, **kwargs)
     value = input[0]
 
-    if _is_array(value):
-        return _loop(_array_keys(value), input, [value], value)
-
-    if _is_object(value):
-        return _loop(_object_keys(value), input, [value], value)
+    if type(value) in (list, dict):
+        return _revive(input, value)
 
     return value
 
@@ -0,0 +1,272 @@
+import os
+import sys
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+try:
+    from opentelemetry import trace
+except ImportError:  # Sem OpenTelemetry as spans viram no-op
+    trace = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger('instrumentation')
+
+# Labels vêm de conjuntos fechados (templates de rota, nomes de etapa, classe
+# do status), nunca de valores da requisição, para limitar a cardinalidade
+HTTP_REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Latência das requisições até o último byte da resposta',
+    ['method', 'route', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+ETL_STAGE_SECONDS = Histogram(
+    'etl_stage_duration_seconds',
+    'Tempo total de cada etapa do ETL por execução',
+    ['stage', 'mode'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+)
+ETL_STAGE_ROWS = Counter(
+    'etl_stage_rows_total',
+    'Linhas processadas por etapa do ETL',
+    ['stage', 'mode']
+)
+ETL_STAGE_BYTES = Counter(
+    'etl_stage_bytes_total',
+    'Bytes lidos ou gravados por etapa do ETL',
+    ['stage', 'mode']
+)
+ETL_STAGE_THROUGHPUT = Gauge(
+    'etl_stage_throughput',
+    'Vazão da última execução de cada etapa do ETL (linhas ou bytes por segundo)',
+    ['stage', 'mode', 'unit']
+)
+ETL_STAGE_PEAK_RSS = Gauge(
+    'etl_stage_peak_rss_bytes',
+    'Pico de memória residente do processo durante a última execução de cada etapa',
+    ['stage', 'mode']
+)
+
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# Arquivo de spans do exportador local; sem ele as spans só existem se outro
+# TracerProvider for configurado
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH')
+
+_tracer = trace.get_tracer('energia') if trace is not None else None
+
+
+def configure_tracing(path: Optional[str] = TRACE_EXPORT_PATH, service_name: str = 'energia') -> bool:
+    """
+    Exporta as spans como JSON, uma por linha, para um arquivo local.
+    Retorna False se o SDK do OpenTelemetry não estiver instalado.
+    """
+    if not path:
+        return False
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    except ImportError:
+        logger.warning("opentelemetry-sdk not installed, spans will not be exported")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+    exporter = ConsoleSpanExporter(out=open(path, 'a'),
+                                   formatter=lambda span: span.to_json(indent=None) + os.linesep)
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return True
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """
+    Span do OpenTelemetry (ou nada, sem o pacote) em volta de um bloco
+    """
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def reset_peak_rss() -> bool:
+    """Zera o pico de RSS do processo (Linux), para medir o pico de uma etapa"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Pico de RSS desde o último reset (Linux) ou desde o início do processo"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KiB no Linux e em bytes no macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageStats:
+    def __init__(self):
+        self.seconds = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.peak_rss = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'seconds': self.seconds,
+            'rows': self.rows,
+            'bytes': self.bytes,
+            'rows_per_second': self.rows / self.seconds if self.seconds > 0 else None,
+            'bytes_per_second': self.bytes / self.seconds if self.seconds > 0 else None,
+            'peak_rss_bytes': self.peak_rss
+        }
+
+
+class StageRecorder:
+    """
+    Tempo, linhas, bytes e pico de RSS de cada etapa de uma execução do ETL.
+
+    Uma etapa pode ser aberta várias vezes (uma por chunk no modo streaming);
+    os valores são somados e finish() publica uma observação por etapa nas
+    métricas do Prometheus, além de retornar o resumo da execução.
+    """
+
+    def __init__(self, mode: str = 'in_memory', attributes: Optional[Dict[str, Any]] = None):
+        self.mode = mode
+        self.attributes = attributes or {}
+        self.stages: Dict[str, StageStats] = {}
+
+    @contextmanager
+    def stage(self, name: str, rows: int = 0, nbytes: int = 0) -> Iterator[StageStats]:
+        """
+        Mede um bloco; linhas e bytes conhecidos só no fim podem ser somados
+        ao objeto retornado
+        """
+        stats = self.stages.setdefault(name, StageStats())
+        stats.rows += rows
+        stats.bytes += nbytes
+        reset_peak_rss()
+        start = time.perf_counter()
+        with span(f'etl.{name}', dict(self.attributes, mode=self.mode)):
+            try:
+                yield stats
+            finally:
+                stats.seconds += time.perf_counter() - start
+                peak = peak_rss_bytes()
+                if peak is not None:
+                    stats.peak_rss = max(stats.peak_rss or 0, peak)
+
+    def iterate(self, name: str, items: Iterable[Any], nbytes: int = 0) -> Iterator[Any]:
+        """
+        Itera medindo na etapa name o tempo gasto para produzir cada item
+        (ex.: leitura de chunks) e contando as linhas dos itens com len()
+        """
+        self.stages.setdefault(name, StageStats()).bytes += nbytes
+        items = iter(items)
+        while True:
+            with self.stage(name) as stats:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+                stats.rows += len(item)
+            yield item
+
+    def finish(self) -> Dict[str, Dict[str, Any]]:
+        summary = {}
+        for name, stats in self.stages.items():
+            ETL_STAGE_SECONDS.labels(name, self.mode).observe(stats.seconds)
+            ETL_STAGE_ROWS.labels(name, self.mode).inc(stats.rows)
+            ETL_STAGE_BYTES.labels(name, self.mode).inc(stats.bytes)
+            summary[name] = stats.to_dict()
+            if summary[name]['rows_per_second'] is not None:
+                ETL_STAGE_THROUGHPUT.labels(name, self.mode, 'rows').set(summary[name]['rows_per_second'])
+                ETL_STAGE_THROUGHPUT.labels(name, self.mode, 'bytes').set(summary[name]['bytes_per_second'])
+            if stats.peak_rss is not None:
+                ETL_STAGE_PEAK_RSS.labels(name, self.mode).set(stats.peak_rss)
+        return summary
+
+
+def _route_template(app: Any, scope: Dict[str, Any]) -> str:
+    """Template da rota (ex.: /models/{name}/activate), nunca o caminho concreto"""
+    from starlette.routing import Match
+
+    for route in getattr(app, 'routes', []):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            path = getattr(route, 'path', None)
+            return path if path is not None else _route_template(route, scope)
+    return 'unmatched'
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição até o último byte enviado (inclui
+    respostas em streaming, sem as background tasks) e abre uma span com o
+    template da rota
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # Antes da chamada: um Mount reescreve o path do scope
+        route = _route_template(scope.get('app', self.app), scope)
+        method = scope['method'] if scope['method'] in HTTP_METHODS else 'OTHER'
+        status = {'code': 500}
+        start = time.perf_counter()
+        observed = []
+
+        def observe():
+            # Uma vez por requisição: no último corpo enviado ou, se ele não vier, ao sair
+            nonlocal route
+            if observed:
+                return
+            observed.append(time.perf_counter() - start)
+            if route == 'unmatched':
+                # Versões mais novas do Starlette gravam a rota escolhida no scope
+                route = getattr(scope.get('route'), 'path', None) or route
+            HTTP_REQUEST_LATENCY.labels(method, route, f"{status['code'] // 100}xx").observe(observed[0])
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+            # Background tasks rodam depois do último corpo, ainda dentro de self.app,
+            # e não entram na latência da resposta
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                observe()
+
+        with span(method, {'http.method': method}) as current:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                observe()
+                if current is not None:
+                    current.update_name(f'{method} {route}')
+                    current.set_attribute('http.route', route)
+                    current.set_attribute('http.status_code', status['code'])
@@ -2,9 +2,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from prometheus_client import make_asgi_app
 
+from instrumentation import MetricsMiddleware, configure_tracing
+
 # Importar rotas
 from api.routes import predictions, metrics, analysis
 
+# Spans exportadas para o arquivo em TRACE_EXPORT_PATH, se definido
+configure_tracing()
+
 # Criar aplicação FastAPI
 app = FastAPI(
     title="API de Análise Energética",
@@ -21,6 +26,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latência por rota e spans de cada requisição
+app.add_middleware(MetricsMiddleware)
+
 # Adicionar métricas Prometheus
 metrics_app = make_asgi_app()
 app.mount("/metrics", metrics_app)
@@ -30,6 +38,20 @@ app.include_router(predictions.router, prefix="/api/v1", tags=["predictions"])
 app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
 app.include_router(analysis.router, prefix="/api/v1", tags=["analysis"])
 
+@app.on_event("startup")
+async def startup():
+    # Carrega e aquece os modelos uma vez por worker, carrega o índice da tabela
+    # de features e inicia o histórico de previsões
+    await predictions.load_models()
+    await predictions.load_features()
+    await predictions.start_history()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Encerra o refresh de modelos, o micro-batching e a gravação do histórico
+    await predictions.shutdown_models()
+    await predictions.stop_history()
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,115 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+import joblib
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+logger = logging.getLogger('model_registry')
+
+MODEL_FILE = 'model.joblib'
+METADATA_FILE = 'metadata.json'
+# Arquivo com a versão ativa de cada modelo
+CURRENT_FILE = 'CURRENT'
+
+
+def _atomic_write(path: str, content: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """
+    Registro local de modelos versionados: <raiz>/<nome>/<versão>/model.joblib.
+
+    Os modelos são gravados sem compressão para que os arrays NumPy internos
+    possam ser carregados com memory map (mmap_mode='r'): páginas só são lidas
+    quando usadas e são compartilhadas entre workers do mesmo host. Cada
+    versão é gravada num diretório temporário e renomeada ao final, e a versão
+    ativa fica no arquivo CURRENT, trocado atomicamente.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def versions(self, name: str) -> List[str]:
+        """
+        Versões gravadas de um modelo, da mais antiga para a mais nova
+        """
+        model_dir = self._model_dir(name)
+        if not os.path.isdir(model_dir):
+            return []
+        versions = [entry for entry in os.listdir(model_dir)
+                    if entry.startswith('v') and entry[1:].isdigit()
+                    and os.path.exists(os.path.join(model_dir, entry, MODEL_FILE))]
+        return sorted(versions, key=lambda version: int(version[1:]))
+
+    def save(self, name: str, model: Any, metadata: Optional[Dict[str, Any]] = None,
+             activate: bool = True) -> str:
+        """
+        Grava uma nova versão do modelo e (por padrão) a torna ativa
+        """
+        model_dir = self._model_dir(name)
+        os.makedirs(model_dir, exist_ok=True)
+        existing = self.versions(name)
+        version = f"v{int(existing[-1][1:]) + 1 if existing else 1}"
+
+        tmp_dir = tempfile.mkdtemp(prefix=f".{version}-", dir=model_dir)
+        try:
+            joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+            metadata = dict(metadata or {}, name=name, version=version,
+                            created_at=datetime.now().isoformat())
+            with open(os.path.join(tmp_dir, METADATA_FILE), 'w') as f:
+                json.dump(metadata, f, indent=2, default=str)
+            os.replace(tmp_dir, os.path.join(model_dir, version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Saved model {name} {version}")
+        if activate:
+            self.activate(name, version)
+        return version
+
+    def activate(self, name: str, version: str):
+        """
+        Marca uma versão como ativa; os workers a carregam no próximo refresh
+        """
+        if version not in self.versions(name):
+            raise ValueError(f"Unknown version {version} of model {name}")
+        _atomic_write(os.path.join(self._model_dir(name), CURRENT_FILE), version)
+
+    def current_version(self, name: str) -> Optional[str]:
+        """
+        Versão ativa do modelo (ou a mais nova, se nenhuma foi ativada)
+        """
+        current_path = os.path.join(self._model_dir(name), CURRENT_FILE)
+        if os.path.exists(current_path):
+            with open(current_path, 'r') as f:
+                return f.read().strip()
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def metadata(self, name: str, version: str) -> Dict[str, Any]:
+        with open(os.path.join(self._model_dir(name), version, METADATA_FILE), 'r') as f:
+            return json.load(f)
+
+    def load(self, name: str, version: Optional[str] = None,
+             mmap: bool = True) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Carrega (modelo, metadados) da versão pedida ou da versão ativa
+        """
+        version = version or self.current_version(name)
+        if version is None:
+            raise FileNotFoundError(f"No versions of model {name} in {self.root}")
+        path = os.path.join(self._model_dir(name), version, MODEL_FILE)
+        model = joblib.load(path, mmap_mode='r' if mmap else None)
+        logger.info(f"Loaded model {name} {version}")
+        return model, self.metadata(name, version)
@@ -1,13 +1,480 @@
-class PerformanceTracker:
+import time
+import logging
+import numpy as np
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Optional, Sequence
+
+from prometheus_client import Gauge
+
+logger = logging.getLogger('performance_tracker')
+
+MODEL_MAE = Gauge(
+    'model_mae',
+    'Erro absoluto médio da janela por região',
+    ['region']
+)
+MODEL_MAPE = Gauge(
+    'model_mape',
+    'Erro percentual absoluto médio da janela por região',
+    ['region']
+)
+DRIFT_PSI = Gauge(
+    'model_drift_psi',
+    'Population Stability Index da janela contra a referência',
+    ['series']
+)
+DRIFT_KS = Gauge(
+    'model_drift_ks',
+    'Estatística KS (sobre os histogramas) da janela contra a referência',
+    ['series']
+)
+
+# Suavização das frequências vazias no PSI
+_PSI_EPSILON = 1e-4
+
+
+def epoch_seconds(value: datetime) -> float:
+    """
+    Segundos epoch de uma data; datas sem fuso são tratadas como UTC, como no histórico
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class TimeRing:
+    """
+    Somas por intervalo de tempo numa janela deslizante de tamanho fixo.
+
+    A janela tem n_buckets intervalos de bucket_seconds; cada intervalo guarda
+    um vetor de width somas. Um intervalo é zerado quando o tempo volta a cair
+    na sua posição, então a memória é constante, seja qual for o volume.
+    """
+
+    def __init__(self, n_buckets: int, bucket_seconds: float, width: int):
+        self.n_buckets = n_buckets
+        self.bucket_seconds = bucket_seconds
+        self.sums = np.zeros((n_buckets, width))
+        self.bucket_ids = np.full(n_buckets, -1, dtype=np.int64)
+        self.latest = -1
+
+    def add(self, timestamps: np.ndarray, rows: np.ndarray):
+        """
+        Soma rows (uma linha de width valores por timestamp) aos seus intervalos
+        """
+        ids = (np.asarray(timestamps, dtype=np.float64) // self.bucket_seconds).astype(np.int64)
+        self.latest = max(self.latest, int(ids.max()))
+        # Amostras mais antigas que a janela não entram
+        keep = ids > self.latest - self.n_buckets
+        ids, rows = ids[keep], rows[keep]
+        for bucket_id in np.unique(ids):
+            slot = bucket_id % self.n_buckets
+            if self.bucket_ids[slot] != bucket_id:
+                self.sums[slot] = 0.0
+                self.bucket_ids[slot] = bucket_id
+            self.sums[slot] += rows[ids == bucket_id].sum(axis=0)
+
+    def total(self, now: Optional[float] = None) -> np.ndarray:
+        """
+        Somas dos intervalos dentro da janela que termina em now (ou no último intervalo visto)
+        """
+        latest = self.latest if now is None else int(now // self.bucket_seconds)
+        live = (self.bucket_ids > latest - self.n_buckets) & (self.bucket_ids <= latest)
+        return self.sums[live].sum(axis=0)
+
+
+class ErrorWindow:
+    """
+    MAE e MAPE de uma série numa janela deslizante, em memória constante
+    """
+
+    def __init__(self, n_buckets: int = 24, bucket_seconds: float = 3600.0):
+        # Colunas: soma |erro|, soma |erro|/|real|, linhas com real != 0, linhas
+        self.ring = TimeRing(n_buckets, bucket_seconds, 4)
+
+    def update(self, timestamps: np.ndarray, predicted: np.ndarray, actual: np.ndarray):
+        error = np.abs(predicted - actual)
+        nonzero = actual != 0
+        ape = np.divide(error, np.abs(actual), out=np.zeros_like(error), where=nonzero)
+        self.ring.add(timestamps, np.column_stack([error, ape, nonzero, np.ones_like(error)]))
+
+    def metrics(self, now: Optional[float] = None) -> Dict[str, Any]:
+        abs_error, ape, nonzero, count = self.ring.total(now)
+        return {
+            'mae': float(abs_error / count) if count else None,
+            'mape': float(ape / nonzero) if nonzero else None,
+            'count': int(count)
+        }
+
+
+def population_stability_index(reference: np.ndarray, current: np.ndarray) -> float:
+    expected = np.maximum(reference / reference.sum(), _PSI_EPSILON)
+    observed = np.maximum(current / current.sum(), _PSI_EPSILON)
+    return float(np.sum((observed - expected) * np.log(observed / expected)))
+
+
+def ks_statistic(reference: np.ndarray, current: np.ndarray) -> float:
+    """
+    Maior distância entre as CDFs, avaliada nas bordas dos bins
+    """
+    return float(np.max(np.abs(np.cumsum(reference) / reference.sum()
+                               - np.cumsum(current) / current.sum())))
+
+
+class BinnedDistribution:
+    """
+    Histograma de uma série contra uma referência fixa.
+
+    As primeiras reference_size amostras formam a referência: as bordas dos
+    bins são seus quantis (com -inf/+inf nas pontas) e as contagens ficam
+    congeladas. Depois disso cada amostra só incrementa o histograma da janela
+    atual, e PSI/KS saem da comparação dos dois histogramas, sem reler o histórico.
+    A janela é indexada pelo momento em que as amostras chegam, não pela data
+    prevista: uma previsão para daqui a 30 dias não esvazia a janela atual.
+    """
+
+    def __init__(self, n_bins: int = 10, reference_size: int = 10000,
+                 n_buckets: int = 24, bucket_seconds: float = 3600.0):
+        self.n_bins = n_bins
+        self.reference_size = reference_size
+        self.edges: Optional[np.ndarray] = None
+        self.reference: Optional[np.ndarray] = None
+        self._pending: List[np.ndarray] = []
+        self._pending_size = 0
+        self.window = TimeRing(n_buckets, bucket_seconds, n_bins)
+
+    @property
+    def ready(self) -> bool:
+        return self.reference is not None
+
+    def set_reference(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        inner = np.unique(np.quantile(values, np.linspace(0, 1, self.n_bins + 1)[1:-1]))
+        self.edges = np.concatenate([[-np.inf], inner, [np.inf]])
+        # Valores repetidos podem fundir quantis; os bins restantes ficam vazios
+        self.reference = self._counts(values)
+        self._pending, self._pending_size = [], 0
+
+    def _counts(self, values: np.ndarray) -> np.ndarray:
+        bins = np.searchsorted(self.edges, values, side='right') - 1
+        return np.bincount(np.clip(bins, 0, self.n_bins - 1), minlength=self.n_bins).astype(np.float64)
+
+    def update(self, values: np.ndarray, now: Optional[float] = None):
+        """
+        Incorpora amostras recebidas em now (segundos epoch, padrão agora)
+        """
+        now = time.time() if now is None else now
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        if not self.ready:
+            take = values[:self.reference_size - self._pending_size]
+            self._pending.append(take)
+            self._pending_size += len(take)
+            if self._pending_size >= self.reference_size:
+                self.set_reference(np.concatenate(self._pending))
+            values = values[len(take):]
+            if len(values) == 0 or not self.ready:
+                return
+        bins = np.clip(np.searchsorted(self.edges, values, side='right') - 1, 0, self.n_bins - 1)
+        counts = np.bincount(bins, minlength=self.n_bins).astype(np.float64)
+        self.window.add(np.array([now]), counts[np.newaxis, :])
+
+    def drift(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        if not self.ready:
+            return None
+        current = self.window.total(time.time() if now is None else now)
+        count = int(current.sum())
+        if count == 0:
+            return {'psi': None, 'ks': None, 'count': 0}
+        return {
+            'psi': population_stability_index(self.reference, current),
+            'ks': ks_statistic(self.reference, current),
+            'count': count
+        }
+
+
+class ModelAccuracyTracker:
+    """
+    Erro das previsões por região, casando previsões e valores reais.
+
+    As previsões aguardam o valor real numa fila por região, limitada a
+    max_pending; quando ela enche, as mais antigas da própria região são
+    descartadas. Com mais de max_pending_total no total, o descarte sai da
+    região com mais pendências, então um lote grande não esvazia as filas das
+    outras regiões. Uma nova previsão para o mesmo (região, timestamp)
+    substitui a anterior.
+    """
+
+    def __init__(self, n_buckets: int = 24, bucket_seconds: float = 3600.0, max_pending: int = 100000,
+                 max_pending_total: int = 1000000):
+        self.n_buckets = n_buckets
+        self.bucket_seconds = bucket_seconds
+        self.max_pending = max_pending
+        self.max_pending_total = max_pending_total
+        self.windows: Dict[str, ErrorWindow] = {}
+        self.pending: Dict[str, 'OrderedDict[float, float]'] = {}
+        self.pending_count = 0
+        self.unmatched_actuals = 0
+
+    def _window(self, region: str) -> ErrorWindow:
+        window = self.windows.get(region)
+        if window is None:
+            window = self.windows[region] = ErrorWindow(self.n_buckets, self.bucket_seconds)
+        return window
+
+    def _evict(self, region: str, count: int):
+        queue = self.pending[region]
+        count = min(count, len(queue))
+        for _ in range(count):
+            queue.popitem(last=False)
+        self.pending_count -= count
+        if not queue:
+            del self.pending[region]
+
+    def record_predictions(self, region: str, timestamps: Sequence[float], predicted: Sequence[float]):
+        queue = self.pending.setdefault(region, OrderedDict())
+        before = len(queue)
+        for timestamp, value in zip(timestamps, predicted):
+            timestamp = float(timestamp)
+            queue[timestamp] = float(value)
+            queue.move_to_end(timestamp)
+        self.pending_count += len(queue) - before
+        if len(queue) > self.max_pending:
+            self._evict(region, len(queue) - self.max_pending)
+        while self.pending_count > self.max_pending_total:
+            largest = max(self.pending, key=lambda key: len(self.pending[key]))
+            self._evict(largest, self.pending_count - self.max_pending_total)
+
+    def record_actuals(self, region: str, timestamps: Sequence[float], actual: Sequence[float]) -> int:
+        """
+        Incorpora valores reais das previsões pendentes; retorna quantos casaram
+        """
+        queue = self.pending.get(region, {})
+        matched_ts, matched_pred, matched_actual = [], [], []
+        for timestamp, value in zip(timestamps, actual):
+            predicted = queue.pop(float(timestamp), None)
+            if predicted is None:
+                self.unmatched_actuals += 1
+                continue
+            matched_ts.append(float(timestamp))
+            matched_pred.append(predicted)
+            matched_actual.append(float(value))
+        self.pending_count -= len(matched_ts)
+        if region in self.pending and not queue:
+            del self.pending[region]
+        if matched_ts:
+            self.record_pairs(region, matched_ts, matched_pred, matched_actual)
+        return len(matched_ts)
+
+    def record_pairs(self, region: str, timestamps: Sequence[float], predicted: Sequence[float],
+                     actual: Sequence[float]):
+        """
+        Incorpora pares previsão/real já casados
+        """
+        self._window(region).update(np.asarray(timestamps, dtype=np.float64),
+                                    np.asarray(predicted, dtype=np.float64),
+                                    np.asarray(actual, dtype=np.float64))
+
+    def metrics(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        return {region: window.metrics(now) for region, window in self.windows.items()}
+
+
+class DriftDetector:
+    """
+    Drift das features e das previsões (PSI e KS) por série, incremental
+    """
+
+    def __init__(self, n_bins: int = 10, reference_size: int = 10000,
+                 n_buckets: int = 24, bucket_seconds: float = 3600.0):
+        self.n_bins = n_bins
+        self.reference_size = reference_size
+        self.n_buckets = n_buckets
+        self.bucket_seconds = bucket_seconds
+        self.distributions: Dict[str, BinnedDistribution] = {}
+
+    def _distribution(self, name: str) -> BinnedDistribution:
+        distribution = self.distributions.get(name)
+        if distribution is None:
+            distribution = self.distributions[name] = BinnedDistribution(
+                self.n_bins, self.reference_size, self.n_buckets, self.bucket_seconds)
+        return distribution
+
+    def set_reference(self, name: str, values: Sequence[float]):
+        self._distribution(name).set_reference(np.asarray(values, dtype=np.float64))
+
+    def update(self, name: str, values: Sequence[float], now: Optional[float] = None):
+        self._distribution(name).update(values, now)
+
+    def drift(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        report = {}
+        for name, distribution in self.distributions.items():
+            result = distribution.drift(now)
+            if result is not None:
+                report[name] = result
+        return report
+
+
+class HealthMonitor:
+    """
+    Volume e atraso dos dados que chegam ao tracker
+    """
+
     def __init__(self):
+        self.predictions = 0
+        self.actuals = 0
+        self.last_prediction_at: Optional[float] = None
+        self.last_actual_at: Optional[float] = None
+
+    def record(self, kind: str, count: int):
+        now = time.time()
+        if kind == 'predictions':
+            self.predictions += count
+            self.last_prediction_at = now
+        else:
+            self.actuals += count
+            self.last_actual_at = now
+
+    def status(self, pending: int, unmatched_actuals: int) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            'predictions': self.predictions,
+            'actuals': self.actuals,
+            'pending_predictions': pending,
+            'unmatched_actuals': unmatched_actuals,
+            'seconds_since_prediction': now - self.last_prediction_at if self.last_prediction_at else None,
+            'seconds_since_actual': now - self.last_actual_at if self.last_actual_at else None
+        }
+
+
+class PerformanceTracker:
+    """
+    Acompanha o desempenho do modelo a partir do fluxo de previsões e valores reais.
+
+    Cada chamada de record_* só atualiza somas e histogramas de tamanho fixo;
+    evaluate_system_performance() lê esse estado (custo independente do
+    histórico) e chama update_models_if_needed, que só aciona o retreino
+    quando algum limiar é ultrapassado e o cooldown já passou.
+    """
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None,
+                 retrain_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 retrain_cooldown: float = 86400.0, min_samples: int = 500,
+                 n_bins: int = 10, reference_size: int = 10000,
+                 n_buckets: int = 24, bucket_seconds: float = 3600.0):
         self.metrics = {
-            'model_accuracy': ModelAccuracyTracker(),
-            'prediction_drift': DriftDetector(),
+            'model_accuracy': ModelAccuracyTracker(n_buckets, bucket_seconds),
+            'prediction_drift': DriftDetector(n_bins, reference_size, n_buckets, bucket_seconds),
             'system_health': HealthMonitor()
         }
-    
-    def evaluate_system_performance(self):
-        # ... existing code ...
-        self.update_models_if_needed()
-        self.generate_performance_report()
-        # ... existing code ... 
\ No newline at end of file
+        # PSI > 0.2 é o limiar usual de mudança significativa de população
+        self.thresholds = thresholds or {'psi': 0.2, 'ks': 0.2, 'mape': 0.15}
+        self.retrain_callback = retrain_callback
+        self.retrain_cooldown = retrain_cooldown
+        # Janelas com menos amostras não disparam retreino
+        self.min_samples = min_samples
+        self.last_retrain_at: Optional[float] = None
+
+    def record_predictions(self, region: str, timestamps: Sequence[float], predicted: Sequence[float],
+                           features: Optional[Dict[str, Sequence[float]]] = None,
+                           now: Optional[float] = None):
+        """
+        Previsões feitas (timestamps previstos em segundos epoch) e as features usadas.
+
+        Os timestamps só casam as previsões com os valores reais; o drift é
+        contado no momento do registro (now, padrão agora).
+        """
+        self.metrics['model_accuracy'].record_predictions(region, timestamps, predicted)
+        drift = self.metrics['prediction_drift']
+        drift.update('prediction', predicted, now)
+        for name, values in (features or {}).items():
+            drift.update(f'feature:{name}', values, now)
+        self.metrics['system_health'].record('predictions', len(timestamps))
+
+    def record_history_rows(self, rows: List[Dict[str, Any]], default_region: str = 'all'):
+        """
+        Registra um lote de linhas do histórico de previsões (o formato gravado
+        pelo AsyncHistoryWriter), cada uma na série da sua região; linhas sem
+        região entram em default_region
+        """
+        by_region: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_region.setdefault(row.get('region') or default_region, []).append(row)
+        for region, region_rows in by_region.items():
+            features = {name: [row[name] if row[name] is not None else np.nan for row in region_rows]
+                        for name in ('temperature', 'humidity', 'seasonality')}
+            self.record_predictions(region, [epoch_seconds(row['timestamp']) for row in region_rows],
+                                    [row['predicted'] for row in region_rows], features)
+
+    def record_actuals(self, region: str, timestamps: Sequence[float], actual: Sequence[float]) -> int:
+        """
+        Valores reais observados; o erro entra na janela pela data da observação
+        """
+        self.metrics['system_health'].record('actuals', len(timestamps))
+        return self.metrics['model_accuracy'].record_actuals(region, timestamps, actual)
+
+    def evaluate_system_performance(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Estado das janelas que terminam em now; sem now, o erro usa a última
+        observação recebida e o drift o momento atual
+        """
+        accuracy = self.metrics['model_accuracy']
+        report = {
+            'accuracy': accuracy.metrics(now),
+            'drift': self.metrics['prediction_drift'].drift(now),
+            'health': self.metrics['system_health'].status(accuracy.pending_count,
+                                                           accuracy.unmatched_actuals)
+        }
+        report['violations'] = self._violations(report)
+        self.update_models_if_needed(report)
+        return self.generate_performance_report(report)
+
+    def _violations(self, report: Dict[str, Any]) -> List[Dict[str, Any]]:
+        violations = []
+        for series, drift in report['drift'].items():
+            if drift['count'] < self.min_samples:
+                continue
+            for metric in ('psi', 'ks'):
+                if drift[metric] is not None and drift[metric] > self.thresholds[metric]:
+                    violations.append({'series': series, 'metric': metric, 'value': drift[metric]})
+        for region, errors in report['accuracy'].items():
+            if errors['count'] >= self.min_samples and errors['mape'] is not None \
+                    and errors['mape'] > self.thresholds['mape']:
+                violations.append({'series': f'region:{region}', 'metric': 'mape', 'value': errors['mape']})
+        return violations
+
+    def update_models_if_needed(self, report: Dict[str, Any]) -> bool:
+        """
+        Aciona o retreino se houver violações e o último retreino passou do cooldown
+        """
+        if not report['violations'] or self.retrain_callback is None:
+            return False
+        now = time.time()
+        if self.last_retrain_at is not None and now - self.last_retrain_at < self.retrain_cooldown:
+            return False
+        logger.warning(f"Triggering model update: {report['violations']}")
+        self.last_retrain_at = now
+        try:
+            self.retrain_callback(report)
+        except Exception as e:
+            logger.error(f"Model update failed: {e}")
+            return False
+        return True
+
+    def generate_performance_report(self, report: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Publica o relatório nas métricas do Prometheus e o retorna
+        """
+        for region, errors in report['accuracy'].items():
+            if errors['mae'] is not None:
+                MODEL_MAE.labels(region).set(errors['mae'])
+            if errors['mape'] is not None:
+                MODEL_MAPE.labels(region).set(errors['mape'])
+        for series, drift in report['drift'].items():
+            if drift['psi'] is not None:
+                DRIFT_PSI.labels(series).set(drift['psi'])
+                DRIFT_KS.labels(series).set(drift['ks'])
+        return report
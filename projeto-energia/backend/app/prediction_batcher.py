@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import numpy as np
+from concurrent.futures import Executor
+from typing import Callable, List, Optional, Tuple
+
+from prometheus_client import Gauge, Histogram
+
+logger = logging.getLogger('prediction_batcher')
+
+PredictFn = Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+
+# Marcador enfileirado por close() depois da última previsão aceita
+_STOP = object()
+
+# Métricas exportadas no /metrics já montado em main.py
+QUEUE_DEPTH = Gauge(
+    'prediction_batcher_queue_depth',
+    'Previsões aguardando na fila do micro-batching',
+    ['batcher']
+)
+BATCH_SIZE = Histogram(
+    'prediction_batcher_batch_size',
+    'Quantidade de previsões por chamada do modelo',
+    ['batcher'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+)
+BATCH_WAIT = Histogram(
+    'prediction_batcher_wait_seconds',
+    'Tempo entre a chegada da primeira previsão do lote e a chamada do modelo',
+    ['batcher']
+)
+
+
+class MicroBatcher:
+    """
+    Agrupa previsões individuais concorrentes em uma única chamada vetorizada.
+
+    Cada chamada a submit entra em uma fila; o worker junta até max_batch_size
+    linhas ou espera no máximo max_wait_ms desde a primeira, executa o modelo
+    em um executor (fora do event loop) e resolve o future de cada chamador.
+    Enquanto o modelo roda, novas requisições se acumulam para o próximo lote.
+    Uma linha inválida falha apenas o seu próprio chamador.
+    """
+
+    def __init__(self, predict_fn: PredictFn, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 executor: Optional[Executor] = None, name: str = 'predictions'):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def _ensure_worker(self):
+        """Cria fila e worker no event loop atual (na primeira chamada ou se o loop mudou)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, row: np.ndarray) -> Tuple[float, float]:
+        """
+        Enfileira uma linha de features e aguarda (previsão, confiança)
+        """
+        if self._closing:
+            raise RuntimeError(f"MicroBatcher '{self.name}' is closed")
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((row, future))
+        QUEUE_DEPTH.labels(self.name).set(self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> Tuple[List[Tuple[np.ndarray, asyncio.Future]], bool]:
+        """
+        Espera a primeira linha e junta as seguintes até encher o lote ou o prazo
+        acabar; o segundo valor indica que close() pediu o fim do worker
+        """
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = self._loop.time() + self.max_wait
+        stop = False
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        BATCH_WAIT.labels(self.name).observe(self.max_wait - max(0.0, deadline - self._loop.time()))
+        return batch, stop
+
+    def _stack(self, batch: List[Tuple[np.ndarray, asyncio.Future]]) -> Tuple[
+            np.ndarray, List[Tuple[np.ndarray, asyncio.Future]]]:
+        """
+        Monta a matriz do lote; linhas que não viram um vetor numérico da largura
+        mais comum falham só os seus próprios futures
+        """
+        rows = []
+        for row, future in batch:
+            try:
+                rows.append((np.asarray(row, dtype=float).reshape(-1), future))
+            except (TypeError, ValueError) as e:
+                future.set_exception(ValueError(f"Invalid feature row: {e}"))
+        if not rows:
+            return np.empty((0, 0)), []
+        widths = [len(row) for row, _ in rows]
+        width = max(set(widths), key=widths.count)
+        valid = []
+        for row, future in rows:
+            if len(row) == width:
+                valid.append((row, future))
+            else:
+                future.set_exception(ValueError(f"Expected {width} features, got {len(row)}"))
+        return np.vstack([row for row, _ in valid]), valid
+
+    async def _run(self):
+        stop = False
+        while not stop:
+            batch, stop = await self._collect()
+            QUEUE_DEPTH.labels(self.name).set(self._queue.qsize())
+
+            # Chamadores que desistiram (ex.: cliente desconectou) não entram no lote
+            batch = [(row, future) for row, future in batch if not future.done()]
+            if not batch:
+                continue
+            BATCH_SIZE.labels(self.name).observe(len(batch))
+
+            try:
+                matrix, batch = self._stack(batch)
+                if not batch:
+                    continue
+                predicted, confidence = await self._loop.run_in_executor(
+                    self.executor, self.predict_fn, matrix)
+            except Exception as e:
+                logger.error(f"Batch prediction failed for {len(batch)} rows: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result((float(predicted[i]), float(confidence[i])))
+
+    async def close(self, timeout: Optional[float] = 30.0):
+        """
+        Para de aceitar previsões e espera o worker terminar o lote em execução e
+        as linhas já enfileiradas; só depois de timeout segundos o worker é
+        cancelado e as previsões restantes são canceladas. Terminado o close, o
+        batcher volta ao estado inicial e um novo submit recria o worker
+        """
+        self._closing = True
+        if self._worker is not None:
+            if not self._worker.done():
+                self._queue.put_nowait(_STOP)
+                try:
+                    await asyncio.wait_for(asyncio.shield(self._worker), timeout)
+                except asyncio.TimeoutError:
+                    logger.warning(f"MicroBatcher '{self.name}' did not drain in {timeout}s, cancelling")
+            if not self._worker.done():
+                self._worker.cancel()
+                try:
+                    await self._worker
+                except asyncio.CancelledError:
+                    pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is not _STOP:
+                    item[1].cancel()
+            QUEUE_DEPTH.labels(self.name).set(0)
+        self._closing = False
@@ -0,0 +1,228 @@
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger('prediction_cache')
+
+CACHE_HITS = Counter(
+    'prediction_cache_hits_total',
+    'Previsões servidas pelo cache',
+    ['cache', 'tier']
+)
+CACHE_MISSES = Counter(
+    'prediction_cache_misses_total',
+    'Previsões não encontradas no cache',
+    ['cache']
+)
+CACHE_EVICTIONS = Counter(
+    'prediction_cache_evictions_total',
+    'Entradas removidas do cache em memória por LRU ou TTL',
+    ['cache']
+)
+CACHE_HIT_RATIO = Gauge(
+    'prediction_cache_hit_ratio',
+    'Fração das consultas servidas pelo cache desde o início do processo',
+    ['cache']
+)
+CACHE_ENTRIES = Gauge(
+    'prediction_cache_entries',
+    'Entradas no cache em memória',
+    ['cache']
+)
+
+
+def cache_key(model_version: Optional[str], payload: Dict[str, Any]) -> str:
+    """
+    Hash canônico de (versão do modelo, entrada da previsão)
+    """
+    canonical = json.dumps({'model_version': model_version, 'payload': payload},
+                           sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """
+    Cache em arquivo SQLite compartilhado entre os workers uvicorn do mesmo host
+    """
+
+    def __init__(self, path: str, purge_every: int = 1000):
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        with self._lock, self._conn:
+            # WAL permite leituras concorrentes de outros processos durante as escritas
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS prediction_cache '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM prediction_cache WHERE key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO prediction_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value, default=str), time.time() + ttl)
+            )
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._conn.execute('DELETE FROM prediction_cache WHERE expires_at <= ?', (time.time(),))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM prediction_cache')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PredictionCache:
+    """
+    Cache de previsões com LRU limitado e TTL, opcionalmente com um segundo
+    nível compartilhado (SQLiteCacheBackend).
+
+    As chaves incluem a versão do modelo, então uma troca de modelo nunca serve
+    resultado antigo; invalidate() ainda libera a memória das entradas antigas.
+    Os valores devem ser serializáveis em JSON.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0,
+                 backend: Optional[SQLiteCacheBackend] = None, name: str = 'predictions'):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.backend = backend
+        self.name = name
+        self._entries: 'OrderedDict[str, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            CACHE_HIT_RATIO.labels(self.name).set(self.hit_ratio)
+
+    def _get_local(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                CACHE_EVICTIONS.labels(self.name).inc()
+                CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                CACHE_EVICTIONS.labels(self.name).inc()
+            CACHE_ENTRIES.labels(self.name).set(len(self._entries))
+
+    def _get_shared(self, key: str) -> Optional[Any]:
+        try:
+            return self.backend.get(key)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache read failed: {e}")
+            return None
+
+    def _set_shared(self, key: str, value: Any):
+        try:
+            self.backend.set(key, value, self.ttl)
+        except sqlite3.Error as e:
+            logger.error(f"Shared cache write failed: {e}")
+
+    def _shared_hit(self, key: str, value: Any) -> Any:
+        CACHE_HITS.labels(self.name, 'shared').inc()
+        self._count(True)
+        self._set_local(key, value)
+        return value
+
+    def _miss(self) -> None:
+        CACHE_MISSES.labels(self.name).inc()
+        self._count(False)
+        return None
+
+    def _memory_hit(self, key: str) -> Optional[Any]:
+        value = self._get_local(key)
+        if value is not None:
+            CACHE_HITS.labels(self.name, 'memory').inc()
+            self._count(True)
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._memory_hit(key)
+        if value is not None:
+            return value
+        if self.backend is not None:
+            value = self._get_shared(key)
+            if value is not None:
+                return self._shared_hit(key, value)
+        return self._miss()
+
+    def set(self, key: str, value: Any):
+        self._set_local(key, value)
+        if self.backend is not None:
+            self._set_shared(key, value)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """
+        get para handlers async: a consulta ao SQLite, que pode esperar o lock
+        de outro worker, roda no executor e não bloqueia o event loop
+        """
+        value = self._memory_hit(key)
+        if value is not None:
+            return value
+        if self.backend is not None:
+            value = await asyncio.get_running_loop().run_in_executor(None, self._get_shared, key)
+            if value is not None:
+                return self._shared_hit(key, value)
+        return self._miss()
+
+    async def aset(self, key: str, value: Any):
+        """
+        set para handlers async, gravando no SQLite pelo executor
+        """
+        self._set_local(key, value)
+        if self.backend is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._set_shared, key, value)
+
+    def invalidate(self):
+        """
+        Descarta as entradas em memória (ex.: após trocar a versão do modelo)
+        """
+        with self._lock:
+            self._entries.clear()
+            CACHE_ENTRIES.labels(self.name).set(0)
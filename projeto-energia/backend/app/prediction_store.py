@@ -0,0 +1,239 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from prometheus_client import Counter
+from sqlalchemy import (Column, DateTime, Float, Index, Integer, MetaData, String, Table,
+                        and_, create_engine, func, inspect, or_, select)
+
+logger = logging.getLogger('prediction_store')
+
+metadata = MetaData()
+
+predictions_table = Table(
+    'predictions', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('timestamp', DateTime, nullable=False),
+    Column('region', String(128)),
+    Column('predicted', Float, nullable=False),
+    Column('confidence', Float, nullable=False),
+    Column('temperature', Float),
+    Column('humidity', Float),
+    Column('day_type', String(32)),
+    Column('seasonality', Float),
+    Column('model_version', String(32)),
+    Column('created_at', DateTime, nullable=False),
+    # Cobre o filtro por período e a ordem da paginação por chave (timestamp, id)
+    Index('ix_predictions_timestamp_id', 'timestamp', 'id')
+)
+
+# Formato do início de cada intervalo no SQLite e unidade do date_trunc no PostgreSQL
+GRANULARITIES = {
+    'hourly': ('%Y-%m-%d %H:00:00', 'hour'),
+    'daily': ('%Y-%m-%d 00:00:00', 'day'),
+    'monthly': ('%Y-%m-01 00:00:00', 'month')
+}
+
+HISTORY_DROPPED = Counter(
+    'prediction_history_dropped_total',
+    'Previsões descartadas do histórico por fila cheia'
+)
+
+Cursor = Tuple[datetime, int]
+
+
+def _naive_utc(value: datetime) -> datetime:
+    """
+    Datas com fuso são gravadas em UTC sem fuso, como as demais
+    """
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    timestamp, row_id = cursor
+    return f"{timestamp.isoformat()}_{row_id}"
+
+
+def decode_cursor(value: str) -> Cursor:
+    timestamp, row_id = value.rsplit('_', 1)
+    return datetime.fromisoformat(timestamp), int(row_id)
+
+
+class PredictionStore:
+    """
+    Histórico de previsões em banco SQL (SQLite local ou PostgreSQL).
+
+    As consultas usam o índice (timestamp, id): o período é filtrado no banco e
+    a paginação continua a partir da última chave lida em vez de usar OFFSET,
+    então cada página custa o mesmo independente da posição no histórico.
+    """
+
+    def __init__(self, url: str = 'sqlite:///predictions.db'):
+        self.engine = create_engine(url)
+
+    def create_schema(self):
+        metadata.create_all(self.engine)
+        # Históricos criados antes da coluna region ganham a coluna, vazia
+        columns = {column['name'] for column in inspect(self.engine).get_columns('predictions')}
+        if 'region' not in columns:
+            with self.engine.begin() as conn:
+                conn.exec_driver_sql('ALTER TABLE predictions ADD COLUMN region VARCHAR(128)')
+
+    def write_many(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Grava um lote de previsões numa única transação
+        """
+        if not rows:
+            return 0
+        now = datetime.utcnow()
+        for row in rows:
+            row['timestamp'] = _naive_utc(row['timestamp'])
+            row.setdefault('created_at', now)
+        with self.engine.begin() as conn:
+            conn.execute(predictions_table.insert(), rows)
+        return len(rows)
+
+    @staticmethod
+    def _range_filter(start_date: Optional[datetime], end_date: Optional[datetime]) -> List[Any]:
+        conditions = []
+        if start_date is not None:
+            conditions.append(predictions_table.c.timestamp >= _naive_utc(start_date))
+        if end_date is not None:
+            conditions.append(predictions_table.c.timestamp <= _naive_utc(end_date))
+        return conditions
+
+    def page(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+             limit: int = 1000,
+             after: Optional[Cursor] = None) -> Tuple[List[Dict[str, Any]], Optional[Cursor]]:
+        """
+        Uma página de previsões em ordem de timestamp e o cursor da próxima (None no fim)
+        """
+        table = predictions_table
+        conditions = self._range_filter(start_date, end_date)
+        if after is not None:
+            timestamp, row_id = after
+            conditions.append(or_(table.c.timestamp > timestamp,
+                                  and_(table.c.timestamp == timestamp, table.c.id > row_id)))
+        query = (select(table).where(*conditions)
+                 .order_by(table.c.timestamp, table.c.id).limit(limit + 1))
+        with self.engine.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(query)]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]['timestamp'], rows[-1]['id'])
+        return rows, next_cursor
+
+    def _bucket(self, granularity: str):
+        sqlite_format, postgres_unit = GRANULARITIES[granularity]
+        if self.engine.dialect.name == 'sqlite':
+            return func.strftime(sqlite_format, predictions_table.c.timestamp)
+        return func.date_trunc(postgres_unit, predictions_table.c.timestamp)
+
+    def aggregate(self, granularity: str, start_date: Optional[datetime] = None,
+                  end_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        Previsões agregadas por intervalo (hourly, daily ou monthly), calculadas no banco
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        table = predictions_table
+        bucket = self._bucket(granularity).label('bucket')
+        query = (select(bucket,
+                        func.avg(table.c.predicted).label('predicted'),
+                        func.min(table.c.predicted).label('predicted_min'),
+                        func.max(table.c.predicted).label('predicted_max'),
+                        func.avg(table.c.confidence).label('confidence'),
+                        func.count().label('count'))
+                 .where(*self._range_filter(start_date, end_date))
+                 .group_by(bucket).order_by(bucket))
+        with self.engine.connect() as conn:
+            rows = [dict(row._mapping) for row in conn.execute(query)]
+        for row in rows:
+            bucket_value = row.pop('bucket')
+            row['timestamp'] = (datetime.fromisoformat(bucket_value)
+                                if isinstance(bucket_value, str) else bucket_value)
+        return rows
+
+
+class AsyncHistoryWriter:
+    """
+    Grava previsões no PredictionStore em lotes, fora do caminho da requisição.
+
+    record() só coloca a linha numa fila limitada; um worker junta até
+    batch_size linhas ou espera flush_interval segundos e grava o lote num
+    executor. Com a fila cheia a linha é descartada (e contada) em vez de
+    atrasar a previsão. on_write, se dado, recebe cada lote no event loop
+    antes da gravação (ex.: PerformanceTracker.record_history_rows).
+    """
+
+    def __init__(self, store: PredictionStore, batch_size: int = 500,
+                 flush_interval: float = 1.0, max_queue: int = 100000,
+                 on_write: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.store = store
+        self.on_write = on_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        # Linhas já retiradas da fila e ainda não gravadas
+        self._pending: List[Dict[str, Any]] = []
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def record(self, row: Dict[str, Any]):
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            HISTORY_DROPPED.inc()
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        rows = []
+        while len(rows) < limit and not self._queue.empty():
+            rows.append(self._queue.get_nowait())
+        return rows
+
+    async def _write(self, rows: List[Dict[str, Any]]):
+        if self.on_write is not None and rows:
+            try:
+                self.on_write(rows)
+            except Exception as e:
+                logger.error(f"History listener failed for {len(rows)} predictions: {e}")
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.store.write_many, rows)
+        except Exception as e:
+            logger.error(f"Error writing {len(rows)} predictions to history: {e}")
+
+    async def _run(self):
+        while True:
+            self._pending = [await self._queue.get()]
+            if self._queue.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.flush_interval)
+            self._pending.extend(self._drain(self.batch_size - 1))
+            rows, self._pending = self._pending, []
+            await self._write(rows)
+
+    async def close(self):
+        """
+        Para o worker e grava o que ainda estiver na fila
+        """
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        rows, self._pending = self._pending, []
+        rows.extend(self._drain(self._queue.qsize()))
+        await self._write(rows)
@@ -1,10 +1,161 @@
+import time
+import logging
+import threading
+import numpy as np
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+from prometheus_client import Histogram
+
+from instrumentation import span
+from model_registry import ModelRegistry
+
+logger = logging.getLogger('predictor')
+
+MODEL_NAMES = ('consumption', 'anomaly', 'efficiency')
+
+INFERENCE_SECONDS = Histogram(
+    'model_inference_seconds',
+    'Tempo de cada chamada do modelo',
+    ['model'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+INFERENCE_ROWS = Histogram(
+    'model_inference_batch_rows',
+    'Linhas por chamada do modelo',
+    ['model'],
+    buckets=(1, 8, 64, 512, 4096, 32768, 100000)
+)
+
+
+class LoadedModel:
+    def __init__(self, name: str, version: str, model: Any, metadata: Dict[str, Any]):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.metadata = metadata
+
+
 class EnergyPredictor:
-    def __init__(self):
-        self.models = {
-            'consumption': XGBoostRegressor(),
-            'anomaly': IsolationForest(),
-            'efficiency': RandomForestClassifier()
-        }
-        
-        self.feature_engineering = FeatureProcessor()
-        self.model_validator = CrossValidator() 
\ No newline at end of file
+    """
+    Modelos de consumo, anomalia e eficiência servidos a partir do ModelRegistry.
+
+    Os modelos são carregados e aquecidos uma vez por worker. A troca de versão
+    carrega e aquece a nova versão fora do caminho das requisições e só então
+    substitui o dicionário de modelos inteiro: cada previsão usa o snapshot que
+    leu no início, então nenhuma requisição é perdida ou vê um modelo pela metade.
+    """
+
+    def __init__(self, registry: ModelRegistry, n_features: int = 4, warmup_rows: int = 64):
+        self.registry = registry
+        self.n_features = n_features
+        self.warmup_rows = warmup_rows
+        self.models: Dict[str, LoadedModel] = {}
+        self._swap_lock = threading.Lock()
+        # Chamados com (nome, versão) após cada troca, ex.: para invalidar caches
+        self.swap_listeners: List[Callable[[str, str], None]] = []
+
+    @property
+    def is_loaded(self) -> bool:
+        return 'consumption' in self.models
+
+    def versions(self) -> Dict[str, str]:
+        return {name: loaded.version for name, loaded in self.models.items()}
+
+    def version(self, name: str = 'consumption') -> Optional[str]:
+        loaded = self.models.get(name)
+        return loaded.version if loaded is not None else None
+
+    def _notify_swap(self, name: str, version: str):
+        for listener in self.swap_listeners:
+            try:
+                listener(name, version)
+            except Exception as e:
+                logger.error(f"Swap listener failed for model {name}: {e}")
+
+    def warm_up(self, loaded: LoadedModel):
+        """
+        Executa o modelo num lote fictício para carregar páginas e caches antes do tráfego real
+        """
+        n_features = loaded.metadata.get('n_features',
+                                         getattr(loaded.model, 'n_features_in_', self.n_features))
+        loaded.model.predict(np.zeros((self.warmup_rows, n_features)))
+
+    def _load_warm(self, name: str, version: Optional[str] = None) -> LoadedModel:
+        model, metadata = self.registry.load(name, version)
+        loaded = LoadedModel(name, metadata['version'], model, metadata)
+        self.warm_up(loaded)
+        return loaded
+
+    def load(self) -> Dict[str, str]:
+        """
+        Carrega a versão ativa de cada modelo disponível no registro
+        """
+        loaded = {name: self._load_warm(name) for name in MODEL_NAMES
+                  if self.registry.current_version(name) is not None}
+        with self._swap_lock:
+            self.models = loaded
+        logger.info(f"Loaded models {self.versions()}")
+        for name, version in self.versions().items():
+            self._notify_swap(name, version)
+        return self.versions()
+
+    def install(self, loaded: LoadedModel) -> str:
+        """
+        Substitui atomicamente o modelo por uma versão já carregada e aquecida
+        """
+        with self._swap_lock:
+            models = dict(self.models)
+            models[loaded.name] = loaded
+            self.models = models  # Substitui a referência; leitores em andamento mantêm o snapshot antigo
+        logger.info(f"Swapped model {loaded.name} to {loaded.version}")
+        self._notify_swap(loaded.name, loaded.version)
+        return loaded.version
+
+    def swap(self, name: str, version: Optional[str] = None) -> str:
+        """
+        Troca atomicamente um modelo pela versão pedida (ou pela ativa no registro)
+        """
+        return self.install(self._load_warm(name, version))
+
+    def activate(self, name: str, version: str) -> str:
+        """
+        Carrega e aquece a versão, só então a marca como ativa no registro e a
+        instala: se o carregamento falhar, CURRENT continua na versão anterior
+        e os demais workers não tentam carregar uma versão quebrada
+        """
+        if version not in self.registry.versions(name):
+            raise ValueError(f"Unknown version {version} of model {name}")
+        loaded = self._load_warm(name, version)
+        self.registry.activate(name, version)
+        return self.install(loaded)
+
+    def refresh(self) -> List[str]:
+        """
+        Carrega as versões ativadas no registro desde o último carregamento
+        """
+        swapped = []
+        for name in MODEL_NAMES:
+            current = self.registry.current_version(name)
+            loaded = self.models.get(name)
+            if current is not None and (loaded is None or loaded.version != current):
+                self.swap(name, current)
+                swapped.append(name)
+        return swapped
+
+    def predict(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Previsão de consumo e confiança para cada linha da matriz de features
+        """
+        models = self.models
+        if 'consumption' not in models:
+            raise RuntimeError("Consumption model not loaded")
+        consumption = models['consumption']
+        start = time.perf_counter()
+        with span('model.predict', {'model': 'consumption', 'model.version': consumption.version,
+                                    'rows': len(matrix)}):
+            predicted = np.asarray(consumption.model.predict(matrix), dtype=float)
+        INFERENCE_SECONDS.labels('consumption').observe(time.perf_counter() - start)
+        INFERENCE_ROWS.labels('consumption').observe(len(matrix))
+        # Confiança do modelo medida na validação, gravada nos metadados da versão
+        confidence = np.full(len(predicted), float(consumption.metadata.get('confidence', 0.95)))
+        return predicted, confidence
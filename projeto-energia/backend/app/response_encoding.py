@@ -0,0 +1,187 @@
+import io
+import json
+import itertools
+import numpy as np
+import pandas as pd
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+
+JSON_MEDIA_TYPE = 'application/json'
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+MEDIA_TYPES = (JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, ARROW_MEDIA_TYPE)
+
+# Linhas serializadas por bloco (e por record batch no Arrow)
+STREAM_CHUNK_SIZE = 1000
+
+
+def negotiate(accept: Optional[str], default: str = JSON_MEDIA_TYPE) -> str:
+    """
+    Formato da resposta pelo cabeçalho Accept, respeitando os pesos q;
+    */* ou um Accept sem formato suportado resultam no padrão
+    """
+    best, best_q = default, 0.0
+    for part in (accept or '').split(','):
+        media_type, *params = [piece.strip() for piece in part.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in MEDIA_TYPES and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def chunked(items: Iterable[Any], size: int = STREAM_CHUNK_SIZE) -> Iterator[List[Any]]:
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def encode_json(chunks: Iterable[List[Dict[str, Any]]], ndjson: bool = False) -> Iterator[bytes]:
+    """
+    Serializa os blocos como array JSON (ou NDJSON) à medida que são gerados
+    """
+    if not ndjson:
+        yield b'['
+    first = True
+    for rows in chunks:
+        if ndjson:
+            text = ''.join(json.dumps(row, default=_json_default) + '\n' for row in rows)
+        else:
+            text = ('' if first else ',') + json.dumps(rows, default=_json_default)[1:-1]
+        first = False
+        yield text.encode()
+    if not ndjson:
+        yield b']'
+
+
+def encode_arrow(batches: Iterable[Any]) -> Iterator[bytes]:
+    """
+    Serializa record batches do pyarrow como um stream Arrow IPC; o schema é o
+    do primeiro batch e cada batch é enviado assim que é escrito
+    """
+    import pyarrow as pa
+
+    buffer = io.BytesIO()
+    writer = None
+    for batch in batches:
+        if writer is None:
+            writer = pa.ipc.new_stream(buffer, batch.schema)
+        writer.write_batch(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if writer is None:
+        # Sem linhas: um stream válido com schema vazio
+        writer = pa.ipc.new_stream(buffer, pa.schema([]))
+    writer.close()
+    yield buffer.getvalue()
+
+
+def _without_null_types(schema: Any) -> Any:
+    """
+    Troca por string os tipos null (inclusive dentro de structs), inferidos
+    quando um campo só tem None no primeiro bloco
+    """
+    import pyarrow as pa
+
+    def fix(data_type):
+        if pa.types.is_null(data_type):
+            return pa.string()
+        if pa.types.is_struct(data_type):
+            return pa.struct([field.with_type(fix(field.type)) for field in data_type])
+        return data_type
+
+    return pa.schema([field.with_type(fix(field.type)) for field in schema], metadata=schema.metadata)
+
+
+def _row_batches(chunks: Iterable[List[Dict[str, Any]]], schema: Any = None) -> Iterator[Any]:
+    """
+    Record batches das linhas no schema dado; sem schema ele é inferido do
+    primeiro bloco, com campos só de None tipados como string. Valores de
+    blocos seguintes com outro tipo são convertidos, então um bloco nunca
+    quebra o stream depois que o status 200 já foi enviado
+    """
+    import pyarrow as pa
+
+    for rows in chunks:
+        if schema is None:
+            names = list(rows[0])
+            # Dicts aninhados viram structs, datetimes viram timestamps
+            inferred = pa.RecordBatch.from_arrays([pa.array([row[name] for row in rows]) for name in names],
+                                                  names=names)
+            schema = _without_null_types(inferred.schema)
+        arrays = []
+        for field in schema:
+            values = [row.get(field.name) for row in rows]
+            try:
+                arrays.append(pa.array(values, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays.append(pa.array(values).cast(field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _frame_chunks(frame: pd.DataFrame, size: int) -> Iterator[pd.DataFrame]:
+    # Um DataFrame vazio ainda gera um bloco, para o schema do Arrow
+    for start in range(0, max(len(frame), 1), size):
+        yield frame.iloc[start:start + size]
+
+
+def stream_rows(items: Iterable[Dict[str, Any]], accept: Optional[str] = None,
+                headers: Optional[Dict[str, str]] = None,
+                background: Optional[BackgroundTask] = None,
+                arrow_schema: Optional[Callable[[], Any]] = None) -> StreamingResponse:
+    """
+    Resposta em streaming de linhas já validadas (dados internos, sem passar
+    pelo response_model): JSON, NDJSON ou Arrow IPC conforme o Accept.
+    Os itens são consumidos em blocos enquanto a resposta é enviada.
+    arrow_schema retorna o schema pyarrow das linhas e só é chamado quando a
+    resposta é Arrow; sem ele o schema é inferido do primeiro bloco.
+    """
+    media_type = negotiate(accept)
+    chunks = chunked(items)
+    if media_type == ARROW_MEDIA_TYPE:
+        body = encode_arrow(_row_batches(chunks, arrow_schema() if arrow_schema else None))
+    else:
+        body = encode_json(chunks, ndjson=media_type == NDJSON_MEDIA_TYPE)
+    return StreamingResponse(body, media_type=media_type, headers=headers, background=background)
+
+
+def stream_frame(frame: pd.DataFrame, accept: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 background: Optional[BackgroundTask] = None) -> StreamingResponse:
+    """
+    Como stream_rows, para um DataFrame; no Arrow as colunas são convertidas
+    direto, sem passar por dicts, num schema inferido do frame inteiro (um
+    bloco só com None não fixa o tipo da coluna)
+    """
+    media_type = negotiate(accept)
+    if media_type == ARROW_MEDIA_TYPE:
+        import pyarrow as pa
+        schema = pa.Schema.from_pandas(frame, preserve_index=False)
+        batches = (pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+                   for chunk in _frame_chunks(frame, STREAM_CHUNK_SIZE))
+        body = encode_arrow(batches)
+    else:
+        chunks = (chunk.to_dict('records') for chunk in _frame_chunks(frame, STREAM_CHUNK_SIZE))
+        body = encode_json(chunks, ndjson=media_type == NDJSON_MEDIA_TYPE)
+    return StreamingResponse(body, media_type=media_type, headers=headers, background=background)
@@ -0,0 +1,277 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+from sqlalchemy import (Column, DateTime, Float, Integer, MetaData, String, Table,
+                        bindparam, create_engine, select, tuple_)
+
+logger = logging.getLogger('rollups')
+
+# Rollup levels from finest to coarsest, with the numpy unit that floors to their buckets
+LEVELS = ['hourly', 'daily', 'monthly']
+_BUCKET_UNITS = {'hourly': 'datetime64[h]', 'daily': 'datetime64[D]', 'monthly': 'datetime64[M]'}
+_BUCKET_LENGTHS = {'hourly': pd.Timedelta(hours=1), 'daily': pd.Timedelta(days=1),
+                   'monthly': pd.DateOffset(months=1)}
+
+AGGREGATES = ['count', 'sum', 'min', 'max']
+
+metadata = MetaData()
+
+
+def _rollup_table(level: str, per_source: bool = False) -> Table:
+    key = [Column('source', String(512), primary_key=True)] if per_source else []
+    return Table(
+        f'rollup_{level}', metadata,
+        *key,
+        Column('metric', String(128), primary_key=True),
+        Column('region', String(128), primary_key=True),
+        Column('bucket', DateTime, primary_key=True),
+        Column('count', Integer, nullable=False),
+        Column('sum', Float, nullable=False),
+        Column('min', Float),
+        Column('max', Float)
+    )
+
+
+# Hourly rows are kept per source so that reprocessing a file replaces its
+# contribution instead of adding it twice; coarser levels are derived from them
+ROLLUP_TABLES = {
+    'hourly': _rollup_table('hourly', per_source=True),
+    'daily': _rollup_table('daily'),
+    'monthly': _rollup_table('monthly')
+}
+
+
+# Bumped for a metric whenever an update changes its rollups, so readers can
+# tell whether results they cached are stale
+rollup_versions = Table(
+    'rollup_versions', metadata,
+    Column('metric', String(128), primary_key=True),
+    Column('version', Integer, nullable=False)
+)
+
+
+def _naive_utc(value: datetime) -> pd.Timestamp:
+    value = pd.Timestamp(value)
+    return value.tz_convert('UTC').tz_localize(None) if value.tzinfo is not None else value
+
+
+def floor_to_level(timestamps: pd.Series, level: str) -> np.ndarray:
+    """Start of the level's bucket for each timestamp (naive UTC)"""
+    if getattr(timestamps.dt, 'tz', None) is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    values = timestamps.to_numpy(dtype='datetime64[ns]')
+    return values.astype(_BUCKET_UNITS[level]).astype('datetime64[ns]')
+
+
+def _combine(frame: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """Merge partial aggregates sharing the same keys"""
+    return (frame.groupby(keys, sort=False)
+            .agg(count=('count', 'sum'), sum=('sum', 'sum'), min=('min', 'min'), max=('max', 'max'))
+            .reset_index())
+
+
+def hourly_aggregates(df: pd.DataFrame, timestamp_column: str, value_columns: List[str],
+                      region_column: Optional[str] = None) -> pd.DataFrame:
+    """Per (metric, region, hour) count/sum/min/max of raw readings"""
+    buckets = floor_to_level(df[timestamp_column], 'hourly')
+    if region_column and region_column in df.columns:
+        regions = df[region_column].astype(object).where(df[region_column].notna(), '').astype(str)
+    else:
+        regions = pd.Series('', index=df.index)
+
+    frames = []
+    for metric in value_columns:
+        values = pd.to_numeric(df[metric], errors='coerce')
+        valid = values.notna().to_numpy() & ~np.isnat(buckets)
+        if not valid.any():
+            continue
+        frame = pd.DataFrame({
+            'region': regions.to_numpy()[valid],
+            'bucket': buckets[valid],
+            'value': values.to_numpy(dtype=float)[valid]
+        })
+        grouped = (frame.groupby(['region', 'bucket'], sort=False)['value']
+                   .agg(['count', 'sum', 'min', 'max']).reset_index())
+        grouped.insert(0, 'metric', metric)
+        frames.append(grouped)
+
+    if not frames:
+        return pd.DataFrame(columns=['metric', 'region', 'bucket'] + AGGREGATES)
+    return pd.concat(frames, ignore_index=True)
+
+
+class RollupAccumulator:
+    """Collects hourly aggregates across the chunks of one source"""
+
+    def __init__(self, timestamp_column: str, value_columns: List[str],
+                 region_column: Optional[str] = None):
+        self.timestamp_column = timestamp_column
+        self.value_columns = value_columns
+        self.region_column = region_column
+        self._partials: List[pd.DataFrame] = []
+
+    def update(self, chunk: pd.DataFrame) -> 'RollupAccumulator':
+        partial = hourly_aggregates(chunk, self.timestamp_column, self.value_columns, self.region_column)
+        if len(partial) > 0:
+            self._partials.append(partial)
+            if len(self._partials) > 32:
+                # Keep memory bounded by the number of distinct hours, not of chunks
+                self._partials = [_combine(pd.concat(self._partials), ['metric', 'region', 'bucket'])]
+        return self
+
+    def result(self) -> pd.DataFrame:
+        if not self._partials:
+            return pd.DataFrame(columns=['metric', 'region', 'bucket'] + AGGREGATES)
+        return _combine(pd.concat(self._partials, ignore_index=True), ['metric', 'region', 'bucket'])
+
+
+class RollupStore:
+    """Incrementally maintained hourly -> daily -> monthly rollups per region.
+
+    update() replaces the hourly contribution of one source and recomputes only
+    the daily and monthly buckets it touched. query() answers from the coarsest
+    level whose buckets fit the requested granularity and range, so a regional
+    monthly query reads a handful of monthly rows instead of raw readings.
+    """
+
+    def __init__(self, url: str = 'sqlite:///processed_data/rollups.db'):
+        self.engine = create_engine(url)
+        database = self.engine.url.database
+        if self.engine.dialect.name == 'sqlite' and database and os.path.dirname(database):
+            os.makedirs(os.path.dirname(database), exist_ok=True)
+        metadata.create_all(self.engine)
+
+    def _affected_keys(self, conn, source: str, metrics: List[str]) -> pd.DataFrame:
+        table = ROLLUP_TABLES['hourly']
+        query = (select(table.c.metric, table.c.region, table.c.bucket)
+                 .where(table.c.source == source, table.c.metric.in_(metrics)))
+        return pd.DataFrame(conn.execute(query).fetchall(), columns=['metric', 'region', 'bucket'])
+
+    def _read_level(self, conn, level: str, keys: pd.DataFrame, start: datetime,
+                    end: datetime) -> pd.DataFrame:
+        """Rows of a level for the metric/region pairs of keys within [start, end)"""
+        table = ROLLUP_TABLES[level]
+        pairs = list(keys[['metric', 'region']].drop_duplicates().itertuples(index=False, name=None))
+        query = (select(table.c.metric, table.c.region, table.c.bucket, table.c['count'],
+                        table.c.sum, table.c.min, table.c.max)
+                 .where(tuple_(table.c.metric, table.c.region).in_(pairs),
+                        table.c.bucket >= start, table.c.bucket < end))
+        return pd.DataFrame(conn.execute(query).fetchall(),
+                            columns=['metric', 'region', 'bucket'] + AGGREGATES)
+
+    def _rebuild(self, conn, level: str, finer: str, touched: pd.DataFrame) -> pd.DataFrame:
+        """Recompute the buckets of level that contain the touched buckets of the finer level"""
+        table = ROLLUP_TABLES[level]
+        touched = touched.assign(bucket=floor_to_level(pd.to_datetime(touched['bucket']), level))
+        touched = touched.drop_duplicates()
+        if len(touched) == 0:
+            return touched
+
+        start = pd.Timestamp(touched['bucket'].min())
+        end = pd.Timestamp(touched['bucket'].max()) + _BUCKET_LENGTHS[level]
+        rows = self._read_level(conn, finer, touched, start.to_pydatetime(), end.to_pydatetime())
+        if len(rows) > 0:
+            rows['bucket'] = floor_to_level(pd.to_datetime(rows['bucket']), level)
+            rows = _combine(rows, ['metric', 'region', 'bucket'])
+            rows = rows.merge(touched, on=['metric', 'region', 'bucket'])
+
+        conn.execute(
+            table.delete().where(table.c.metric == bindparam('key_metric'),
+                                 table.c.region == bindparam('key_region'),
+                                 table.c.bucket == bindparam('key_bucket')),
+            [{'key_metric': key.metric, 'key_region': key.region,
+              'key_bucket': pd.Timestamp(key.bucket).to_pydatetime()}
+             for key in touched.itertuples(index=False)]
+        )
+        if len(rows) > 0:
+            conn.execute(table.insert(), _records(rows))
+        return touched
+
+    def update(self, source: str, hourly: pd.DataFrame, metrics: Optional[List[str]] = None):
+        """Replace the hourly aggregates of a source and refresh the coarser levels"""
+        metrics = metrics if metrics is not None else sorted(hourly['metric'].unique())
+        table = ROLLUP_TABLES['hourly']
+        with self.engine.begin() as conn:
+            previous = self._affected_keys(conn, source, metrics)
+            conn.execute(table.delete().where(table.c.source == source, table.c.metric.in_(metrics)))
+            if len(hourly) > 0:
+                conn.execute(table.insert(), _records(hourly.assign(source=source)))
+
+            touched = pd.concat([previous, hourly[['metric', 'region', 'bucket']]], ignore_index=True)
+            touched['bucket'] = pd.to_datetime(touched['bucket'])
+            touched = touched.drop_duplicates()
+            # Hourly rows of all sources are merged into the daily level
+            daily_touched = self._rebuild(conn, 'daily', 'hourly', touched)
+            self._rebuild(conn, 'monthly', 'daily', daily_touched)
+            self._bump_versions(conn, metrics)
+        logger.info(f"Updated rollups for {source}: {len(hourly)} hourly buckets")
+
+    def _bump_versions(self, conn, metrics: List[str]):
+        current = dict(conn.execute(select(rollup_versions.c.metric, rollup_versions.c.version)
+                                    .where(rollup_versions.c.metric.in_(metrics))).fetchall())
+        for metric in metrics:
+            if metric in current:
+                conn.execute(rollup_versions.update().where(rollup_versions.c.metric == metric)
+                             .values(version=current[metric] + 1))
+            else:
+                conn.execute(rollup_versions.insert().values(metric=metric, version=1))
+
+    def version(self, metric: str) -> int:
+        """Number of updates that changed the rollups of a metric, 0 if none"""
+        query = select(rollup_versions.c.version).where(rollup_versions.c.metric == metric)
+        with self.engine.connect() as conn:
+            return conn.execute(query).scalar() or 0
+
+    def query(self, metric: str, granularity: str, start: Optional[datetime] = None,
+              end: Optional[datetime] = None, regions: Optional[List[str]] = None) -> pd.DataFrame:
+        """Aggregates of a metric per region and bucket over [start, end)"""
+        if granularity not in LEVELS:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        level = self.choose_level(granularity, start, end)
+        table = ROLLUP_TABLES[level]
+        conditions = [table.c.metric == metric]
+        if start is not None:
+            conditions.append(table.c.bucket >= _naive_utc(start).to_pydatetime())
+        if end is not None:
+            conditions.append(table.c.bucket < _naive_utc(end).to_pydatetime())
+        if regions:
+            conditions.append(table.c.region.in_(regions))
+        query = select(table.c.region, table.c.bucket, table.c['count'], table.c.sum,
+                       table.c.min, table.c.max).where(*conditions)
+        with self.engine.connect() as conn:
+            rows = pd.DataFrame(conn.execute(query).fetchall(), columns=['region', 'bucket'] + AGGREGATES)
+
+        # Coarser request than the level read (e.g. hourly rows for an unaligned daily range)
+        rows['bucket'] = floor_to_level(pd.to_datetime(rows['bucket']), granularity)
+        result = _combine(rows, ['region', 'bucket']).sort_values(['region', 'bucket'], ignore_index=True)
+        result['mean'] = result['sum'] / result['count']
+        return result
+
+    @staticmethod
+    def choose_level(granularity: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> str:
+        """Coarsest level no coarser than granularity whose buckets align with start and end"""
+        candidates = LEVELS[:LEVELS.index(granularity) + 1]
+        for level in reversed(candidates):
+            aligned = all(
+                bound is None or floor_to_level(pd.Series([_naive_utc(bound)]), level)[0]
+                == _naive_utc(bound).to_datetime64()
+                for bound in (start, end)
+            )
+            if aligned:
+                return level
+        return 'hourly'
+
+
+def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    records = frame.to_dict('records')
+    for record in records:
+        record['bucket'] = pd.Timestamp(record['bucket']).to_pydatetime()
+        record['count'] = int(record['count'])
+        for key in ('sum', 'min', 'max'):
+            record[key] = float(record[key])
+    return records
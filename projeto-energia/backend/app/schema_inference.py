@@ -0,0 +1,173 @@
+import os
+import json
+import logging
+import warnings
+import pandas as pd
+from datetime import date, datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+logger = logging.getLogger('schema_inference')
+
+# Formats tried when pandas cannot guess one from the first sampled value
+DATETIME_FORMATS = [
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%d',
+    '%d/%m/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M',
+    '%d/%m/%Y',
+    '%m/%d/%Y',
+    '%Y/%m/%d',
+    '%d-%m-%Y',
+    '%Y%m%d'
+]
+
+# Format recorded for datetime columns that need per-value parsing
+MIXED_FORMAT = 'mixed'
+
+
+class DatetimeInferrer:
+    """Detect datetime columns and their exact format from a sample of each column.
+
+    Only the sampled values are parsed speculatively; the full column is parsed
+    once, with the detected format, and only for columns the sample accepted.
+    Detected formats are cached per source schema (the column layout), so every
+    chunk of a stream and every run over the same layout reuses them. The cache
+    can be persisted with cache_path.
+    """
+
+    def __init__(self, sample_size: int = 100, cache_path: Optional[str] = None):
+        self.sample_size = sample_size
+        self.cache_path = cache_path
+        self._formats: Dict[str, Dict[str, Optional[str]]] = {}
+        self.inferred_schema: Dict[str, Dict[str, Any]] = {}
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, 'r') as f:
+                    self._formats = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading schema cache {cache_path}, starting empty: {e}")
+
+    @staticmethod
+    def _schema_key(df: pd.DataFrame) -> str:
+        return json.dumps([str(col) for col in df.columns])
+
+    def _sample(self, series: pd.Series) -> pd.Series:
+        values = series.dropna()
+        if len(values) <= self.sample_size:
+            return values
+        # Spread the sample over the column instead of taking only its head
+        step = len(values) // self.sample_size
+        return values.iloc[::step][:self.sample_size]
+
+    @staticmethod
+    def _parses(sample: pd.Series, fmt: Optional[str]) -> bool:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                pd.to_datetime(sample, format=fmt)
+            return True
+        except (ValueError, TypeError, OverflowError):
+            return False
+
+    def infer_format(self, series: pd.Series) -> Tuple[bool, Optional[str]]:
+        """Return (is_datetime, format) for an object column, looking only at a sample"""
+        sample = self._sample(series)
+        if len(sample) == 0:
+            return True, None  # All-null columns parse as NaT
+        if all(isinstance(value, (datetime, date)) for value in sample):
+            return True, None
+        if not all(isinstance(value, str) for value in sample):
+            return False, None
+
+        # Dates always contain digits; rejects free-text columns without parsing them
+        if not sample.str.contains(r'\d', regex=True).all():
+            return False, None
+
+        first = sample.iloc[0].strip()
+        candidates = []
+        for dayfirst in (False, True):
+            guessed = guess_datetime_format(first, dayfirst=dayfirst)
+            if guessed and guessed not in candidates:
+                candidates.append(guessed)
+        candidates.extend(fmt for fmt in DATETIME_FORMATS if fmt not in candidates)
+
+        for fmt in candidates:
+            if self._parses(sample, fmt):
+                return True, fmt
+
+        # Heterogeneous but parseable values (e.g. mixed formats)
+        if self._parses(sample, None):
+            return True, MIXED_FORMAT
+        return False, None
+
+    def infer(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, Optional[str]]:
+        """Detected formats of the datetime columns among columns (object columns by default)"""
+        candidates = list(df.select_dtypes(include=['object']).columns) if columns is None else columns
+        cached = self._formats.setdefault(self._schema_key(df), {})
+
+        formats = {}
+        updated = False
+        for col in candidates:
+            if col not in cached:
+                if df[col].isna().all():
+                    # Nothing to learn from an empty column, decide again next time
+                    formats[col] = None
+                    continue
+                is_datetime, fmt = self.infer_format(df[col])
+                cached[col] = fmt if is_datetime else False
+                updated = True
+            if cached[col] is not False:
+                formats[col] = cached[col]
+        if updated:
+            self.save()
+        return formats
+
+    def convert(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> List[str]:
+        """Parse the detected datetime columns in place, returning the converted ones"""
+        candidates = list(df.select_dtypes(include=['object']).columns) if columns is None else columns
+        formats = self.infer(df, candidates)
+
+        converted = []
+        for col in candidates:
+            if col in formats:
+                fmt = formats[col]
+                parsed = self._parse_column(df[col], fmt)
+                if parsed is not None:
+                    df[col] = parsed
+                    converted.append(col)
+                    self.inferred_schema[col] = {'type': 'datetime', 'format': fmt}
+                    continue
+            self.inferred_schema[col] = {'type': 'string', 'format': None}
+        return converted
+
+    @staticmethod
+    def _parse_column(series: pd.Series, fmt: Optional[str]) -> Optional[pd.Series]:
+        """Parse with the exact format, falling back to per-value parsing for outliers"""
+        attempts = [None] if fmt in (None, MIXED_FORMAT) else [fmt, None]
+        for attempt in attempts:
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    return pd.to_datetime(series, format=attempt)
+            except (ValueError, TypeError, OverflowError):
+                continue
+        return None
+
+    def save(self):
+        """Persist the per-schema format cache if a cache path is configured"""
+        if not self.cache_path:
+            return
+        directory = os.path.dirname(self.cache_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._formats, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,173 @@
+import math
+import numpy as np
+from typing import List, Optional
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length for uint64 arrays"""
+    values = values.copy()
+    lengths = np.zeros(len(values), dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= np.uint64(1 << shift)
+        lengths += mask * shift
+        values = np.where(mask, values >> np.uint64(shift), values)
+    return lengths + (values > 0)
+
+
+class HyperLogLog:
+    """Constant-memory distinct counter over 64-bit hashes.
+
+    The standard error is about 1.04 / sqrt(2 ** precision); the precision is
+    derived from the requested relative error.
+    """
+
+    def __init__(self, relative_error: float = 0.01, precision: Optional[int] = None):
+        if precision is None:
+            precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        self.precision = max(4, min(18, precision))
+        self.m = 1 << self.precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def update(self, hashes: np.ndarray) -> 'HyperLogLog':
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return self
+        value_bits = 64 - self.precision
+        index = (hashes >> np.uint64(value_bits)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << value_bits) - 1)
+        rank = (value_bits - _bit_length(remainder) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros > 0:
+            # Small-range correction (linear counting)
+            estimate = self.m * math.log(self.m / zeros)
+        return float(estimate)
+
+
+class KLLSketch:
+    """Mergeable streaming quantile sketch (Karnin, Lang and Liberty).
+
+    Items live in compactors of increasing weight; a full compactor sorts its
+    items and promotes every other one to the next level. Rank error is about
+    1.7 / k, so k is derived from the requested rank error.
+    """
+
+    def __init__(self, rank_error: float = 0.01, k: Optional[int] = None, seed: Optional[int] = None):
+        self.k = k or max(8, math.ceil(1.7 / rank_error))
+        self.count = 0
+        self.compactors: List[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.compactors):
+            items = self.compactors[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(items)
+                # Keep an odd leftover at this level so the total weight is preserved
+                leftover = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(leftover)]
+                promoted = paired[self._rng.integers(0, 2)::2]
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+                self.compactors[level] = leftover
+            level += 1
+
+    def update(self, values: np.ndarray) -> 'KLLSketch':
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.count += len(values)
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other: 'KLLSketch') -> 'KLLSketch':
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0))
+        for level, items in enumerate(other.compactors):
+            self.compactors[level] = np.concatenate([self.compactors[level], items])
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _weighted_items(self):
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([np.full(len(level_items), 2 ** level, dtype=np.int64)
+                                  for level, level_items in enumerate(self.compactors)])
+        order = np.argsort(items, kind='stable')
+        return items[order], np.cumsum(weights[order])
+
+    def rank(self, value: float, inclusive: bool = True) -> float:
+        """Estimated number of items <= value (< value if not inclusive)"""
+        if self.count == 0:
+            return 0.0
+        items, cumulative = self._weighted_items()
+        position = np.searchsorted(items, value, side='right' if inclusive else 'left')
+        total = cumulative[-1]
+        return float(cumulative[position - 1] * self.count / total) if position > 0 else 0.0
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float('nan')
+        items, cumulative = self._weighted_items()
+        position = np.searchsorted(cumulative, q * cumulative[-1], side='left')
+        return float(items[min(position, len(items) - 1)])
+
+    def count_outside(self, lower: float, upper: float) -> int:
+        """Estimated number of items below lower or above upper"""
+        return int(round(self.rank(lower, inclusive=False) + self.count - self.rank(upper)))
+
+
+class TailSample:
+    """Mergeable sample of the `size` smallest and `size` largest values.
+
+    Whatever the final mean and standard deviation, the values furthest from
+    the mean on either side are kept, so outliers can be picked against
+    thresholds only known once every chunk has been merged.
+    """
+
+    def __init__(self, size: int = 10):
+        self.size = size
+        self.values = np.empty(0)
+
+    def _keep_tails(self, values: np.ndarray):
+        values = np.sort(values[~np.isnan(values)])
+        if len(values) > 2 * self.size:
+            values = np.concatenate([values[:self.size], values[len(values) - self.size:]])
+        self.values = values
+
+    def update(self, values: np.ndarray) -> 'TailSample':
+        self._keep_tails(np.concatenate([self.values, np.asarray(values, dtype=float)]))
+        return self
+
+    def merge(self, other: 'TailSample') -> 'TailSample':
+        self._keep_tails(np.concatenate([self.values, other.values]))
+        return self
+
+    def most_extreme(self, center: float, lower: float, upper: float) -> List[float]:
+        """Kept values outside [lower, upper], furthest from center first, at most `size`"""
+        outside = self.values[(self.values < lower) | (self.values > upper)]
+        order = np.argsort(-np.abs(outside - center), kind='stable')
+        return outside[order[:self.size]].tolist()
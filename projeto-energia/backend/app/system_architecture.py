@@ -1,3 +1,6 @@
+from feature_store import FeatureStore
+
+
 class SystemArchitecture:
     def __init__(self):
         self.data_sources = {
@@ -8,6 +11,7 @@ class SystemArchitecture:
         
         self.processing_layers = {
             'ingestion': ETLPipeline(),
+            'features': FeatureStore(),
             'processing': DataProcessor(),
             'analysis': PredictiveAnalytics(),
             'presentation': DashboardManager()
@@ -1,10 +1,14 @@
+from benchmarks import PerformanceBenchmarks
+
 class TestSuite:
     def __init__(self):
         self.test_cases = {
             'data_quality': DataQualityTests(),
             'model_performance': ModelTests(),
             'api_integration': APITests(),
-            'ui_functionality': UITests()
+            'ui_functionality': UITests(),
+            # Benchmarks com gate de regressão contra BENCHMARK_BASELINE
+            'performance': PerformanceBenchmarks()
         }
     
     def run_all_tests(self):
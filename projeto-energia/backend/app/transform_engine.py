@@ -0,0 +1,248 @@
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional, Tuple
+
+from etl_pipeline import NumericTransformer, CategoryVocabulary, RunningStats
+
+TEMPORAL_FEATURES = ['year', 'month', 'day', 'dayofweek', 'quarter']
+
+# Integer dtype pandas returns for calendar fields (int64 before pandas 2.0, int32 after)
+_CALENDAR_DTYPE = pd.Series(pd.to_datetime(['2000-01-01'])).dt.year.dtype
+
+
+def _codes_dtype(n_categories: int) -> np.dtype:
+    """Smallest integer dtype pandas uses for categorical codes"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class TransformPlan:
+    """Column layout of a fused transformation, computed once per input schema"""
+
+    def __init__(self, columns: List[str], datetime_cols: List[str], numeric_cols: List[str],
+                 categorical_cols: List[str], output_columns: List[str], raw_columns: List[str]):
+        self.columns = columns
+        self.datetime_cols = datetime_cols
+        self.numeric_cols = numeric_cols
+        self.categorical_cols = categorical_cols
+        self.output_columns = output_columns
+        self.raw_columns = raw_columns
+
+    @property
+    def float_columns(self) -> List[str]:
+        """Columns written into the shared float64 block"""
+        temporal = [f'{col}_{feature}' for col in self.datetime_cols for feature in TEMPORAL_FEATURES]
+        return self.numeric_cols + temporal
+
+    @property
+    def weekend_columns(self) -> List[str]:
+        return [f'{col}_is_weekend' for col in self.datetime_cols]
+
+
+class FusedTransformEngine:
+    """Apply temporal extraction, normalization and categorical encoding in one pass.
+
+    Produces the same frame as chaining TemporalFeatureExtractor.extract_features,
+    NumericTransformer.normalize and CategoricalTransformer.encode, but plans the
+    column layout once and writes every numeric output into a single
+    preallocated float64 block instead of copying the frame at each step. The
+    output frame is assembled from views of that block and of the input, so
+    only the blocks, category codes and integer casts are allocated.
+    Normalized and temporal columns are float64; a column whose range is zero
+    keeps its input dtype, as in the chained transformers. With a category
+    vocabulary, columns it covers get its stable codes instead of per-batch ones.
+    raw_columns (e.g. output partition keys) are neither normalized nor encoded
+    and are moved to the end of the output.
+    """
+
+    def __init__(self, extract_temporal: bool = True, normalize: bool = True,
+                 encode_categorical: bool = True,
+                 numeric_transformer: Optional[NumericTransformer] = None,
+                 vocabulary: Optional[CategoryVocabulary] = None,
+                 raw_columns: Optional[List[str]] = None):
+        self.extract_temporal = extract_temporal
+        self.normalize = normalize
+        self.encode_categorical = encode_categorical
+        self.numeric_transformer = numeric_transformer
+        self.vocabulary = vocabulary
+        self.raw_columns = list(raw_columns or [])
+        self._plans: Dict[Tuple, TransformPlan] = {}
+        self.last_report: Dict[str, Any] = {}
+
+    def plan(self, df: pd.DataFrame) -> TransformPlan:
+        """Build (or reuse) the transformation plan for the frame's schema"""
+        key = tuple((col, str(dtype)) for col, dtype in df.dtypes.items())
+        if key in self._plans:
+            return self._plans[key]
+
+        datetime_cols = list(df.select_dtypes(include=['datetime64']).columns) if self.extract_temporal else []
+        numeric_cols = [col for col in df.select_dtypes(include=[np.number]).columns
+                        if col not in self.raw_columns]
+        categorical_cols = ([col for col in df.select_dtypes(include=['object', 'category']).columns
+                             if col not in self.raw_columns]
+                            if self.encode_categorical else [])
+
+        output_columns = list(df.columns)
+        for col in datetime_cols:
+            output_columns.extend(f'{col}_{feature}' for feature in TEMPORAL_FEATURES)
+            output_columns.append(f'{col}_is_weekend')
+        raw_columns = [col for col in self.raw_columns if col in output_columns]
+        output_columns = [col for col in output_columns if col not in raw_columns] + raw_columns
+
+        plan = TransformPlan(list(df.columns), datetime_cols, numeric_cols, categorical_cols,
+                             output_columns, raw_columns)
+        self._plans[key] = plan
+        return plan
+
+    def _fill_float_block(self, df: pd.DataFrame, plan: TransformPlan,
+                          block: np.ndarray, weekend: np.ndarray):
+        for j, col in enumerate(plan.numeric_cols):
+            block[:, j] = df[col].to_numpy(dtype=float, na_value=np.nan)
+
+        j = len(plan.numeric_cols)
+        for k, col in enumerate(plan.datetime_cols):
+            values = df[col].dt
+            dayofweek = values.dayofweek.to_numpy(dtype=float, na_value=np.nan)
+            block[:, j] = values.year.to_numpy(dtype=float, na_value=np.nan)
+            block[:, j + 1] = values.month.to_numpy(dtype=float, na_value=np.nan)
+            block[:, j + 2] = values.day.to_numpy(dtype=float, na_value=np.nan)
+            block[:, j + 3] = dayofweek
+            block[:, j + 4] = values.quarter.to_numpy(dtype=float, na_value=np.nan)
+            np.greater_equal(dayofweek, 5, out=weekend[:, k])
+            j += len(TEMPORAL_FEATURES)
+
+    def _value_ranges(self, plan: TransformPlan, block: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-column min/max from the fitted transformer or from the block itself"""
+        if self.numeric_transformer is not None and self.numeric_transformer.is_fitted:
+            mins = np.full(block.shape[1], np.nan)
+            maxs = np.full(block.shape[1], np.nan)
+            for j, col in enumerate(plan.float_columns):
+                stats = self.numeric_transformer.stats.get(col)
+                if stats is not None and stats.count > 0:
+                    mins[j], maxs[j] = stats.min, stats.max
+            return mins, maxs
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-null columns
+            return np.nanmin(block, axis=0), np.nanmax(block, axis=0)
+
+    def transform(self, df: pd.DataFrame, fit: bool = False) -> pd.DataFrame:
+        """Run all planned transformations, allocating each output block once.
+
+        With fit=True the numeric transformer is refitted on this frame's
+        numeric and temporal columns before normalizing.
+        """
+        plan = self.plan(df)
+        n_rows = len(df)
+        float_columns = plan.float_columns
+        raw = np.array([col in plan.raw_columns for col in float_columns], dtype=bool)
+
+        # Column-major so that each output column is a contiguous view
+        block = np.empty((n_rows, len(float_columns)), dtype=np.float64, order='F')
+        weekend = np.empty((n_rows, len(plan.datetime_cols)), dtype=bool, order='F')
+        self._fill_float_block(df, plan, block, weekend)
+
+        if fit and self.numeric_transformer is not None:
+            self.numeric_transformer.stats = {col: RunningStats().update(block[:, j])
+                                              for j, col in enumerate(float_columns) if not raw[j]}
+
+        scaled = np.zeros(len(float_columns), dtype=bool)
+        if self.normalize and len(float_columns) > 0:
+            mins, maxs = self._value_ranges(plan, block)
+            scaled = (maxs > mins) & ~raw  # Avoid division by zero
+            ranges = np.where(scaled, maxs - mins, 1.0)
+            np.subtract(block, mins, out=block, where=scaled[np.newaxis, :])
+            np.divide(block, ranges, out=block, where=scaled[np.newaxis, :])
+
+        # Unscaled columns keep the dtype the chained transformers would give them
+        unscaled = {}
+        for j, col in enumerate(float_columns):
+            if scaled[j]:
+                continue
+            if col in df.columns:
+                unscaled[col] = df[col]
+            elif not np.isnan(block[:, j]).any():
+                unscaled[col] = block[:, j].astype(_CALENDAR_DTYPE)
+
+        codes = {}
+        for col in plan.categorical_cols:
+            if self.vocabulary is not None and col in self.vocabulary:
+                codes[col] = self.vocabulary.codes(df[col]).to_numpy()
+            elif isinstance(df[col].dtype, pd.CategoricalDtype):
+                codes[col] = df[col].cat.codes.to_numpy()
+            else:
+                col_codes, uniques = pd.factorize(df[col], sort=True)
+                codes[col] = col_codes.astype(_codes_dtype(len(uniques)), copy=False)
+
+        columns = self._output_columns(df, plan, block, weekend, codes, unscaled)
+        # Every value is already a column of its own, so the frame wraps them without copying
+        result = pd.DataFrame(columns, index=df.index, copy=False)
+
+        casts = [values for col, values in unscaled.items() if col not in df.columns]
+        allocated_bytes = (block.nbytes + weekend.nbytes + sum(values.nbytes for values in codes.values())
+                           + sum(values.nbytes for values in casts))
+        allocations = 1 + int(bool(plan.datetime_cols)) + len(codes) + len(casts)
+        self.last_report = self._report(df, plan, result, allocations, allocated_bytes)
+        return result
+
+    def _output_columns(self, df: pd.DataFrame, plan: TransformPlan, block: np.ndarray,
+                        weekend: np.ndarray, codes: Dict[str, np.ndarray],
+                        unscaled: Dict[str, Any]) -> Dict[str, Any]:
+        """Map each output column, in output order, to the array or Series holding it.
+
+        Float and weekend columns are views of their blocks and passthrough
+        columns are the input's own Series, so none of them is copied.
+        """
+        float_index = {col: j for j, col in enumerate(plan.float_columns)}
+        weekend_index = {col: k for k, col in enumerate(plan.weekend_columns)}
+
+        columns = {}
+        for col in plan.output_columns:
+            if col in codes:
+                columns[col] = codes[col]
+            elif col in unscaled:
+                columns[col] = unscaled[col]
+            elif col in float_index:
+                columns[col] = block[:, float_index[col]]
+            elif col in weekend_index:
+                columns[col] = weekend[:, weekend_index[col]]
+            else:
+                columns[col] = df[col]
+        return columns
+
+    def _report(self, df: pd.DataFrame, plan: TransformPlan, result: pd.DataFrame,
+                allocations: int, allocated_bytes: int) -> Dict[str, Any]:
+        """Compare the engine's allocations with the chained transformers"""
+        input_bytes = int(df.memory_usage(index=False).sum())
+        output_bytes = int(result.memory_usage(index=False).sum())
+        n_temporal = len(plan.datetime_cols) * (len(TEMPORAL_FEATURES) + 1)
+
+        # Each chained step copies the whole frame, then allocates every column it rewrites
+        frame_copies = 0
+        chained_bytes = 0
+        column_allocations = len(plan.categorical_cols)
+        if self.extract_temporal:
+            frame_copies += 1
+            chained_bytes += input_bytes
+            column_allocations += n_temporal
+        if self.normalize:
+            frame_copies += 1
+            chained_bytes += output_bytes
+            column_allocations += len(plan.float_columns)
+        if self.encode_categorical:
+            frame_copies += 1
+            chained_bytes += output_bytes
+
+        return {
+            'rows': len(df),
+            'input_columns': len(plan.columns),
+            'output_columns': len(plan.output_columns),
+            'output_allocations': allocations,
+            'frame_copies_avoided': frame_copies,
+            'column_allocations_avoided': max(0, column_allocations - allocations),
+            'bytes_copied': allocated_bytes,
+            'bytes_avoided': max(0, chained_bytes - allocated_bytes)
+        }
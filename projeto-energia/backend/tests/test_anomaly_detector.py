@@ -0,0 +1,31 @@
+import numpy as np
+
+from anomaly_detector import StreamingAnomalyDetector
+
+COOLDOWNS = {'info': 3600.0, 'warning': 3600.0, 'critical': 3600.0}
+
+
+def _warmed_up(rng, ticks=100):
+    detector = StreamingAnomalyDetector(cooldowns=COOLDOWNS)
+    for tick in range(ticks):
+        detector.update({'meter': 100.0 + rng.normal()}, tick * 60.0)
+    return detector, ticks * 60.0
+
+
+def test_sustained_level_is_deduplicated_within_the_cooldown():
+    detector, now = _warmed_up(np.random.default_rng(0))
+    alerts = [detector.update({'meter': 1_000.0}, now + tick * 60.0) for tick in range(5)]
+    assert [len(tick_alerts) for tick_alerts in alerts] == [1, 0, 0, 0, 0]
+
+
+def test_remembered_level_is_forgotten_after_calm_ticks():
+    rng = np.random.default_rng(0)
+    detector, now = _warmed_up(rng)
+    assert detector.update({'meter': 200.0}, now)[0]['level'] == 'critical'
+
+    # Well within the cooldown, but the series has been calm since
+    for tick in range(1, 31):
+        detector.update({'meter': 100.0 + rng.normal()}, now + tick * 60.0)
+    alerts = detector.update({'meter': 200.0}, now + 31 * 60.0)
+    assert [alert['level'] for alert in alerts] == ['critical']
+
@@ -0,0 +1,79 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_executor import BatchETLExecutor
+from etl_pipeline import ETLPipeline
+
+
+def _write(path, values):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    frame = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=len(values), freq='h'),
+                          'consumption': values})
+    if path.endswith('.json'):
+        frame.to_json(path, orient='records', date_format='iso')
+    else:
+        frame.to_csv(path, index=False)
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({
+        'incremental': {'enabled': True, 'manifest_path': str(tmp_path / 'manifest.json')},
+        'transformations': {'numeric_stats_path': str(tmp_path / 'stats.json'),
+                            'apply_one_hot_encoding': False}
+    }))
+    return str(path)
+
+
+def _stats(tmp_path):
+    return json.loads((tmp_path / 'stats.json').read_text())['consumption']
+
+
+def test_sources_differing_by_extension_get_their_own_outputs(tmp_path, config_path):
+    _write(str(tmp_path / 'src' / 'a' / 'x.csv'), [1.0, 2.0])
+    _write(str(tmp_path / 'src' / 'a' / 'x.json'), [3.0, 4.0])
+    _write(str(tmp_path / 'src' / 'b' / 'x.csv'), [5.0, 6.0])
+
+    result = BatchETLExecutor(config_path, max_workers=1).run(str(tmp_path / 'src'), str(tmp_path / 'out'))
+    assert result['files_succeeded'] == 3
+    assert len(set(result['output_paths'])) == 3
+    assert all(os.path.exists(path) for path in result['output_paths'])
+
+
+def test_incremental_batch_merges_statistics_of_new_sources(tmp_path, config_path):
+    source = tmp_path / 'src'
+    _write(str(source / 'jan.csv'), [10.0, 20.0])
+    executor = BatchETLExecutor(config_path, max_workers=1)
+    executor.run(str(source), str(tmp_path / 'out'))
+    assert _stats(tmp_path)['max'] == 20.0
+
+    _write(str(source / 'feb.csv'), [30.0, 40.0])
+    result = executor.run(str(source), str(tmp_path / 'out'))
+    assert result['files_skipped'] == 1
+    stats = _stats(tmp_path)
+    assert (stats['count'], stats['min'], stats['max']) == (4, 10.0, 40.0)
+
+    # A changed source replaces its earlier statistics instead of adding to them
+    _write(str(source / 'feb.csv'), [30.0, 50.0])
+    executor.run(str(source), str(tmp_path / 'out'))
+    stats = _stats(tmp_path)
+    assert (stats['count'], stats['max']) == (4, 50.0)
+    assert stats['mean'] == pytest.approx(np.mean([10.0, 20.0, 30.0, 50.0]))
+
+
+def test_incremental_pipeline_merges_statistics_of_new_sources(tmp_path, config_path):
+    _write(str(tmp_path / 'jan.csv'), [10.0, 20.0])
+    _write(str(tmp_path / 'feb.csv'), [30.0, 40.0])
+    pipeline = ETLPipeline(config_path)
+    pipeline.process_raw_data(str(tmp_path / 'jan.csv'), str(tmp_path / 'out' / 'jan.csv'))
+    result = pipeline.process_raw_data(str(tmp_path / 'feb.csv'), str(tmp_path / 'out' / 'feb.csv'))
+
+    assert result['status'] == 'success'
+    stats = _stats(tmp_path)
+    assert (stats['count'], stats['min'], stats['max']) == (4, 10.0, 40.0)
+    assert pd.read_csv(result['output_path'])['consumption'].tolist() == [2 / 3, 1.0]
@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+# Keep the module-level store from creating processed_data/rollups.db
+os.environ.setdefault('ROLLUP_DB_URL', 'sqlite://')
+import energy_api  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+from rollups import RollupStore, hourly_aggregates  # noqa: E402
+
+
+def _hourly(value):
+    readings = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=48, freq='h'),
+                             'region': 'centro', 'consumption': value})
+    return hourly_aggregates(readings, 'timestamp', ['consumption'], 'region')
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = RollupStore(f"sqlite:///{tmp_path / 'rollups.db'}")
+    monkeypatch.setattr(energy_api, 'rollup_store', store)
+    monkeypatch.setattr(energy_api, 'aggregates_cache', PredictionCache(name='consumption_aggregates'))
+    return store
+
+
+def test_update_bumps_the_metric_version(store):
+    assert store.version('consumption') == 0
+    store.update('a.csv', _hourly(1.0))
+    store.update('a.csv', _hourly(2.0))
+    assert store.version('consumption') == 2
+    assert store.version('temperature') == 0
+
+
+def test_aggregates_are_cached_until_the_rollup_changes(store):
+    store.update('a.csv', _hourly(1.0))
+    client = TestClient(energy_api.app)
+
+    first = client.get('/consumption/aggregates', params={'region': 'centro'}).json()
+    second = client.get('/consumption/aggregates', params={'region': 'centro'}).json()
+    assert first == second and first[0]['mean'] == 1.0
+    assert (energy_api.aggregates_cache.hits, energy_api.aggregates_cache.misses) == (1, 1)
+
+    store.update('b.csv', _hourly(3.0))
+    refreshed = client.get('/consumption/aggregates', params={'region': 'centro'}).json()
+    assert refreshed[0]['mean'] == 2.0
+    assert energy_api.aggregates_cache.misses == 2
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store import FeatureIndex, FeatureStore
+
+
+def _weather():
+    # Hourly observations for two regions; temperature encodes the hour so the
+    # joined value shows which observation was used
+    times = pd.date_range('2024-01-01', periods=24 * 10, freq='h')
+    return pd.concat([
+        pd.DataFrame({'timestamp': times, 'region': 'centro', 'temperature': np.arange(len(times), dtype=float),
+                      'humidity': 50.0}),
+        pd.DataFrame({'timestamp': times, 'region': 'norte', 'temperature': 1000.0 + np.arange(len(times)),
+                      'humidity': 70.0})
+    ], ignore_index=True)
+
+
+def _consumption():
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(['2024-01-01 00:30', '2024-01-01 05:59', '2024-01-02 00:00',
+                                     '2024-01-01 03:15', '2023-12-31 23:00']),
+        'region': ['centro', 'centro', 'centro', 'norte', 'centro'],
+        'consumption': [1.0, 2.0, 3.0, 4.0, 5.0]
+    })
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeatureStore(str(tmp_path / 'features'))
+    store.materialize(_consumption(), _weather(), chunksize=2)
+    return store
+
+
+def test_join_never_uses_future_weather(store):
+    frame = store.read().set_index(['region', 'timestamp'])
+    assert (frame['weather_observed_at'].dropna()
+            <= frame.index.get_level_values('timestamp')[frame['weather_observed_at'].notna()]).all()
+
+    # Latest observation at or before each reading
+    assert frame.loc[('centro', pd.Timestamp('2024-01-01 00:30')), 'temperature'] == 0.0
+    assert frame.loc[('centro', pd.Timestamp('2024-01-01 05:59')), 'temperature'] == 5.0
+    assert frame.loc[('centro', pd.Timestamp('2024-01-02 00:00')), 'temperature'] == 24.0
+    assert frame.loc[('norte', pd.Timestamp('2024-01-01 03:15')), 'temperature'] == 1003.0
+
+
+def test_reading_before_any_observation_has_no_weather(store):
+    frame = store.read(regions=['centro']).set_index('timestamp')
+    assert np.isnan(frame.loc[pd.Timestamp('2023-12-31 23:00'), 'temperature'])
+
+
+def test_observations_older_than_max_weather_age_are_not_joined(tmp_path):
+    weather = _weather()
+    # Drop the observations of 2024-01-01 02:00 to 09:00 for centro
+    gap = (weather['region'] == 'centro') & weather['timestamp'].between('2024-01-01 02:00', '2024-01-01 09:00')
+    store = FeatureStore(str(tmp_path / 'features'), {'max_weather_age': '3h'})
+    store.materialize(_consumption(), weather[~gap])
+    frame = store.read(regions=['centro']).set_index('timestamp')
+    assert np.isnan(frame.loc[pd.Timestamp('2024-01-01 05:59'), 'temperature'])
+
+
+def test_index_matches_training_rows(store):
+    index = FeatureIndex(store)
+    assert index.refresh()
+    frame = store.read().dropna(subset=['weather_observed_at']).reset_index(drop=True)
+    served = index.lookup(frame['region'].tolist(), frame['timestamp'].tolist())
+    np.testing.assert_array_equal(served['temperature'], frame['temperature'])
+    np.testing.assert_array_equal(served['weather_observed_at'], frame['weather_observed_at'])
+    assert served['day_type'].tolist() == frame['day_type'].tolist()
+    np.testing.assert_allclose(served['seasonality'], frame['seasonality'])
+
+
+def test_index_serves_times_after_the_last_reading(store):
+    index = FeatureIndex(store)
+    index.refresh()
+    # No consumption reading after 2024-01-02, but weather continues to 2024-01-10
+    served = index.lookup(['norte'], [pd.Timestamp('2024-01-09 12:30')])
+    assert served['temperature'][0] == 1000.0 + 8 * 24 + 12
+    assert served['weather_observed_at'][0] == pd.Timestamp('2024-01-09 12:00')
+
+
+def test_index_raises_without_recent_weather(store):
+    index = FeatureIndex(store)
+    index.refresh()
+    with pytest.raises(LookupError):
+        index.lookup(['centro'], [pd.Timestamp('2024-02-01')])
+    with pytest.raises(LookupError):
+        index.lookup(['sul'], [pd.Timestamp('2024-01-01 05:00')])
@@ -0,0 +1,45 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from etl_pipeline import ETLPipeline, apply_filters, iter_source_chunks
+
+
+@pytest.fixture
+def readings():
+    return pd.DataFrame({'timestamp': pd.date_range('2024-01-10', periods=10, freq='D'),
+                         'region': ['centro', 'norte'] * 5,
+                         'consumption': [float(i) for i in range(10)]})
+
+
+@pytest.mark.parametrize('extension', ['csv', 'jsonl'])
+def test_text_sources_compare_dates_after_parsing(tmp_path, readings, extension):
+    path = str(tmp_path / f'readings.{extension}')
+    if extension == 'csv':
+        readings.to_csv(path, index=False)
+    else:
+        readings.to_json(path, orient='records', lines=True, date_format='iso')
+
+    filters = [('timestamp', '>=', datetime(2024, 1, 15)), ('timestamp', '<', date(2024, 1, 18))]
+    loaded = ETLPipeline().load_data(path, filters=filters)
+    assert loaded['consumption'].tolist() == [5.0, 6.0, 7.0]
+
+    chunks = list(iter_source_chunks(path, 4, filters=filters))
+    assert pd.concat(chunks)['consumption'].tolist() == [5.0, 6.0, 7.0]
+
+
+def test_string_literals_compare_with_datetime_columns(readings):
+    filtered = apply_filters(readings, [('timestamp', '>', '2024-01-17')])
+    assert filtered['consumption'].tolist() == [8.0, 9.0]
+
+    aware = readings.assign(timestamp=readings['timestamp'].dt.tz_localize('UTC'))
+    filtered = apply_filters(aware, [('timestamp', 'in', [datetime(2024, 1, 10), '2024-01-11'])])
+    assert filtered['consumption'].tolist() == [0.0, 1.0]
+
+
+def test_unparseable_values_never_match(readings):
+    frame = readings.astype({'timestamp': str})
+    frame.loc[0, 'timestamp'] = 'unknown'
+    filtered = apply_filters(frame, [('timestamp', '<', datetime(2024, 1, 12))])
+    assert filtered['consumption'].tolist() == [1.0]
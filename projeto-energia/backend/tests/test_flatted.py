@@ -0,0 +1,48 @@
+import json
+
+import flatted
+from benchmarks import build_flatted_graph
+
+
+def test_plain_values_round_trip():
+    for value in (None, 1, 2.5, True, 'text', [], {}, [1, 'a', {'b': None}], {'a': ['b', 'b']}):
+        assert flatted.parse(flatted.stringify(value)) == value
+
+
+def test_strings_are_stored_once():
+    assert json.loads(flatted.stringify({'a': 'same', 'b': 'same'})) == [{'a': '1', 'b': '1'}, 'same']
+
+
+def test_circular_references_round_trip():
+    root = {'name': 'root', 'children': []}
+    child = {'name': 'child', 'parent': root}
+    root['children'].append(child)
+    root['self'] = root
+
+    parsed = flatted.parse(flatted.stringify(root))
+    assert parsed['self'] is parsed
+    assert parsed['children'][0]['parent'] is parsed
+    assert parsed['children'][0]['name'] == 'child'
+
+
+def test_shared_references_stay_shared():
+    shared = {'value': 1}
+    parsed = flatted.parse(flatted.stringify([shared, shared, {'inner': shared}]))
+    assert parsed[0] is parsed[1] is parsed[2]['inner']
+
+
+def test_parses_javascript_output():
+    # Flatted.stringify(a) in JavaScript, with a = [{}]; a[0].a = a; a.push(a)
+    parsed = flatted.parse('[["1","0"],{"a":"0"}]')
+    assert parsed[1] is parsed
+    assert parsed[0]['a'] is parsed
+
+
+def test_large_graph_round_trip():
+    graph = build_flatted_graph(2_000)
+    parsed = flatted.parse(flatted.stringify(graph))
+    assert len(parsed['nodes']) == len(graph['nodes'])
+    last = parsed['nodes'][-1]
+    assert last['root'] is parsed
+    assert last['previous'] is parsed['nodes'][-2]
+    assert flatted.stringify(parsed) == flatted.stringify(graph)
@@ -0,0 +1,102 @@
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from performance_tracker import (BinnedDistribution, ErrorWindow, ModelAccuracyTracker,
+                                 PerformanceTracker, ks_statistic, population_stability_index)
+
+
+def test_psi_and_ks_of_identical_histograms_are_zero():
+    counts = np.array([10.0, 20.0, 30.0, 40.0])
+    assert population_stability_index(counts, counts * 3) == pytest.approx(0.0)
+    assert ks_statistic(counts, counts * 3) == pytest.approx(0.0)
+
+
+def test_psi_and_ks_known_values():
+    reference = np.array([50.0, 50.0])
+    current = np.array([20.0, 80.0])
+    # sum((o - e) * ln(o / e)) over the two bins
+    expected = (0.2 - 0.5) * np.log(0.2 / 0.5) + (0.8 - 0.5) * np.log(0.8 / 0.5)
+    assert population_stability_index(reference, current) == pytest.approx(expected)
+    assert ks_statistic(reference, current) == pytest.approx(0.3)
+
+
+def test_psi_smooths_empty_bins():
+    psi = population_stability_index(np.array([100.0, 0.0]), np.array([0.0, 100.0]))
+    assert np.isfinite(psi) and psi > 0.2
+
+
+def test_shifted_distribution_is_flagged():
+    rng = np.random.default_rng(0)
+    distribution = BinnedDistribution(n_bins=10, reference_size=5_000)
+    distribution.update(rng.normal(0, 1, 5_000), now=0.0)
+    distribution.update(rng.normal(0, 1, 5_000), now=0.0)
+    stable = distribution.drift(now=0.0)
+    distribution.update(rng.normal(2, 1, 50_000), now=0.0)
+    shifted = distribution.drift(now=0.0)
+
+    assert stable['count'] == 5_000 and stable['psi'] < 0.05 and stable['ks'] < 0.05
+    assert shifted['psi'] > 0.2 and shifted['ks'] > 0.2
+
+
+def test_far_future_forecast_keeps_the_drift_window():
+    tracker = PerformanceTracker(reference_size=1_000)
+    now = time.time()
+    rng = np.random.default_rng(0)
+    targets = now + np.arange(4_000) * 60.0
+    tracker.record_predictions('centro', targets, rng.normal(100, 10, 4_000), now=now)
+    tracker.record_predictions('centro', [now + 30 * 86400], [100.0], now=now)
+
+    drift = tracker.evaluate_system_performance(now=now)['drift']['prediction']
+    assert drift['count'] == 3_001
+    assert drift['psi'] < 0.1
+
+
+def test_error_window_mae_mape_by_observation_time():
+    window = ErrorWindow(n_buckets=2, bucket_seconds=3600.0)
+    window.update(np.array([0.0, 10.0]), np.array([110.0, 90.0]), np.array([100.0, 100.0]))
+    assert window.metrics() == {'mae': 10.0, 'mape': pytest.approx(0.1), 'count': 2}
+
+    # Two hours later the first bucket has left the window
+    window.update(np.array([7200.0]), np.array([50.0]), np.array([0.0]))
+    assert window.metrics() == {'mae': 50.0, 'mape': None, 'count': 1}
+
+
+def test_actuals_match_pending_predictions():
+    tracker = PerformanceTracker()
+    tracker.record_predictions('centro', [3600.0, 7200.0], [100.0, 200.0])
+    assert tracker.record_actuals('centro', [3600.0, 10800.0], [110.0, 5.0]) == 1
+
+    report = tracker.evaluate_system_performance(now=3600.0)
+    assert report['accuracy']['centro']['mae'] == pytest.approx(10.0)
+    assert report['health']['pending_predictions'] == 1
+    assert report['health']['unmatched_actuals'] == 1
+
+
+def test_pending_predictions_are_bounded_per_region():
+    tracker = ModelAccuracyTracker(max_pending=3, max_pending_total=5)
+    tracker.record_predictions('norte', [1.0, 2.0], [10.0, 20.0])
+    tracker.record_predictions('centro', [float(ts) for ts in range(100)], [1.0] * 100)
+    assert len(tracker.pending['norte']) == 2
+    assert list(tracker.pending['centro']) == [97.0, 98.0, 99.0]
+
+    # A repeated timestamp keeps the latest prediction and is evicted last
+    tracker.record_predictions('norte', [1.0], [15.0])
+    tracker.record_predictions('sul', [1.0], [5.0])
+    # Over the total cap, the largest region gives way
+    assert list(tracker.pending['centro']) == [98.0, 99.0]
+    assert tracker.pending_count == 5
+    assert tracker.record_actuals('norte', [1.0, 2.0], [15.0, 20.0]) == 2
+    assert tracker.metrics(now=0.0)['norte']['mae'] == 0.0
+
+
+def test_history_rows_are_tracked_by_region():
+    tracker = PerformanceTracker()
+    row = {'timestamp': datetime(1970, 1, 1, 1), 'predicted': 100.0, 'temperature': 25.0,
+           'humidity': 60.0, 'seasonality': 1.0}
+    tracker.record_history_rows([dict(row, region='norte'), dict(row, region=None)])
+    assert tracker.record_actuals('norte', [3600.0], [110.0]) == 1
+    assert tracker.record_actuals('all', [3600.0], [100.0]) == 1
+    assert tracker.record_actuals('centro', [3600.0], [100.0]) == 0
@@ -0,0 +1,130 @@
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from response_encoding import (ARROW_MEDIA_TYPE, JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE,
+                               STREAM_CHUNK_SIZE, negotiate, stream_frame, stream_rows)
+
+ROWS = [{'timestamp': datetime(2024, 1, 1) + timedelta(hours=i), 'predicted': float(i),
+         'features': {'dayType': 'weekday', 'temperature': 20.0 + i}}
+        for i in range(2 * STREAM_CHUNK_SIZE + 5)]
+
+
+def _rows_with_late_values():
+    # The first chunk has only None in 'region', later chunks have strings and floats
+    rows = [{'id': i, 'region': None, 'value': None} for i in range(STREAM_CHUNK_SIZE)]
+    rows += [{'id': i, 'region': 'centro', 'value': 1.5}
+             for i in range(STREAM_CHUNK_SIZE, STREAM_CHUNK_SIZE + 10)]
+    return rows
+
+
+@pytest.fixture(scope='module')
+def client():
+    app = FastAPI()
+
+    @app.get('/rows')
+    def rows(request: Request):
+        return stream_rows(iter(ROWS), request.headers.get('accept'))
+
+    @app.get('/late')
+    def late(request: Request):
+        return stream_rows(iter(_rows_with_late_values()), request.headers.get('accept'))
+
+    @app.get('/late-schema')
+    def late_schema(request: Request):
+        schema = pa.schema([('id', pa.int64()), ('region', pa.string()), ('value', pa.float64())])
+        return stream_rows(iter(_rows_with_late_values()), request.headers.get('accept'),
+                           arrow_schema=lambda: schema)
+
+    @app.get('/late-frame')
+    def late_frame(request: Request):
+        return stream_frame(pd.DataFrame(_rows_with_late_values()), request.headers.get('accept'))
+
+    @app.get('/frame')
+    def frame(request: Request):
+        return stream_frame(pd.DataFrame({'region': ['centro', 'norte'], 'consumption': [1.0, 2.0]}),
+                            request.headers.get('accept'))
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize('accept, expected', [
+    (None, JSON_MEDIA_TYPE),
+    ('*/*', JSON_MEDIA_TYPE),
+    ('text/html', JSON_MEDIA_TYPE),
+    (NDJSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE),
+    (f'{JSON_MEDIA_TYPE};q=0.5, {ARROW_MEDIA_TYPE}', ARROW_MEDIA_TYPE),
+    (f'{ARROW_MEDIA_TYPE};q=0.2, {NDJSON_MEDIA_TYPE};q=0.9', NDJSON_MEDIA_TYPE),
+    (f'{ARROW_MEDIA_TYPE};q=bad, {NDJSON_MEDIA_TYPE};q=0.1', NDJSON_MEDIA_TYPE),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def test_json_array(client):
+    response = client.get('/rows')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith(JSON_MEDIA_TYPE)
+    body = response.json()
+    assert len(body) == len(ROWS)
+    assert body[0]['timestamp'] == '2024-01-01T00:00:00'
+    assert body[-1]['features']['temperature'] == ROWS[-1]['features']['temperature']
+
+
+def test_ndjson_lines(client):
+    response = client.get('/rows', headers={'accept': NDJSON_MEDIA_TYPE})
+    assert response.headers['content-type'].startswith(NDJSON_MEDIA_TYPE)
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    assert len(lines) == len(ROWS)
+    assert lines[1]['predicted'] == 1.0
+
+
+def test_arrow_stream(client):
+    response = client.get('/rows', headers={'accept': ARROW_MEDIA_TYPE})
+    assert response.headers['content-type'].startswith(ARROW_MEDIA_TYPE)
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == len(ROWS)
+    assert pa.types.is_timestamp(table.schema.field('timestamp').type)
+    assert pa.types.is_struct(table.schema.field('features').type)
+    assert table.column('predicted').to_pylist()[-1] == ROWS[-1]['predicted']
+
+
+def test_arrow_null_first_chunk_does_not_break_the_stream(client):
+    response = client.get('/late', headers={'accept': ARROW_MEDIA_TYPE})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == STREAM_CHUNK_SIZE + 10
+    assert table.column('region').to_pylist()[-1] == 'centro'
+    assert table.column('value').to_pylist()[-1] == '1.5'
+
+
+def test_arrow_explicit_schema(client):
+    response = client.get('/late-schema', headers={'accept': ARROW_MEDIA_TYPE})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.schema.field('value').type == pa.float64()
+    assert table.column('value').to_pylist()[-1] == 1.5
+
+
+def test_arrow_frame_null_first_chunk(client):
+    response = client.get('/late-frame', headers={'accept': ARROW_MEDIA_TYPE})
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == STREAM_CHUNK_SIZE + 10
+    assert table.column('region').to_pylist()[-1] == 'centro'
+    assert table.column('value').to_pylist()[-1] == 1.5
+
+
+@pytest.mark.parametrize('accept', [JSON_MEDIA_TYPE, NDJSON_MEDIA_TYPE, ARROW_MEDIA_TYPE])
+def test_frame_formats_agree(client, accept):
+    response = client.get('/frame', headers={'accept': accept})
+    if accept == ARROW_MEDIA_TYPE:
+        rows = pa.ipc.open_stream(response.content).read_all().to_pylist()
+    elif accept == NDJSON_MEDIA_TYPE:
+        rows = [json.loads(line) for line in response.text.splitlines() if line]
+    else:
+        rows = response.json()
+    assert rows == [{'region': 'centro', 'consumption': 1.0}, {'region': 'norte', 'consumption': 2.0}]
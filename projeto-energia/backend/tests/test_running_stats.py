@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl_pipeline import NumericTransformer, RunningStats
+
+
+def _full_stats(values):
+    series = pd.Series(values)
+    return series.count(), series.mean(), series.var(), series.min(), series.max()
+
+
+def test_merged_chunks_equal_full_data():
+    rng = np.random.default_rng(0)
+    values = rng.normal(1000.0, 50.0, 10_000)
+    stats = RunningStats()
+    for chunk in np.array_split(values, 7):
+        stats.merge(RunningStats().update(chunk))
+
+    count, mean, variance, low, high = _full_stats(values)
+    assert stats.count == count
+    assert stats.mean == pytest.approx(mean, rel=1e-12)
+    assert stats.variance == pytest.approx(variance, rel=1e-9)
+    assert (stats.min, stats.max) == (low, high)
+
+
+def test_merge_is_order_independent():
+    rng = np.random.default_rng(1)
+    parts = [rng.uniform(-5, 5, size) for size in (1, 2, 500, 3)]
+    forward, backward = RunningStats(), RunningStats()
+    for part in parts:
+        forward.merge(RunningStats().update(part))
+    for part in reversed(parts):
+        backward.merge(RunningStats().update(part))
+    assert forward.mean == pytest.approx(backward.mean)
+    assert forward.variance == pytest.approx(backward.variance)
+
+
+def test_nulls_and_empty_batches_are_ignored():
+    stats = RunningStats().update(np.array([1.0, np.nan, 3.0]))
+    stats.merge(RunningStats()).update(np.array([np.nan]))
+    assert stats.count == 2
+    assert stats.mean == 2.0
+    assert stats.variance == pytest.approx(2.0)
+    assert np.isnan(RunningStats().update(np.array([5.0])).variance)
+
+
+def test_round_trip_through_dict():
+    stats = RunningStats().update(np.arange(10.0))
+    restored = RunningStats.from_dict(stats.to_dict())
+    assert restored.to_dict() == stats.to_dict()
+
+
+def test_numeric_transformer_merge_matches_single_fit():
+    frame = pd.DataFrame({'consumption': np.arange(100.0), 'temperature': np.linspace(10, 40, 100)})
+    merged = NumericTransformer()
+    for start in range(0, 100, 30):
+        merged.merge(NumericTransformer().fit(frame.iloc[start:start + 30]))
+    single = NumericTransformer().fit(frame)
+    for col in frame.columns:
+        assert merged.stats[col].to_dict() == pytest.approx(single.stats[col].to_dict())
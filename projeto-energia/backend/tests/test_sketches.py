@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl_pipeline import FusedQualityScanner
+from sketches import HyperLogLog, KLLSketch, TailSample
+
+
+def _hashes(values):
+    return pd.util.hash_pandas_object(pd.Series(values), index=False).to_numpy()
+
+
+@pytest.mark.parametrize('distinct', [100, 10_000, 200_000])
+def test_hyperloglog_within_error_bound(distinct):
+    sketch = HyperLogLog(relative_error=0.01)
+    # Repeated values must not change the estimate
+    sketch.update(_hashes(np.arange(distinct))).update(_hashes(np.arange(distinct // 2)))
+    # Three standard errors
+    assert abs(sketch.estimate() - distinct) <= 3 * sketch.relative_error * distinct
+
+
+def test_hyperloglog_merge_counts_the_union():
+    left = HyperLogLog(relative_error=0.02).update(_hashes(np.arange(0, 60_000)))
+    right = HyperLogLog(relative_error=0.02).update(_hashes(np.arange(40_000, 100_000)))
+    merged = left.merge(right)
+    assert abs(merged.estimate() - 100_000) <= 3 * merged.relative_error * 100_000
+
+
+def test_hyperloglog_rejects_different_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=10).merge(HyperLogLog(precision=12))
+
+
+def test_kll_quantiles_within_rank_error():
+    rank_error = 0.01
+    values = np.random.default_rng(0).permutation(100_000).astype(float)
+    sketch = KLLSketch(rank_error=rank_error, seed=0)
+    for chunk in np.array_split(values, 20):
+        sketch.update(chunk)
+
+    assert sketch.count == len(values)
+    for q in (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99):
+        true_rank = np.searchsorted(np.sort(values), sketch.quantile(q), side='right') / len(values)
+        assert abs(true_rank - q) <= 3 * rank_error
+        assert abs(sketch.rank(q * len(values)) / len(values) - q) <= 3 * rank_error
+
+
+def test_kll_merge_matches_one_sketch():
+    rng = np.random.default_rng(1)
+    left_values, right_values = rng.normal(0, 1, 50_000), rng.normal(3, 1, 50_000)
+    merged = KLLSketch(rank_error=0.01, seed=0).update(left_values)
+    merged.merge(KLLSketch(rank_error=0.01, seed=1).update(right_values))
+
+    values = np.sort(np.concatenate([left_values, right_values]))
+    assert merged.count == len(values)
+    for q in (0.1, 0.5, 0.9):
+        true_rank = np.searchsorted(values, merged.quantile(q), side='right') / len(values)
+        assert abs(true_rank - q) <= 0.03
+
+
+def test_kll_count_outside():
+    values = np.arange(10_000, dtype=float)
+    sketch = KLLSketch(rank_error=0.01, seed=0).update(values)
+    assert abs(sketch.count_outside(1_000, 9_000) - 1_999) <= 0.03 * len(values)
+
+
+def test_tail_sample_keeps_the_most_extreme_values():
+    rng = np.random.default_rng(2)
+    values = rng.normal(0, 1, 10_000)
+    sample = TailSample(size=5)
+    for chunk in np.array_split(values, 10):
+        sample.merge(TailSample(size=5).update(chunk))
+    assert len(sample.values) == 10
+    extremes = np.sort(values)
+    np.testing.assert_array_equal(sample.values, np.concatenate([extremes[:5], extremes[-5:]]))
+    assert sample.most_extreme(0.0, -100.0, 100.0) == []
+
+
+def test_outlier_examples_use_the_global_thresholds():
+    # Each chunk is tight around its own level, so it has no outliers of its
+    # own, but the single high chunk is far out against the global moments
+    scanner = FusedQualityScanner(quality_config={
+        'outlier_detection': {'method': 'zscore', 'threshold': 3},
+        'approximate': {'enabled': True, 'sample_size': 3, 'seed': 0}
+    })
+    chunks = [pd.DataFrame({'value': 100.0 + np.arange(50) % 5}) for _ in range(30)]
+    chunks.append(pd.DataFrame({'value': 1000.0 + np.arange(5)}))
+    scan = scanner.scan(chunks[0], count_outliers=False)
+    for chunk in chunks[1:]:
+        scan.merge(scanner.scan(chunk, count_outliers=False))
+
+    issues = [issue for issue in scan.reports()['quality']['issues'] if issue['type'] == 'outliers']
+    assert issues and issues[0]['examples'] == [1004.0, 1003.0, 1002.0]
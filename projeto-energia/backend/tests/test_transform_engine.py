@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from etl_pipeline import CategoricalTransformer, ETLPipeline, NumericTransformer, TemporalFeatureExtractor
+from transform_engine import FusedTransformEngine
+
+
+def _frame(n=500):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h'),
+        'region': rng.choice(['centro', 'norte', 'sul'], n),
+        'consumption': rng.normal(100, 10, n),
+        'constant': 1,
+        'count': rng.integers(0, 5, n)
+    })
+    df.loc[3, 'timestamp'] = pd.NaT
+    return df
+
+
+def test_matches_chained_transformers():
+    df = _frame()
+    chained = CategoricalTransformer().encode(
+        NumericTransformer().normalize(TemporalFeatureExtractor().extract_features(df)))
+    pd.testing.assert_frame_equal(FusedTransformEngine().transform(df), chained)
+
+
+def _base(values):
+    while values.base is not None:
+        values = values.base
+    return values
+
+
+def test_output_wraps_the_float_block_without_copying():
+    engine = FusedTransformEngine()
+    result = engine.transform(_frame())
+    # Float block, weekend block and one codes array for 'region'
+    assert engine.last_report['output_allocations'] == 3
+    assert _base(result['consumption'].to_numpy()) is _base(result['timestamp_year'].to_numpy())
+
+
+def test_raw_columns_are_left_untransformed_and_last():
+    df = _frame()
+    result = FusedTransformEngine(raw_columns=['region', 'count']).transform(df)
+    assert list(result.columns[-2:]) == ['region', 'count']
+    assert result['region'].tolist() == df['region'].tolist()
+    assert result['count'].tolist() == df['count'].tolist()
+
+
+@pytest.mark.parametrize('stats', [False, True])
+def test_transform_data_matches_chained_transformers(tmp_path, stats):
+    df = _frame()
+    pipeline = ETLPipeline()
+    if stats:
+        pipeline.config['transformations']['numeric_stats_path'] = str(tmp_path / 'stats.json')
+    pipeline.validated_data = df.copy()
+    result = pipeline.transform_data()
+
+    temporal = TemporalFeatureExtractor().extract_features(df)
+    normalized = (NumericTransformer().fit(temporal).transform(temporal) if stats
+                  else NumericTransformer().normalize(temporal))
+    pd.testing.assert_frame_equal(result, pipeline._one_hot_encode(normalized))
+    assert (tmp_path / 'stats.json').exists() == stats